@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Sequential A/B test of two versions of a team.
+
+Both versions play the same seeds against the same opponents from the same
+corner. Every seed gives a pair of matches: version B wins the pair when it
+collected more elerium than version A, pairs with equal elerium are draws.
+After each pair, in the order of seeds, a sequential probability ratio test
+(SPRT) of the win rate over decided pairs is updated, the test stops as soon
+as it accepts one of the hypotheses or the matches budget is spent:
+
+    $ python -m arena.abtest konovalov_a_v:KonovalovDrone my_tuning:KonovalovDrone --max-pairs 500
+"""
+import argparse
+import math
+import time
+from multiprocessing import Pool, cpu_count
+
+from game import FIELD, NUMBER_OF_DRONES, TEAMS
+
+from .runner import run_match
+from .teams import load_team
+
+# 95% confidence
+Z_SCORE = 1.96
+
+
+def wilson_interval(wins, games, z=Z_SCORE):
+    """
+    :param wins: int
+    :param games: int
+    :return: (low, high) of the win rate
+    """
+    if not games:
+        return 0.0, 1.0
+    rate = wins / games
+    center = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    spread = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    # rounding must not take the bounds out of 0..1 when there are no wins or no losses
+    return max(center - spread, 0.0), min(center + spread, 1.0)
+
+
+def mean_interval(values, z=Z_SCORE):
+    """
+    :param values: list() of float
+    :return: (mean, low, high), normal approximation
+    """
+    if not values:
+        return 0.0, 0.0, 0.0
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, mean, mean
+    variance = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+    spread = z * math.sqrt(variance / len(values))
+    return mean, mean - spread, mean + spread
+
+
+class SPRT:
+    """
+    Sequential probability ratio test of the pair win rate of version B over decided pairs,
+    H0: win rate is p0 (B is not better), H1: win rate is p1 (B is better).
+    Draws carry no information and are skipped, as in PairedResults.win_rate()
+    """
+
+    def __init__(self, p0=0.5, p1=0.6, alpha=0.05, beta=0.05):
+        self.llr = 0.0
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self._win = math.log(p1 / p0)
+        self._loss = math.log((1 - p1) / (1 - p0))
+
+    def update(self, score):
+        """
+        :param score: 1 - B won the pair, 0 - A won, 0.5 - draw
+        """
+        if score == 1:
+            self.llr += self._win
+        elif score == 0:
+            self.llr += self._loss
+
+    @property
+    def status(self):
+        """
+        :return: 'H1' - B is better, 'H0' - B is not better, None - not decided yet
+        """
+        if self.llr >= self.upper:
+            return 'H1'
+        if self.llr <= self.lower:
+            return 'H0'
+        return None
+
+
+class PairedResults:
+    """
+    Results of pairs of matches on the same seeds
+    """
+
+    def __init__(self):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        # elerium of B minus elerium of A on every seed
+        self.deltas = []
+
+    @property
+    def pairs(self):
+        return len(self.deltas)
+
+    def add(self, elerium_a, elerium_b):
+        """
+        :return: score of B in the pair, see SPRT.update()
+        """
+        self.deltas.append(elerium_b - elerium_a)
+        if elerium_b > elerium_a:
+            self.wins += 1
+            return 1
+        if elerium_b < elerium_a:
+            self.losses += 1
+            return 0
+        self.draws += 1
+        return 0.5
+
+    def win_rate(self):
+        """
+        :return: (rate, low, high) of B over decided pairs, draws are skipped as in SPRT
+        """
+        decided = self.wins + self.losses
+        low, high = wilson_interval(self.wins, decided)
+        return (self.wins / decided if decided else 0.0), low, high
+
+    def elerium_delta(self):
+        """
+        :return: (mean, low, high) of elerium of B minus elerium of A
+        """
+        return mean_interval(self.deltas)
+
+
+def _play(args):
+    arm, seed, teams, team_name, number_of_drones, field = args
+    result = run_match(seed, teams=teams, number_of_drones=number_of_drones, field=field)
+    return arm, seed, result['teams'][team_name]['elerium']
+
+
+def ab_test(team_a, team_b, opponents, sprt, max_pairs=500, seed=0, number_of_drones=NUMBER_OF_DRONES,
+            processes=None, field=FIELD):
+    """
+    Playing pairs of matches over a process pool until the SPRT decides or max_pairs are played.
+    Corners are rotated with the seed, both versions of a pair start from the same corner.
+    Finished pairs wait for all pairs of lower seeds, so the stop does not depend on how long matches are
+    :param team_a: drone class of version A
+    :param team_b: drone class of version B
+    :param opponents: drone classes playing against both versions
+    :param sprt: SPRT()
+    :param max_pairs: int, budget of pairs
+    :param seed: int, seed of the first pair
+    :return: generator of (seed, elerium of A, elerium of B, PairedResults()) after every pair
+    """
+    tasks = []
+    for pair_seed in range(seed, seed + max_pairs):
+        corner = pair_seed % (len(opponents) + 1)
+        for arm, team in (('a', team_a), ('b', team_b)):
+            teams = tuple(opponents[:corner]) + (team,) + tuple(opponents[corner:])
+            tasks.append((arm, pair_seed, teams, team.__name__, number_of_drones, field))
+    results = PairedResults()
+    # seed -> {arm: elerium} of pairs not given to the SPRT yet
+    pending = {}
+    next_seed = seed
+    with Pool(processes=processes or cpu_count()) as pool:
+        # leaving the block terminates matches still running after the test has stopped
+        for arm, pair_seed, elerium in pool.imap_unordered(_play, tasks):
+            pending.setdefault(pair_seed, {})[arm] = elerium
+            while len(pending.get(next_seed, ())) == 2:
+                pair = pending.pop(next_seed)
+                sprt.update(results.add(pair['a'], pair['b']))
+                yield next_seed, pair['a'], pair['b'], results
+                if sprt.status is not None:
+                    return
+                next_seed += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sequential A/B test of two versions of a team on paired seeds')
+    parser.add_argument('team_a', help='version A, module:Class, e.g. konovalov_a_v:KonovalovDrone')
+    parser.add_argument('team_b', help='version B, module:Class')
+    parser.add_argument('-o', '--opponents', nargs='*', default=None,
+                        help='module:Class of opponents, all other teams of game.py by default')
+    parser.add_argument('-n', '--max-pairs', type=int, default=500)
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed of the first pair')
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('-d', '--drones', type=int, default=NUMBER_OF_DRONES)
+    parser.add_argument('-f', '--field', type=int, nargs=2, default=FIELD, metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--p0', type=float, default=0.5, help='pair win rate of B if it is not better')
+    parser.add_argument('--p1', type=float, default=0.6, help='pair win rate of B if it is better')
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    args = parser.parse_args()
+
+    team_a, team_b = load_team(args.team_a), load_team(args.team_b)
+    if args.opponents is None:
+        opponents = [team for team in TEAMS if team.__name__ not in (team_a.__name__, team_b.__name__)]
+    else:
+        opponents = [load_team(spec) for spec in args.opponents]
+    sprt = SPRT(p0=args.p0, p1=args.p1, alpha=args.alpha, beta=args.beta)
+
+    started = time.perf_counter()
+    results = PairedResults()
+    for seed, elerium_a, elerium_b, results in ab_test(team_a, team_b, opponents, sprt, max_pairs=args.max_pairs,
+                                                       seed=args.seed, number_of_drones=args.drones,
+                                                       processes=args.processes, field=tuple(args.field)):
+        print('pair {:>4} seed {:>6}: A {:>5} B {:>5}  LLR {:+.2f} [{:.2f}, {:.2f}]'.format(
+            results.pairs, seed, elerium_a, elerium_b, sprt.llr, sprt.lower, sprt.upper))
+
+    rate, low, high = results.win_rate()
+    delta, delta_low, delta_high = results.elerium_delta()
+    print('\n{} pairs in {:.1f}s'.format(results.pairs, time.perf_counter() - started))
+    print('B wins {}, draws {}, losses {}'.format(results.wins, results.draws, results.losses))
+    print('B win rate over decided pairs {:.1%}, 95% CI [{:.1%}, {:.1%}]'.format(rate, low, high))
+    print('B elerium delta {:+.1f}, 95% CI [{:+.1f}, {:+.1f}]'.format(delta, delta_low, delta_high))
+    verdict = {'H1': 'B is better', 'H0': 'B is not better'}.get(sprt.status, 'not decided, budget is spent')
+    print('SPRT: {}'.format(verdict))
+
+
+if __name__ == '__main__':
+    main()
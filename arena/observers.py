@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Per game step hooks for harness tools.
+
+The engine has no observer API, so the scene instance gets a game_step
+that calls the original one and then every observer with the scene.
+"""
+
+
+def add_step_observer(scene, callback):
+    """
+    :param scene: robogame_engine.scene.Scene()
+    :param callback: function(scene), called after every game step
+    """
+    observers = scene.__dict__.get('_step_observers')
+    if observers is None:
+        observers = scene._step_observers = []
+        game_step = scene.game_step
+
+        def observed_game_step():
+            game_step()
+            for observer in observers:
+                observer(scene)
+
+        scene.game_step = observed_game_step
+    observers.append(callback)
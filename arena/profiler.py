@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Hot-path profiler of drone callbacks.
+
+Opt-in: installing it wraps every on_* callback of KonovalovDrone and
+DevastatorDrone and DroneUnitWithStrategies.game_step (Reaper and Driller)
+at class level, uninstalling puts the original methods back. Every call is
+counted with its wall and CPU time per team, callback and state/role class
+of the drone, durations go to log2 histograms:
+
+    with Profiler() as profiler:
+        scene.go()
+    print(profiler.report())
+    profiler.write_collapsed('match.folded')  # flamegraph.pl match.folded > match.svg
+"""
+import os
+import time
+from collections import defaultdict
+from functools import wraps
+
+from enemies.devastator import DevastatorDrone
+from enemies.utils.strategies import DroneUnitWithStrategies
+from konovalov_a_v import KonovalovDrone
+
+# class -> names of wrapped methods, None - all on_* callbacks of the class
+TARGETS = (
+    (KonovalovDrone, None),
+    (DevastatorDrone, None),
+    (DroneUnitWithStrategies, ('game_step',)),
+)
+
+# bucket i holds durations from 2 ** (i - 1) to 2 ** i nanoseconds
+HISTOGRAM_SIZE = 40
+
+
+def state_of(drone):
+    """
+    Name of the state/role class the drone acts in
+    :param drone: astrobox.core.Drone()
+    :return: str
+    """
+    # KonovalovDrone keeps a Behavior() in _state, DevastatorDrone a Behavior() in role,
+    # Reaper and Driller a DroneState() in fsm_state, other strategy drones run strategies
+    for attribute in ('_state', 'role', 'fsm_state', 'current_strategy'):
+        state = getattr(drone, attribute, None)
+        if state is not None:
+            return type(state).__name__
+    return '-'
+
+
+class CallStats:
+    """
+    Counters of one (team, callback, state) key
+    """
+    __slots__ = ('calls', 'wall', 'cpu', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        # nanoseconds
+        self.wall = 0
+        self.cpu = 0
+        self.histogram = [0] * HISTOGRAM_SIZE
+
+    def add(self, wall, cpu):
+        self.calls += 1
+        self.wall += wall
+        self.cpu += cpu
+        self.histogram[min(wall.bit_length(), HISTOGRAM_SIZE - 1)] += 1
+
+    def percentile(self, share):
+        """
+        Upper bound of the histogram bucket holding the percentile
+        :param share: float, 0..1
+        :return: int, nanoseconds
+        """
+        rank = share * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return 1 << bucket
+        return 0
+
+
+class Profiler:
+    """
+    Call counts and timings of drone callbacks, collected while installed
+    """
+
+    def __init__(self, targets=TARGETS):
+        self.targets = targets
+        # (team, callback, state) -> CallStats()
+        self.stats = defaultdict(CallStats)
+        # stack of frames -> self wall time in nanoseconds, for flamegraphs
+        self.stacks = defaultdict(int)
+        # team -> [calls, wall, cpu] of outermost callbacks, the time the team took from the game step
+        self.totals = defaultdict(lambda: [0, 0, 0])
+        self._stack = []
+        self._originals = []
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+
+    def install(self):
+        if self._originals:
+            return
+        for cls, names in self.targets:
+            if names is None:
+                names = [name for name in dir(cls) if name.startswith('on_') and callable(getattr(cls, name))]
+            for name in names:
+                # inherited methods are wrapped on the class itself and removed from it on uninstall
+                self._originals.append((cls, name, cls.__dict__.get(name)))
+                setattr(cls, name, self._wrap(getattr(cls, name), name))
+
+    def uninstall(self):
+        for cls, name, original in reversed(self._originals):
+            if original is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, original)
+        self._originals = []
+
+    def _wrap(self, method, name):
+        stats = self.stats
+        stacks = self.stacks
+        totals = self.totals
+        stack = self._stack
+        perf_counter_ns = time.perf_counter_ns
+        process_time_ns = time.process_time_ns
+
+        @wraps(method)
+        def profiled(drone, *args, **kwargs):
+            # state is taken before the call, callbacks are accounted to the state which handled them
+            key = (drone.team, name, state_of(drone))
+            # frame: [path, wall time of nested profiled calls]
+            frame = [(stack[-1][0] if stack else (key[0],)) + ('%s:%s' % (name, key[2]),), 0]
+            stack.append(frame)
+            cpu_started = process_time_ns()
+            started = perf_counter_ns()
+            try:
+                return method(drone, *args, **kwargs)
+            finally:
+                wall = perf_counter_ns() - started
+                cpu = process_time_ns() - cpu_started
+                stack.pop()
+                if stack:
+                    stack[-1][1] += wall
+                else:
+                    total = totals[key[0]]
+                    total[0] += 1
+                    total[1] += wall
+                    total[2] += cpu
+                stats[key].add(wall, cpu)
+                stacks[frame[0]] += wall - frame[1]
+
+        return profiled
+
+    def report(self, limit=None):
+        """
+        Table of callbacks sorted by total wall time, nested calls are included into the callers time
+        :param limit: int, rows count, None - all
+        :return: str
+        """
+        lines = ['{:<20}{:>10}{:>12}{:>12}'.format('team', 'calls', 'wall, s', 'cpu, s')]
+        for team, (calls, wall, cpu) in sorted(self.totals.items(), key=lambda x: -x[1][1]):
+            lines.append('{:<20}{:>10}{:>12.3f}{:>12.3f}'.format(team, calls, wall / 1e9, cpu / 1e9))
+        lines.append('')
+        lines.append('{:<20}{:<24}{:<24}{:>9}{:>11}{:>11}{:>10}{:>10}{:>10}'.format(
+            'team', 'callback', 'state', 'calls', 'wall, ms', 'cpu, ms', 'mean, us', 'p50, us', 'p99, us'))
+        rows = sorted(self.stats.items(), key=lambda x: -x[1].wall)
+        for (team, callback, state), stat in rows[:limit]:
+            lines.append('{:<20}{:<24}{:<24}{:>9}{:>11.1f}{:>11.1f}{:>10.1f}{:>10.1f}{:>10.1f}'.format(
+                team, callback, state, stat.calls, stat.wall / 1e6, stat.cpu / 1e6,
+                stat.wall / stat.calls / 1e3, stat.percentile(0.5) / 1e3, stat.percentile(0.99) / 1e3))
+        return '\n'.join(lines)
+
+    def collapsed(self):
+        """
+        Collapsed stacks for flamegraph.pl/speedscope: "team;callback:State;... microseconds"
+        :return: list() of str
+        """
+        return ['%s %d' % (';'.join(path), wall // 1000) for path, wall in sorted(self.stacks.items())
+                if wall >= 1000]
+
+    def write_collapsed(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as file:
+            file.write('\n'.join(self.collapsed()) + '\n')
+
+    def write(self, path):
+        """
+        Writing the report, collapsed stacks go to <name>.folded next to it
+        :param path: str
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(self.report() + '\n')
+        self.write_collapsed(os.path.splitext(path)[0] + '.folded')
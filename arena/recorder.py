@@ -0,0 +1,505 @@
+# -*- coding: utf-8 -*-
+"""
+Match recorder and replayer.
+
+The recorder appends a binary record of every game step to a file: position,
+direction, cargo and health of all drones and the commands they were given
+(move_at, turn_to, stop, load_from, unload_to, gun.shot and elerium moved
+by cargo transitions the team code steps itself), with the drone and the
+phase of the game step that gave them. The header keeps the seed, field,
+drones count, teams and their corners. Objects are recorded by ids counted from the first
+drone of the match, so drone i of the t-th team has id
+t * drones + i whatever the worker played before.
+
+The replayer indexes the file and seeks to any recorded game step, or plays
+the match again headless: the scene is built from the header and drones
+without any team code execute the recorded commands up to the game step.
+The engine takes flight angles of killed drones from the random the teams
+share, they are recorded too:
+
+    $ python -m arena.runner --matches 1 --seed 7 --record records/{seed}.rec
+    $ python -m arena.recorder records/7.rec --step 1500
+    $ python -m arena.recorder records/7.rec --drone 12 --step 1400 --until 1600
+    $ python -m arena.recorder records/7.rec --step 1500 --replay
+"""
+import argparse
+import bisect
+import math
+import os
+import random
+import struct
+import sys
+from collections import namedtuple
+
+from astrobox.cargo import CargoTransition
+from astrobox.core import Drone, Unit
+from astrobox.guns import Gun
+from robogame_engine.geometry import Point
+from robogame_engine.scene import Scene
+
+from game import CORNERS, make_scene
+
+from .observers import add_step_observer
+from .teams import load_team
+
+MAGIC = b'ABXREC3\n'
+# seed, field width and height, drones in every team, teams count
+HEADER = struct.Struct('<qHHHB')
+NAME = struct.Struct('<H')
+# corner of the team, after its name
+CORNER = struct.Struct('<B')
+# game step, drones count, commands count
+STEP = struct.Struct('<IHH')
+# id, x, y, direction, payload, health share, team index
+DRONE = struct.Struct('<IffeHeB')
+# drone id, command, id of the drone whose code gave it, phase, target id or POINT/DIRECTION/NO_TARGET,
+# target x, y (direction in x)
+COMMAND = struct.Struct('<HBHBidd')
+
+# transfer - elerium moved by a cargo transition the team steps itself, target is the other side, x is the amount,
+# negative when the drone gives elerium away;
+# death_angle - direction of the flight of a drone killed in the step, the engine takes it from the shared random
+COMMANDS = ('move_at', 'load_from', 'unload_to', 'shot', 'turn_to', 'stop', 'transfer', 'death_angle')
+TRANSFER = COMMANDS.index('transfer')
+DEATH_ANGLE = COMMANDS.index('death_angle')
+POINT = -1
+DIRECTION = -2
+NO_TARGET = -3
+# when a command was given: before the objects of the game step are processed (scene step hooks),
+# while a drone handled its events, during its own game step (after it moved), or elsewhere
+BEFORE, EVENTS, GAME_STEP, OTHER = range(4)
+PHASES = ('before', 'events', 'game_step', 'other')
+NO_DRONE = 0xffff
+# commands the engine gives by itself are not recorded, the replay gives them again
+ENGINE_MODULES = ('robogame_engine.', 'astrobox.')
+
+DroneRecord = namedtuple('DroneRecord', 'id x y direction payload health team')
+CommandRecord = namedtuple('CommandRecord', 'drone command actor phase target x y')
+Frame = namedtuple('Frame', 'step drones commands')
+
+
+def _target_record(target):
+    # targets are game objects, robogame_engine.geometry.Point() or a direction for turn_to()
+    if target is None:
+        return NO_TARGET, 0.0, 0.0
+    if isinstance(target, (int, float)):
+        return DIRECTION, target, 0.0
+    if hasattr(target, 'coord'):
+        return target.id, target.x, target.y
+    return POINT, target.x, target.y
+
+
+class Recorder:
+    """
+    Appends game steps of one scene to a file, commands are caught by wrapping
+    the engine methods at class level while the recorder is open.
+    Event handling and game steps of drones are wrapped on the instances,
+    so every command keeps the drone and the phase of the game step that gave it
+    """
+
+    def __init__(self, path, seed, teams, number_of_drones, field, corners=None):
+        """
+        :param path: str, file to write
+        :param seed: int, seed of the match
+        :param teams: drone classes in the order of their registration
+        :param number_of_drones: int, drones in every team
+        :param field: (width, height) of the field
+        :param corners: corner of every team, see game.CORNERS; None - the first corners
+        """
+        self.teams = {team.__name__: index for index, team in enumerate(teams)}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._file.write(HEADER.pack(seed, field[0], field[1], number_of_drones, len(teams)))
+        for team, corner in zip(teams, corners or CORNERS):
+            name = ('%s:%s' % (team.__module__, team.__qualname__)).encode('utf-8')
+            self._file.write(NAME.pack(len(name)) + name + CORNER.pack(corner))
+        # engine ids are counted over the whole process, the recorded ones from the first drone of the match
+        self.first_id = None
+        self._drones = []
+        self._dead = set()
+        self._drones_struct = None
+        self._commands = []
+        # id of the drone whose code runs and the phase, see BEFORE
+        self._actor = [NO_DRONE, BEFORE]
+        self._originals = []
+
+    @classmethod
+    def attach(cls, scene, path, seed, teams, number_of_drones, field, corners=None):
+        """
+        :param scene: astrobox.space_field.SpaceField(), before scene.go()
+        :return: Recorder(), call close() when the match is over
+        """
+        recorder = cls(path, seed, teams, number_of_drones, field, corners)
+        # only drones exist before scene.go(), asteroids and motherships are made after them,
+        # drones are not added during a match
+        recorder._drones = [obj for obj in scene.objects if isinstance(obj, Drone)]
+        recorder._drones_struct = struct.Struct('<' + DRONE.format[1:] * len(recorder._drones))
+        recorder.first_id = min(obj.id for obj in scene.objects)
+        recorder.install()
+        add_step_observer(scene, recorder.on_game_step)
+        return recorder
+
+    def install(self):
+        append = self._commands.append
+        actor = self._actor
+        get_frame = sys._getframe
+
+        def record(cls, name, code, owner, ignored=None):
+            method = getattr(cls, name)
+
+            def recorded(obj, target=None, *args, **kwargs):
+                if not (get_frame(1).f_globals.get('__name__', '').startswith(ENGINE_MODULES)
+                        or ignored is not None and ignored(obj, target)):
+                    append((owner(obj).id, code, actor[0], actor[1]) + _target_record(target))
+                if target is None:
+                    return method(obj, *args, **kwargs)
+                return method(obj, target, *args, **kwargs)
+
+            # inherited methods are wrapped on the class itself and removed from it on uninstall
+            self._originals.append((cls, name, cls.__dict__.get(name)))
+            setattr(cls, name, recorded)
+
+        # the engine ignores moving to the target the drone already moves to, points are compared by identity
+        # and would not be the same objects in the replay
+        record(Drone, 'move_at', 0, lambda drone: drone, lambda drone, target: drone._move_target == target)
+        record(Unit, 'load_from', 1, lambda drone: drone)
+        record(Unit, 'unload_to', 2, lambda drone: drone)
+        record(Gun, 'shot', 3, lambda gun: gun.owner)
+        record(Drone, 'turn_to', 4, lambda drone: drone)
+        record(Drone, 'stop', 5, lambda drone: drone)
+
+        def track(drone, name, phase):
+            method = getattr(drone, name)
+
+            def tracked():
+                actor[0], actor[1] = drone.id, phase
+                try:
+                    return method()
+                finally:
+                    actor[0], actor[1] = NO_DRONE, OTHER
+
+            setattr(drone, name, tracked)
+
+        transition_step = CargoTransition.game_step
+
+        def recorded_transition_step(transition):
+            if get_frame(1).f_globals.get('__name__', '').startswith(ENGINE_MODULES):
+                return transition_step(transition)
+            payload = transition.cargo_to.payload
+            try:
+                return transition_step(transition)
+            finally:
+                amount = transition.cargo_to.payload - payload
+                if amount:
+                    receiver, giver = transition.cargo_to.owner, transition.cargo_from.owner
+                    if not isinstance(receiver, Drone):
+                        receiver, giver, amount = giver, receiver, -amount
+                    append((receiver.id, TRANSFER, actor[0], actor[1], giver.id, amount, 0.0))
+
+        self._originals.append((CargoTransition, 'game_step', transition_step))
+        CargoTransition.game_step = recorded_transition_step
+
+        for drone in self._drones:
+            track(drone, 'proceed_events', EVENTS)
+            track(drone, 'game_step', GAME_STEP)
+
+    def uninstall(self):
+        for cls, name, method in reversed(self._originals):
+            if method is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, method)
+        self._originals = []
+        for drone in self._drones:
+            drone.__dict__.pop('proceed_events', None)
+            drone.__dict__.pop('game_step', None)
+
+    def on_game_step(self, scene):
+        first_id = self.first_id
+        commands = self._commands
+        values = []
+        for drone in self._drones:
+            if drone.id not in self._dead and not drone.is_alive:
+                angle = getattr(drone, '_Drone__angle_of_death', None)
+                if angle is not None:
+                    self._dead.add(drone.id)
+                    commands.append((drone.id, DEATH_ANGLE, NO_DRONE, BEFORE, DIRECTION, angle, 0.0))
+            values += (drone.id - first_id, drone.x, drone.y, drone.direction, drone.payload, drone.meter_2,
+                       self.teams.get(drone.team, 255))
+        self._file.write(STEP.pack(scene._step, len(self._drones), len(commands)))
+        self._file.write(self._drones_struct.pack(*values))
+        for drone_id, code, actor, phase, target, x, y in commands:
+            if actor != NO_DRONE:
+                actor -= first_id
+            if target >= 0:
+                target -= first_id
+            self._file.write(COMMAND.pack(drone_id - first_id, code, actor, phase, target, x, y))
+        commands.clear()
+        # commands given until the objects of the next game step are processed come from step hooks
+        self._actor[0], self._actor[1] = NO_DRONE, BEFORE
+
+    def close(self):
+        self.uninstall()
+        self._file.close()
+
+
+class Replayer:
+    """
+    Random access to the game steps of a recorded match
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+        if not data.startswith(MAGIC):
+            raise ValueError('%s is not a match record' % path)
+        offset = len(MAGIC)
+        self.seed, width, height, self.number_of_drones, teams_count = HEADER.unpack_from(data, offset)
+        self.field = (width, height)
+        offset += HEADER.size
+        self.teams = []
+        self.corners = []
+        for _ in range(teams_count):
+            size, = NAME.unpack_from(data, offset)
+            offset += NAME.size
+            self.teams.append(data[offset:offset + size].decode('utf-8'))
+            offset += size
+            corner, = CORNER.unpack_from(data, offset)
+            offset += CORNER.size
+            self.corners.append(corner)
+        self._data = data
+        # game step -> offset of its record
+        self._index = {}
+        # the last record may be cut if the match was interrupted
+        while offset + STEP.size <= len(data):
+            step, drones, commands = STEP.unpack_from(data, offset)
+            size = STEP.size + drones * DRONE.size + commands * COMMAND.size
+            if offset + size > len(data):
+                break
+            self._index[step] = offset
+            offset += size
+        self.steps = sorted(self._index)
+
+    def team_classes(self):
+        """
+        Drone classes of the teams, to play the match again with arena.runner.run_match() in self.corners
+        :return: list() of classes
+        """
+        return [load_team(name) for name in self.teams]
+
+    def seek(self, step):
+        """
+        :param step: int, game step, the closest recorded one before it if it is missing
+        :return: Frame()
+        """
+        position = bisect.bisect_right(self.steps, step)
+        if position == 0:
+            raise KeyError(step)
+        return self._read(self._index[self.steps[position - 1]])
+
+    def frames(self, start=None, stop=None):
+        """
+        :param start: int, first game step, from the beginning by default
+        :param stop: int, last game step, to the end by default
+        :return: generator of Frame()
+        """
+        for step in self.steps:
+            if (start is None or step >= start) and (stop is None or step <= stop):
+                yield self._read(self._index[step])
+
+    def history(self, drone_id, start=None, stop=None):
+        """
+        :return: generator of (step, DroneRecord(), list() of CommandRecord()) of one drone
+        """
+        for frame in self.frames(start, stop):
+            state = next((drone for drone in frame.drones if drone.id == drone_id), None)
+            yield frame.step, state, [command for command in frame.commands if command.drone == drone_id]
+
+    def _read(self, offset):
+        data = self._data
+        step, drones_count, commands_count = STEP.unpack_from(data, offset)
+        offset += STEP.size
+        drones = [DroneRecord(*DRONE.unpack_from(data, offset + i * DRONE.size)) for i in range(drones_count)]
+        offset += drones_count * DRONE.size
+        commands = []
+        for i in range(commands_count):
+            drone, code, actor, phase, target, x, y = COMMAND.unpack_from(data, offset + i * COMMAND.size)
+            commands.append(CommandRecord(drone, COMMANDS[code], actor, phase, target, x, y))
+        return Frame(step, drones, commands)
+
+    def team_name(self, index):
+        return self.teams[index].split(':')[-1] if index < len(self.teams) else '?'
+
+    def replay(self, step):
+        """
+        Playing the match again headless up to the game step: the scene is built from the header,
+        drones execute the recorded commands and no team code is called.
+        Commands are given at the same phase of the game step as in the match, after the events
+        or the game step of the drone whose code gave them. A command given in the middle of a game step
+        of a drone is given after it, so drones may drift from the recorded positions, drift() of the result
+        and seek() tells how much
+        :param step: int, game step
+        :return: (astrobox.space_field.SpaceField(), Frame() of the replayed drones)
+        """
+        # the engine tells teams apart by names of drone classes
+        puppets = [type(self.team_name(index), (Drone,), {}) for index in range(len(self.teams))]
+        random.seed(self.seed)
+        Scene._Scene__teams.clear()
+        scene, drones = make_scene(headless=True, teams=puppets, number_of_drones=self.number_of_drones,
+                                   field=self.field, corners=self.corners)
+        first_id = drones[0][0].id
+        scene.prepare(**scene.init_kwargs)
+        objects = {obj.id - first_id: obj for obj in scene.objects}
+        # (drone id, phase) -> commands of the current game step
+        pending = {}
+
+        def execute(*key):
+            for command in pending.pop(key, ()):
+                _execute(objects, command)
+
+        for team_drones in drones:
+            for drone in team_drones:
+                _hook(drone, 'proceed_events', execute, drone.id - first_id, EVENTS)
+                _hook(drone, 'game_step', execute, drone.id - first_id, GAME_STEP)
+        for frame in self.frames(stop=step):
+            _advance(scene, frame.step - 1)
+            for command in frame.commands:
+                pending.setdefault((command.actor, command.phase), []).append(command)
+            execute(NO_DRONE, BEFORE)
+            _advance(scene, frame.step)
+            for key in list(pending):
+                execute(*key)
+        _advance(scene, step)
+        teams = {puppet.__name__: index for index, puppet in enumerate(puppets)}
+        states = [DroneRecord(drone.id - first_id, drone.x, drone.y, drone.direction, drone.payload, drone.meter_2,
+                              teams[drone.team])
+                  for team_drones in drones for drone in team_drones]
+        return scene, Frame(scene._step, states, [])
+
+
+def _hook(drone, name, callback, *args):
+    method = getattr(drone, name)
+
+    def hooked():
+        method()
+        callback(*args)
+
+    setattr(drone, name, hooked)
+
+
+def _advance(scene, step):
+    while scene._step < step:
+        scene._step += 1
+        scene.game_step()
+
+
+def _execute(objects, command):
+    drone = objects[command.drone]
+    if command.target >= 0:
+        target = objects.get(command.target)
+        if target is None:
+            target = Point(command.x, command.y)
+    elif command.target == POINT:
+        target = Point(command.x, command.y)
+    elif command.target == DIRECTION:
+        target = command.x
+    else:
+        target = None
+    if command.command == 'death_angle':
+        # given before the game step the angle is taken in, the engine takes it only while it is not set
+        drone._Drone__angle_of_death = int(command.x)
+        drone.layer = 1
+    elif command.command == 'transfer':
+        amount = int(command.x)
+        if amount > 0:
+            drone.cargo._transfer_payload(amount, target.cargo)
+        else:
+            target.cargo._transfer_payload(-amount, drone.cargo)
+    elif command.command == 'shot':
+        drone.gun.shot(target)
+    elif command.command == 'stop':
+        drone.stop()
+    else:
+        getattr(drone, command.command)(target)
+
+
+def drift(frame, other):
+    """
+    :param frame: Frame()
+    :param other: Frame() of the same drones
+    :return: float, the largest distance between positions of a drone
+    """
+    return max((math.hypot(drone.x - state.x, drone.y - state.y) for drone, state in zip(frame.drones, other.drones)),
+               default=0.0)
+
+
+def _format_drone(replayer, drone):
+    return '{:>6} {:<20} ({:7.1f}, {:7.1f}) dir {:5.1f} payload {:>3} health {:.2f}'.format(
+        drone.id, replayer.team_name(drone.team), drone.x, drone.y, drone.direction, drone.payload, drone.health)
+
+
+def _format_command(command):
+    if command.target == DIRECTION or command.command == 'death_angle':
+        return '{:<10} direction {:.1f}'.format(command.command, command.x)
+    if command.command == 'transfer':
+        return '{:<10} #{} {:+d}'.format(command.command, command.target, int(command.x))
+    if command.target == NO_TARGET:
+        return command.command
+    target = 'point' if command.target == POINT else '#%d' % command.target
+    return '{:<10} {} ({:.1f}, {:.1f})'.format(command.command, target, command.x, command.y)
+
+
+def _format_origin(command):
+    actor = '-' if command.actor == NO_DRONE else '#%d' % command.actor
+    return 'by {} in {}'.format(actor, PHASES[command.phase] if command.phase < len(PHASES) else '?')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show game steps of a recorded match')
+    parser.add_argument('path')
+    parser.add_argument('-s', '--step', type=int, default=None, help='game step, the last one by default')
+    parser.add_argument('-u', '--until', type=int, default=None, help='show game steps from --step up to this one')
+    parser.add_argument('-d', '--drone', type=int, default=None,
+                        help='only this drone, team corner index * drones in team + drone index')
+    parser.add_argument('-r', '--replay', action='store_true',
+                        help='play the match again up to --step and show the replayed drones')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='show which drone gave every command and in which phase of the game step')
+    args = parser.parse_args(argv)
+    if args.replay and args.until is not None:
+        parser.error('--replay shows one game step, --until is not supported')
+
+    replayer = Replayer(args.path)
+    print('seed {}, field {}x{}, {} drones, teams: {}, {} game steps'.format(
+        replayer.seed, replayer.field[0], replayer.field[1], replayer.number_of_drones,
+        ', '.join('{} (corner {})'.format(team, corner) for team, corner in zip(replayer.teams, replayer.corners)),
+        len(replayer.steps)))
+    if not replayer.steps:
+        return
+    step = replayer.steps[-1] if args.step is None else args.step
+    if args.replay:
+        recorded = replayer.seek(step)
+        _, frame = replayer.replay(step)
+        frames = [frame]
+        print('replayed up to step {}, largest drift from the record {:.1f}'.format(
+            frame.step, drift(frame, recorded) if recorded.step == frame.step else float('nan')))
+    elif args.until is None:
+        frames = [replayer.seek(step)]
+    else:
+        frames = replayer.frames(step, args.until)
+    for frame in frames:
+        print('\nstep', frame.step)
+        for drone in frame.drones:
+            if args.drone is None or drone.id == args.drone:
+                print(_format_drone(replayer, drone))
+        for command in frame.commands:
+            if args.drone is None or command.drone == args.drone:
+                line = '{:>6} {}'.format(command.drone, _format_command(command))
+                if args.verbose:
+                    line = '{:<60} {}'.format(line, _format_origin(command))
+                print(line)
+
+
+if __name__ == '__main__':
+    main()
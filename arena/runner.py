@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Headless batch runner.
+
+Builds the same scene as game.py from a seed, plays it without rendering
+and fans many matches out over a process pool:
+
+    $ python -m arena.runner --matches 200 --processes 8 --seed 0
+"""
+import argparse
+import io
+import os
+import random
+import time
+from collections import defaultdict
+from contextlib import redirect_stdout
+from multiprocessing import Pool, cpu_count
+
+from robogame_engine.scene import Scene
+
+from game import make_scene, CORNERS, FIELD, NUMBER_OF_DRONES, TEAMS
+from world.state import get_watchdog, release_scene
+
+from .profiler import Profiler
+from .recorder import Recorder
+from .telemetry import Telemetry
+
+
+def run_match(seed, teams=TEAMS, number_of_drones=NUMBER_OF_DRONES, field=FIELD, telemetry=None, profile=None,
+              tick_budget=None, record=None, corners=None):
+    """
+    Playing one headless match
+    :param seed: int, seed of the scene and of all drones decisions
+    :param teams: drone classes, the order of teams defines their mothership corners
+    :param number_of_drones: int, drones in every team
+    :param field: (width, height) of the field
+    :param telemetry: str, path of the telemetry file with {seed} placeholder, .json or .csv; None - no telemetry
+    :param profile: str, path of the callbacks profile with {seed} placeholder, see Profiler.write(); None - off
+    :param tick_budget: float, seconds per team per game step for planners, see world.watchdog; None - no limit
+    :param record: str, path of the match record with {seed} placeholder, see arena.recorder; None - no record
+    :param corners: corner of every team in their order, see game.CORNERS; None - the first corners
+    :return: dict() with seed, game steps, wall time, corners and per team elerium, survivors and planner times
+    """
+    # output directories are made before the match, so a wrong path does not cost a whole match
+    for path in (telemetry, profile, record):
+        if path:
+            make_parent_dir(path.format(seed=seed))
+    corners = tuple(corners) if corners else CORNERS[:len(teams)]
+    random.seed(seed)
+    # engine registers teams in a class attribute, corners of the next match depend on it
+    Scene._Scene__teams.clear()
+    scene, drones = make_scene(headless=True, teams=teams, number_of_drones=number_of_drones, field=field,
+                               corners=corners)
+    match_telemetry = Telemetry.attach(scene) if telemetry else None
+    watchdog = get_watchdog(scene)
+    watchdog.budget = tick_budget
+    profiler = Profiler() if profile else None
+    if profiler:
+        profiler.install()
+    recorder = None
+    if record:
+        recorder = Recorder.attach(scene, record.format(seed=seed), seed, teams, number_of_drones, field, corners)
+    started = time.perf_counter()
+    try:
+        # engine prints the rating table and a farewell at the end of every match
+        with redirect_stdout(io.StringIO()):
+            game_result = scene.go()
+    finally:
+        if profiler:
+            profiler.uninstall()
+        if recorder:
+            recorder.close()
+        release_scene(scene)
+    if match_telemetry:
+        match_telemetry.write(telemetry.format(seed=seed))
+    if profiler:
+        profiler.write(profile.format(seed=seed))
+    result = {
+        'seed': seed,
+        'steps': game_result.get('game_steps', scene._step),
+        'wall_time': time.perf_counter() - started,
+        'corners': list(corners),
+        'teams': {},
+    }
+    collected = game_result.get('collected', {})
+    watchdog_summary = watchdog.summary()
+    for team_drones in drones:
+        team = team_drones[0].team
+        result['teams'][team] = {
+            'elerium': collected.get(team, 0),
+            'survivors': sum(1 for drone in team_drones if drone.is_alive),
+        }
+        if team in watchdog_summary:
+            result['teams'][team]['watchdog'] = watchdog_summary[team]
+    return result
+
+
+def make_parent_dir(path):
+    """
+    :param path: str, path of a file to be written
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+
+def _run_match_star(args):
+    return run_match(*args)
+
+
+def run_matches(seeds, teams=TEAMS, number_of_drones=NUMBER_OF_DRONES, processes=None, field=FIELD,
+                telemetry=None, profile=None, tick_budget=None, record=None):
+    """
+    Playing matches over a process pool, results are yielded as soon as they are ready
+    Workers are reused, all state of a match is released together with its scene
+    :param seeds: iterable of int
+    :param teams: drone classes
+    :param number_of_drones: int, drones in every team
+    :param processes: int, workers count, all cores by default
+    :param field: (width, height) of the field
+    :param telemetry: str, path of telemetry files with {seed} placeholder, see run_match()
+    :param profile: str, path of callbacks profiles with {seed} placeholder, see run_match()
+    :param tick_budget: float, seconds per team per game step for planners, see run_match()
+    :param record: str, path of match records with {seed} placeholder, see run_match()
+    :return: generator of run_match() results
+    """
+    tasks = [(seed, teams, number_of_drones, field, telemetry, profile, tick_budget, record) for seed in seeds]
+    with Pool(processes=processes or cpu_count()) as pool:
+        for result in pool.imap_unordered(_run_match_star, tasks):
+            yield result
+
+
+def summarize(results):
+    """
+    Averaging results of many matches
+    :param results: list() of run_match() results
+    :return: dict() team -> averaged elerium, survivors and count of wins
+    """
+    summary = defaultdict(lambda: {'elerium': 0.0, 'survivors': 0.0, 'wins': 0})
+    for result in results:
+        teams = result['teams']
+        winner = max(teams, key=lambda team: teams[team]['elerium'])
+        for team, stat in teams.items():
+            summary[team]['elerium'] += stat['elerium'] / len(results)
+            summary[team]['survivors'] += stat['survivors'] / len(results)
+        summary[winner]['wins'] += 1
+    return dict(summary)
+
+
+def summarize_watchdog(results):
+    """
+    Worst planner times and overruns over many matches
+    :param results: list() of run_match() results
+    :return: dict() team -> worst decision and tick in seconds, sums of overruns and fallbacks
+    """
+    summary = {}
+    for result in results:
+        for team, stat in result['teams'].items():
+            if 'watchdog' not in stat:
+                continue
+            team_summary = summary.setdefault(team, {'worst_decision': 0.0, 'worst_tick': 0.0,
+                                                     'overruns': 0, 'fallbacks': 0})
+            for name in ('worst_decision', 'worst_tick'):
+                team_summary[name] = max(team_summary[name], stat['watchdog'][name])
+            for name in ('overruns', 'fallbacks'):
+                team_summary[name] += stat['watchdog'][name]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play headless matches over a process pool')
+    parser.add_argument('-n', '--matches', type=int, default=100)
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed of the first match')
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('-d', '--drones', type=int, default=NUMBER_OF_DRONES)
+    parser.add_argument('-f', '--field', type=int, nargs=2, default=FIELD, metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('-t', '--telemetry', default=None,
+                        help='telemetry file of every match, .json or .csv, e.g. telemetry/{seed}.json')
+    parser.add_argument('-p', '--profile', default=None,
+                        help='callbacks profile of every match, e.g. profile/{seed}.txt, '
+                             'collapsed stacks go to profile/{seed}.folded')
+    parser.add_argument('-b', '--tick-budget', type=float, default=None, metavar='MS',
+                        help='planners time per team per game step, over it teams repeat their last decisions')
+    parser.add_argument('-r', '--record', default=None,
+                        help='binary record of every match for arena.recorder, e.g. records/{seed}.rec')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = []
+    seeds = range(args.seed, args.seed + args.matches)
+    for result in run_matches(seeds, number_of_drones=args.drones, processes=args.processes,
+                              field=tuple(args.field), telemetry=args.telemetry,
+                              profile=args.profile,
+                              tick_budget=args.tick_budget / 1000 if args.tick_budget is not None else None,
+                              record=args.record):
+        results.append(result)
+        line = ', '.join('{} {}/{}'.format(team, stat['elerium'], stat['survivors'])
+                         for team, stat in result['teams'].items())
+        print('seed {:>6} steps {:>6}: {}'.format(result['seed'], result['steps'], line))
+
+    print('\n{} matches in {:.1f}s'.format(len(results), time.perf_counter() - started))
+    print('{:<20}{:>10}{:>11}{:>6}'.format('team', 'elerium', 'survivors', 'wins'))
+    for team, stat in sorted(summarize(results).items(), key=lambda x: -x[1]['elerium']):
+        print('{:<20}{:>10.1f}{:>11.2f}{:>6}'.format(team, stat['elerium'], stat['survivors'], stat['wins']))
+
+    watchdog = summarize_watchdog(results)
+    if watchdog:
+        print('\n{:<20}{:>14}{:>14}{:>10}{:>11}'.format('team', 'decision, ms', 'tick, ms', 'overruns', 'fallbacks'))
+        for team, stat in sorted(watchdog.items()):
+            print('{:<20}{:>14.2f}{:>14.2f}{:>10}{:>11}'.format(team, stat['worst_decision'] * 1000,
+                                                                stat['worst_tick'] * 1000, stat['overruns'],
+                                                                stat['fallbacks']))
+
+
+if __name__ == '__main__':
+    main()
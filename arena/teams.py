@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+
+def load_team(spec):
+    """
+    Drone class by its import path
+    :param spec: str, module:Class, e.g. konovalov_a_v:KonovalovDrone
+    :return: drone class
+    """
+    module, _, qualname = spec.partition(':')
+    if not qualname:
+        raise ValueError('team must be given as module:Class, got %r' % spec)
+    obj = importlib.import_module(module)
+    for attribute in qualname.split('.'):
+        obj = getattr(obj, attribute)
+    return obj
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Match telemetry for all teams.
+
+Attached to a scene, it looks at every drone after each game step and counts
+distance flown by cargo state, game steps spent loading, unloading, healing
+and idle, elerium delivered to motherships and trips which ended at an empty
+asteroid. At the end of the match it is written as JSON or CSV:
+
+    telemetry = Telemetry.attach(scene)
+    scene.go()
+    telemetry.write('match.json')
+"""
+import csv
+import json
+import math
+import os
+from collections import defaultdict
+
+from astrobox.core import Asteroid, Drone, MotherShip
+from robogame_engine.theme import theme
+
+from world.resources import CARGO_STATES, cargo_state
+
+from .observers import add_step_observer
+
+DRONE_FIELDS = (
+    ['team', 'drone', 'steps_alive']
+    + ['distance_%s' % state for state in CARGO_STATES]
+    + ['steps_moving', 'steps_loading', 'steps_unloading', 'steps_healing', 'steps_idle', 'wasted_trips']
+)
+
+
+class DroneTelemetry:
+    """
+    Counters of one drone
+    """
+
+    def __init__(self, drone):
+        self.team = drone.team
+        self.drone = drone.id
+        self.steps_alive = 0
+        self.distance = dict.fromkeys(CARGO_STATES, 0.0)
+        self.steps = dict.fromkeys(('moving', 'loading', 'unloading', 'healing', 'idle'), 0)
+        self.wasted_trips = 0
+        self.coord = (drone.x, drone.y)
+        self.payload = drone.payload
+        self.was_moving = False
+
+    def as_row(self):
+        row = {'team': self.team, 'drone': self.drone, 'steps_alive': self.steps_alive}
+        row.update(('distance_%s' % state, round(self.distance[state], 1)) for state in CARGO_STATES)
+        row.update(('steps_%s' % name, count) for name, count in self.steps.items())
+        row['wasted_trips'] = self.wasted_trips
+        return row
+
+
+class Telemetry:
+    """
+    Counters of all drones and motherships of a scene, updated after every game step
+    """
+
+    def __init__(self):
+        self.steps = 0
+        self.drones = {}
+        # game step -> team -> elerium delivered to the mothership at this step
+        self.delivered = defaultdict(dict)
+        self._motherships = {}
+        # drones which stopped at this step, checked against empty asteroids
+        self._stopped = []
+
+    @classmethod
+    def attach(cls, scene):
+        """
+        :param scene: astrobox.space_field.SpaceField(), before scene.go()
+        :return: Telemetry()
+        """
+        telemetry = cls()
+        add_step_observer(scene, telemetry.on_game_step)
+        return telemetry
+
+    def on_game_step(self, scene):
+        self.steps = scene._step
+        asteroids = []
+        for obj in scene.objects:
+            if isinstance(obj, Drone):
+                self._observe_drone(obj)
+            elif isinstance(obj, MotherShip):
+                self._observe_mothership(obj, scene._step)
+            elif isinstance(obj, Asteroid):
+                asteroids.append(obj)
+        for stat, drone in self._stopped:
+            if any(asteroid.is_empty and drone.near(asteroid) for asteroid in asteroids):
+                stat.wasted_trips += 1
+        self._stopped = []
+
+    def _observe_drone(self, drone):
+        stat = self.drones.get(drone.id)
+        if stat is None:
+            stat = self.drones[drone.id] = DroneTelemetry(drone)
+        if not drone.is_alive:
+            return
+        stat.steps_alive += 1
+        distance = math.hypot(drone.x - stat.coord[0], drone.y - stat.coord[1])
+        stat.coord = (drone.x, drone.y)
+        stat.distance[cargo_state(drone)] += distance
+
+        # teams drive cargo transitions in different ways, so loading is seen by the payload change
+        payload = drone.payload
+        if payload > stat.payload:
+            stat.steps['loading'] += 1
+        elif payload < stat.payload:
+            stat.steps['unloading'] += 1
+        elif drone.is_moving:
+            stat.steps['moving'] += 1
+        elif self._is_healing(drone):
+            stat.steps['healing'] += 1
+        else:
+            stat.steps['idle'] += 1
+
+        if stat.was_moving and not drone.is_moving:
+            self._stopped.append((stat, drone))
+        stat.was_moving = drone.is_moving
+        stat.payload = payload
+
+    def _is_healing(self, drone):
+        mothership = drone.mothership
+        return (mothership is not None and mothership.is_alive and drone.meter_2 < 1
+                and drone.distance_to(mothership) < theme.MOTHERSHIP_HEALING_DISTANCE)
+
+    def _observe_mothership(self, mothership, step):
+        previous = self._motherships.get(mothership.id, mothership.payload)
+        self._motherships[mothership.id] = mothership.payload
+        if mothership.is_alive and mothership.payload > previous:
+            self.delivered[step][mothership.team] = mothership.payload - previous
+
+    def summary(self):
+        """
+        :return: dict() team -> sums over the team drones and elerium delivered
+        """
+        teams = {}
+        for stat in self.drones.values():
+            team = teams.setdefault(stat.team, {'drones': 0, 'delivered': 0, 'wasted_trips': 0,
+                                                'distance': dict.fromkeys(CARGO_STATES, 0.0),
+                                                'steps': defaultdict(int)})
+            team['drones'] += 1
+            team['wasted_trips'] += stat.wasted_trips
+            for state in CARGO_STATES:
+                team['distance'][state] += stat.distance[state]
+            for name, count in stat.steps.items():
+                team['steps'][name] += count
+        for step_delivered in self.delivered.values():
+            for team, elerium in step_delivered.items():
+                if team in teams:
+                    teams[team]['delivered'] += elerium
+        for team in teams.values():
+            team['steps'] = dict(team['steps'])
+        return teams
+
+    def as_dict(self):
+        return {
+            'steps': self.steps,
+            'teams': self.summary(),
+            'drones': [stat.as_row() for stat in self.drones.values()],
+            'delivered': [{'step': step, 'team': team, 'elerium': elerium}
+                          for step, teams in sorted(self.delivered.items()) for team, elerium in teams.items()],
+        }
+
+    def write(self, path):
+        """
+        Writing telemetry, the format is chosen by the extension:
+        .json - everything in one file,
+        .csv - drones table, elerium delivered per step goes to <name>_delivered.csv next to it
+        :param path: str
+        """
+        data = self.as_dict()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=DRONE_FIELDS)
+                writer.writeheader()
+                writer.writerows(data['drones'])
+            with open(os.path.splitext(path)[0] + '_delivered.csv', 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=['step', 'team', 'elerium'])
+                writer.writeheader()
+                writer.writerows(data['delivered'])
+        else:
+            with open(path, 'w') as file:
+                json.dump(data, file, indent=2)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Elo tournament between the teams.
+
+Every round is played on its own seed. Round-robin plays every pair of teams
+in both orders, free-for-all plays all teams in every rotation of their
+order. Seats rotate over the corners (top left, top right, bottom left,
+bottom right): in one round a pair plays one order in the top corners and
+the other one in the bottom corners, the next round swaps the rows, and
+free-for-all of fewer than four teams leaves a different corner empty every
+round, so over the rounds every team starts from every corner. Matches run
+on a process pool, ratings are updated as soon as a result comes and saved
+after every match together with the matches already counted, so an
+interrupted tournament goes on with the matches it has not played yet:
+
+    $ python -m arena.tournament --rounds 20 --mode both --ratings ratings.json
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from itertools import combinations
+from multiprocessing import Pool, cpu_count
+
+from game import CORNERS, FIELD, NUMBER_OF_DRONES, TEAMS
+
+from .runner import run_match
+
+START_RATING = 700
+K_FACTOR = 32
+# corners of a pair: the top row, the bottom row
+PAIR_SEATS = ((0, 1), (2, 3))
+
+
+def expected_score(rating, other):
+    return 1.0 / (1.0 + 10 ** ((other - rating) / 400.0))
+
+
+def match_key(seed, teams, corners):
+    """
+    :param seed: int
+    :param teams: names of teams in their order
+    :param corners: corner of every team, see game.CORNERS
+    :return: str, the match of the schedule
+    """
+    return '%d:%s' % (seed, ','.join('%s@%d' % (team, corner) for team, corner in zip(teams, corners)))
+
+
+def match_scores(result):
+    """
+    Pairwise scores of a match, the team with more elerium wins the pair
+    :param result: arena.runner.run_match() result
+    :return: list() of (team, other, score of team: 1, 0.5 or 0)
+    """
+    teams = result['teams']
+    scores = []
+    for team, other in combinations(sorted(teams), 2):
+        elerium, other_elerium = teams[team]['elerium'], teams[other]['elerium']
+        scores.append((team, other, 1.0 if elerium > other_elerium else 0.5 if elerium == other_elerium else 0.0))
+    return scores
+
+
+class Ratings:
+    """
+    Elo ratings of teams, kept in a JSON file
+    Free-for-all matches are counted as games between every pair of teams,
+    with K divided by the number of opponents
+    """
+
+    def __init__(self, path=None, k_factor=K_FACTOR, start=START_RATING):
+        self.path = path
+        self.k_factor = k_factor
+        self.start = start
+        self.ratings = {}
+        self.games = defaultdict(int)
+        self.score = defaultdict(float)
+        # match_key() of the matches already counted
+        self.played = set()
+        if path and os.path.exists(path):
+            with open(path) as file:
+                data = json.load(file)
+            self.ratings.update(data.get('ratings', {}))
+            self.games.update(data.get('games', {}))
+            self.score.update(data.get('score', {}))
+            self.played.update(data.get('played', []))
+
+    def rating(self, team):
+        return self.ratings.get(team, self.start)
+
+    def counted(self, seed, teams, corners):
+        """
+        :param seed: int
+        :param teams: drone classes in their order
+        :param corners: corner of every team, see game.CORNERS
+        :return: bool, the match is already counted in the ratings
+        """
+        return match_key(seed, [team.__name__ for team in teams], corners) in self.played
+
+    def update(self, result):
+        """
+        :param result: arena.runner.run_match() result, its teams go in the order of their corners
+        """
+        self.played.add(match_key(result['seed'], result['teams'], result['corners']))
+        scores = match_scores(result)
+        k_factor = self.k_factor / max(len(result['teams']) - 1, 1)
+        deltas = defaultdict(float)
+        for team, other, score in scores:
+            change = k_factor * (score - expected_score(self.rating(team), self.rating(other)))
+            deltas[team] += change
+            deltas[other] -= change
+            self.games[team] += 1
+            self.games[other] += 1
+            self.score[team] += score
+            self.score[other] += 1.0 - score
+        # ratings of one match are updated together, the order of pairs does not matter
+        for team, delta in deltas.items():
+            self.ratings[team] = self.rating(team) + delta
+
+    def save(self):
+        if not self.path:
+            return
+        data = {'ratings': self.ratings, 'games': dict(self.games), 'score': dict(self.score),
+                'played': sorted(self.played)}
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+
+def schedule(teams, rounds, seed=0, mode='both'):
+    """
+    Matches of the tournament
+    :param teams: drone classes
+    :param rounds: int, each round is played on its own seed
+    :param seed: int, seed of the first round
+    :param mode: 'rr' - round-robin, 'ffa' - free-for-all, 'both'
+    :return: list() of (seed, teams, corner of every team)
+    """
+    matches = []
+    for number, seed in enumerate(range(seed, seed + rounds)):
+        if mode in ('rr', 'both'):
+            for team, other in combinations(teams, 2):
+                matches.append((seed, (team, other), seats(2, number)))
+                matches.append((seed, (other, team), seats(2, number + 1)))
+        if mode in ('ffa', 'both'):
+            for shift in range(len(teams)):
+                matches.append((seed, tuple(teams[shift:]) + tuple(teams[:shift]), seats(len(teams), number)))
+    return matches
+
+
+def seats(number, shift):
+    """
+    Corners of the teams of a match, rotated over the rounds
+    :param number: int, teams in the match
+    :param shift: int, the round
+    :return: tuple() of corners, ascending
+    """
+    if number == 2:
+        return PAIR_SEATS[shift % len(PAIR_SEATS)]
+    shift %= len(CORNERS)
+    return tuple(sorted((CORNERS[shift:] + CORNERS[:shift])[:number]))
+
+
+def _play(args):
+    seed, teams, corners, number_of_drones, field = args
+    return run_match(seed, teams=teams, number_of_drones=number_of_drones, field=field, corners=corners)
+
+
+def run_tournament(matches, ratings, number_of_drones=NUMBER_OF_DRONES, processes=None, field=FIELD):
+    """
+    Playing matches over a process pool and updating ratings as results come,
+    matches already counted in the ratings are skipped
+    :param matches: schedule() result
+    :param ratings: Ratings()
+    :param number_of_drones: int, drones in every team
+    :param processes: int, workers count, all cores by default
+    :param field: (width, height) of the field
+    :return: generator of run_match() results, ratings are already updated with each of them
+    """
+    tasks = [(seed, teams, corners, number_of_drones, field) for seed, teams, corners in matches
+             if not ratings.counted(seed, teams, corners)]
+    with Pool(processes=processes or cpu_count()) as pool:
+        for result in pool.imap_unordered(_play, tasks):
+            ratings.update(result)
+            ratings.save()
+            yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play an Elo tournament between the teams over a process pool')
+    parser.add_argument('-n', '--rounds', type=int, default=10)
+    parser.add_argument('-m', '--mode', choices=('rr', 'ffa', 'both'), default='both',
+                        help='round-robin of pairs, free-for-all of all teams or both')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed of the first round')
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('-d', '--drones', type=int, default=NUMBER_OF_DRONES)
+    parser.add_argument('-f', '--field', type=int, nargs=2, default=FIELD, metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('-r', '--ratings', default='ratings.json', help='ratings file, loaded and updated')
+    parser.add_argument('-k', '--k-factor', type=float, default=K_FACTOR)
+    parser.add_argument('--fresh', action='store_true', help='start all teams from %d' % START_RATING)
+    args = parser.parse_args()
+
+    ratings = Ratings(None if args.fresh else args.ratings, k_factor=args.k_factor)
+    ratings.path = args.ratings
+    before = {team.__name__: ratings.rating(team.__name__) for team in TEAMS}
+    matches = schedule(TEAMS, args.rounds, seed=args.seed, mode=args.mode)
+    counted = sum(1 for match in matches if ratings.counted(*match))
+    if counted:
+        print('{} of {} matches are already counted in {}'.format(counted, len(matches), args.ratings))
+
+    started = time.perf_counter()
+    for number, result in enumerate(run_tournament(matches, ratings, number_of_drones=args.drones,
+                                                   processes=args.processes, field=tuple(args.field)), 1):
+        line = ', '.join('{} {}'.format(team, stat['elerium']) for team, stat in result['teams'].items())
+        print('{:>5}/{} seed {:>6}: {}'.format(counted + number, len(matches), result['seed'], line))
+
+    print('\n{} matches in {:.1f}s'.format(len(matches) - counted, time.perf_counter() - started))
+    print('{:<20}{:>10}{:>10}{:>8}{:>9}'.format('team', 'rating', 'change', 'games', 'score'))
+    for team in sorted(before, key=lambda team: -ratings.rating(team)):
+        games = ratings.games[team]
+        print('{:<20}{:>10.1f}{:>+10.1f}{:>8}{:>8.1f}%'.format(
+            team, ratings.rating(team), ratings.rating(team) - before[team], games,
+            100.0 * ratings.score[team] / games if games else 0.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,38 @@
 # -*- coding: utf-8 -*-
+from collections import defaultdict, deque
 from random import randint, choice, uniform, shuffle
 
 import math
-from astrobox.core import Drone, Asteroid
+import numpy as np
+from astrobox.core import Drone, Asteroid, MotherShip
 from astrobox.themes.default import MOTHERSHIP_HEALING_DISTANCE
 from robogame_engine import GameObject
 from robogame_engine.geometry import Point, Vector, normalise_angle
 from robogame_engine.theme import theme
 
+from world.events import AsteroidEmptied, AsteroidsDepleted, DroneDied, MothershipEmptied
+from world.resources import CARGO_STATES, cargo_state
+from world.state import get_events, get_snapshot, get_team_state, run_planner
+
+# Сколько команд дрон может выполнить за один вызов next_action
+ACTIONS_BUDGET = 50
+
+
+class Action:
+    """
+    Команда солдату.
+
+    name - название команды (move, load, unload, ...);
+    object - объект команды;
+    is_performed - состояние команды для move и move to: 1 - еще не начата.
+    """
+    __slots__ = ('name', 'object', 'is_performed')
+
+    def __init__(self, name, object, is_performed=1):
+        self.name = name
+        self.object = object
+        self.is_performed = is_performed
+
 
 class Headquarters:
     """
@@ -29,73 +54,118 @@ class Headquarters:
     it is free - астеройд свободен для других дронов.
     Команды помещаются в очередь и выполняются последовательно.
     """
-    roles = {}
-    asteroids_for_basa = []
-    moves_empty = 0
-    moves_semi_empty = 0
-    moves_full = 0
 
     def __init__(self):
         self.soldiers = []
         self.asteroids_in_work = []
         self.victims = []
+        # роль -> квота и текущее количество живых солдат в ней
+        self.roles = {}
+        self.role_counts = defaultdict(int)
+        self.alive_soldiers = 0
+        self.have_gun = True
+        self.phase = 'harvest'
+        self.asteroids_for_basa = []
+        # сколько пролетели солдаты, по заполненности трюма
+        self.moves = dict.fromkeys(CARGO_STATES, 0)
+        # шаг игры -> сколько команд выполнили солдаты
+        self.actions_per_step = defaultdict(int)
 
     def new_soldier(self, soldier):
-        number_drones = len(self.soldiers)
-        self.get_roles(number_drones + 1, soldier.have_gun)
+        if not self.soldiers:
+            events = get_events(soldier.scene)
+            events.subscribe(AsteroidEmptied, self.on_source_emptied)
+            events.subscribe(MothershipEmptied, self.on_source_emptied)
+            events.subscribe(DroneDied, self.on_drone_died)
+            events.subscribe(AsteroidsDepleted, self.on_asteroids_depleted)
         self.add_soldier(soldier)
-        for idx, soldier in enumerate(self.soldiers):
-            self.give_role(soldier, idx)
-
-    def give_role(self, soldier, index):
-        all_roles = [Spy for _ in range(self.roles["spy"])]
-        all_roles.extend([Transport for _ in range(self.roles["transport"])])
-        all_roles.extend([CombatBot for _ in range(self.roles["combat"])])
-        all_roles.extend([Collector for _ in range(self.roles["collector"])])
-        all_roles.extend([BaseGuard for _ in range(self.roles["base guard"])])
-        all_roles.extend([Turel for _ in range(self.roles["turel"])])
-        this_role = all_roles[index]
-        soldier.role = this_role(unit=soldier)
-
-    def get_roles(self, number_drones, have_gun):
-        if have_gun:
-            transports = 0
-            collectors = 5
-            combats = 0
-            spy = 0
-            turel = 0
-            guard = max(0, number_drones - collectors - spy - turel - transports - combats)
-            Headquarters.roles["collector"] = collectors
-            Headquarters.roles["transport"] = transports
-            Headquarters.roles["spy"] = spy
-            Headquarters.roles["combat"] = combats
-            Headquarters.roles["base guard"] = guard
-            Headquarters.roles["turel"] = turel
-        else:
-            collectors = number_drones
-            Headquarters.roles["collector"] = collectors
-            Headquarters.roles["transport"] = 0
-            Headquarters.roles["spy"] = 0
-            Headquarters.roles["combat"] = 0
-            Headquarters.roles["base guard"] = 0
-            Headquarters.roles["turel"] = 0
+        self.alive_soldiers += 1
+        self.have_gun = soldier.have_gun
+        self.roles = self.get_quotas(self.alive_soldiers, self.have_gun)
+        self.give_role(soldier)
+        self.rebalance()
+
+    def get_quotas(self, number_drones, have_gun):
+        """
+        Сколько солдат нужно в каждой роли в текущей фазе игры
+
+        :param number_drones: сколько живых солдат в команде
+        :param have_gun: есть ли у солдат оружие
+        :return: dict роль -> количество солдат
+        """
+        quotas = ROLE_QUOTAS[self.phase] if have_gun else UNARMED_ROLE_QUOTAS
+        roles = {}
+        left = number_drones
+        for idx, (role, ratio, minimum) in enumerate(quotas):
+            if idx == len(quotas) - 1:
+                count = left
+            else:
+                count = min(left, max(minimum, int(number_drones * ratio)))
+            roles[role] = count
+            left -= count
+        return roles
+
+    def give_role(self, soldier):
+        """
+        Новый солдат получает роль, в которой больше всего не хватает солдат
+        """
+        if not self.roles:
+            self.set_role(soldier, Collector(unit=soldier))
+            return
+        role = max(self.roles, key=lambda other: self.roles[other] - self.role_counts[other])
+        self.set_role(soldier, role(unit=soldier))
+
+    def set_role(self, soldier, role):
+        if soldier.role is not None:
+            self.role_counts[type(soldier.role)] -= 1
+        soldier.role = role
+        self.role_counts[type(role)] += 1
+
+    def rebalance(self):
+        """
+        Перевод солдат из ролей сверх квоты в роли, где солдат не хватает.
+        Солдаты перебираются, только если какая-то квота превышена
+        """
+        if all(self.role_counts[role] <= count for role, count in self.roles.items()):
+            return
+        for soldier in reversed(self.soldiers):
+            if not soldier.is_alive:
+                continue
+            role = type(soldier.role)
+            if role not in self.roles or self.role_counts[role] <= self.roles[role]:
+                continue
+            lacking = [other for other, count in self.roles.items() if self.role_counts[other] < count]
+            if not lacking:
+                break
+            self.set_role(soldier, lacking[0](unit=soldier))
+
+    def update_quotas(self):
+        """
+        Пересчет квот под текущую фазу и число живых солдат, лишние солдаты переходят в недостающие роли
+        """
+        self.roles = self.get_quotas(self.alive_soldiers, self.have_gun)
+        self.rebalance()
+
+    def on_asteroids_depleted(self, event):
+        self.phase = 'battle'
+        self.update_quotas()
 
     def add_soldier(self, soldier):
         soldier.headquarters = self
-        soldier.actions = []
+        soldier.actions = deque()
         soldier.basa = None
         soldier.old_asteroid = None
         self.soldiers.append(soldier)
 
     def get_actions(self, soldier):
 
-        enemies = self.get_enemies(soldier)
+        enemies = self.get_enemies(soldier, k=1)
         if len([1 for s in self.soldiers if s.is_alive]) <= 2 \
                 and not isinstance(soldier.role, Turel) \
                 and len(enemies) > 0 \
                 and soldier.have_gun:
             soldier.role.change_role(Turel)
-            soldier.actions.append(['move', soldier.my_mothership, 1])
+            soldier.actions.append(Action('move', soldier.my_mothership))
             return
 
         if (isinstance(soldier.role, Collector) and not isinstance(soldier.role, Transport)
@@ -109,7 +179,7 @@ class Headquarters:
                     break
 
         if soldier.meter_2 < soldier.limit_health:
-            soldier.actions.append(['move', soldier.my_mothership, 1])
+            soldier.actions.append(Action('move', soldier.my_mothership))
             return
 
         purpose = soldier.role.next_purpose()
@@ -126,30 +196,51 @@ class Headquarters:
             soldier.role.change_role()
 
     def get_enemies_by_base(self, base, nearest=True):
-        enemies = self.get_enemies(base)
+        if nearest:
+            enemies = self.get_enemies(base, radius=MOTHERSHIP_HEALING_DISTANCE * 2)
+        else:
+            enemies = self.get_enemies(base, k=1)
         result = []
         for enemy in enemies:
             if enemy[1] < MOTHERSHIP_HEALING_DISTANCE * 2 or not nearest:
                 result.append(enemy[0])
         return result
 
-    def get_enemies(self, soldier):
-        enemies = [(drone, soldier.distance_to(drone)) for drone in soldier.scene.drones if
-                   soldier.team != drone.team and drone.is_alive]
-        enemies.sort(key=lambda x: x[1])
-        return enemies
+    def get_enemies(self, soldier, k=None, radius=None):
+        """
+        Ближайшие живые дроны противника
+
+        :param soldier: дрон или база, от которых ведется поиск
+        :param k: сколько ближайших вернуть, None - всех
+        :param radius: радиус поиска, None - все поле
+        :return: list из (дрон, расстояние), отсортированный по расстоянию
+        """
+        return get_snapshot(soldier.scene).threats.nearest(soldier, k=k, radius=radius)
 
-    def get_bases(self, soldier):
-        bases = [(base, soldier.distance_to(base)) for base in soldier.scene.motherships if
-                 base.team != soldier.team and base.is_alive]
-        bases.sort(key=lambda x: x[1])
-        return bases
+    def get_bases(self, soldier, k=None):
+        team = soldier.team
+        return get_snapshot(soldier.scene).grid.nearest(
+            soldier, k=k,
+            predicate=lambda obj: isinstance(obj, MotherShip) and obj.team != team and obj.is_alive)
 
     def remove_item_asteroids_in_work(self, item):
         if item in self.asteroids_in_work:
             idx = self.asteroids_in_work.index(item)
             self.asteroids_in_work.pop(idx)
 
+    def on_source_emptied(self, event):
+        # На пустом объекте работать некому, освобождаем его
+        self.asteroids_in_work = [item for item in self.asteroids_in_work if item is not event.source]
+
+    def on_drone_died(self, event):
+        drone = event.source
+        if drone in self.victims:
+            self.victims.remove(drone)
+        if getattr(drone, 'headquarters', None) is self:
+            self.alive_soldiers -= 1
+            self.role_counts[type(drone.role)] -= 1
+            self.update_quotas()
+
     def get_place_for_attack(self, soldier, target):
         """
         Выбор места для атаки цели, если цель не в радиусе атаки
@@ -172,23 +263,25 @@ class Headquarters:
         purpose = Point(target.coord.x + vec_gunshot.x, target.coord.y + vec_gunshot.y)
         angles = [0, 60, -60, 30, -30]
         shuffle(angles)
-        for ang in angles:
-            place = self.get_place_near(purpose, target, ang)
-            if place and soldier.valide_place(place):
-                return place
+        # Все места проверяем разом, берем первое подходящее в порядке angles
+        xs, ys = self.get_places_near(purpose, target, angles)
+        valide = np.flatnonzero(soldier.valide_places(xs, ys))
+        if len(valide):
+            return Point(xs[valide[0]], ys[valide[0]])
         return None
 
-    def get_place_near(self, point, target, angle):
+    def get_places_near(self, point, target, angles):
         """
-        Расчет места рядом с point с отклонением angle от цели target
+        Расчет мест рядом с point с отклонениями angles от цели target
         :param point:
         :param target:
-        :param angle:
-        :return: new place point
+        :param angles: list отклонений в градусах
+        :return: (x, y) - numpy массивы координат мест
         """
-        vec = Vector(point.x - target.x, point.y - target.y)
-        vec.rotate(angle)
-        return Point(target.x + vec.x, target.y + vec.y)
+        radians = np.radians(angles)
+        dx, dy = point.x - target.x, point.y - target.y
+        cos, sin = np.cos(radians), np.sin(radians)
+        return target.x + dx * cos - dy * sin, target.y + dx * sin + dy * cos
 
     def get_place_near_mothership(self, soldier):
         center_field = Point(theme.FIELD_WIDTH // 2, theme.FIELD_HEIGHT // 2)
@@ -201,35 +294,35 @@ class Headquarters:
         return position
 
     def save_static_move(self, soldier, purpose):
-        length = soldier.distance_to(purpose)
-        if soldier.is_empty:
-            self.moves_empty += length
-        elif soldier.free_space > 0:
-            self.moves_semi_empty += length
-        elif soldier.is_full:
-            self.moves_full += length
+        self.moves[cargo_state(soldier)] += soldier.distance_to(purpose)
+
+    def count_action(self, step):
+        self.actions_per_step[step] += 1
 
     def print_statistic(self):
         print("\nСтатистика:")
-        print("Пустой: ", round(self.moves_empty))
-        print("Недогруженный: ", round(self.moves_semi_empty))
-        print("Полный: ", round(self.moves_full))
+        print("Пустой: ", round(self.moves['empty']))
+        print("Недогруженный: ", round(self.moves['semi']))
+        print("Полный: ", round(self.moves['full']))
+        if self.actions_per_step:
+            print("Команд за шаг, максимум: ", max(self.actions_per_step.values()))
 
 
 class DevastatorDrone(Drone):
-    actions = []
+    actions = None
     headquarters = None
     attack_range = 0
     limit_health = 0.5
     cost_forpost = 0
     role = None
+    # последние команды от штаба, (название, объект)
+    last_actions = ()
 
     # team_number нельзя переопределять - надо в библе сделать это _team_number а лучше __team_number
 
     def registration(self):
-        if DevastatorDrone.headquarters is None:
-            DevastatorDrone.headquarters = Headquarters()
-        DevastatorDrone.headquarters.new_soldier(self)
+        # Штаб у каждой команды свой и живет, пока жива сцена
+        get_team_state(self.scene, self.team, Headquarters).new_soldier(self)
 
     def born_soldier(self):
         self.registration()
@@ -239,74 +332,136 @@ class DevastatorDrone(Drone):
         self.limit_health = uniform(0.3, 0.5)
 
         if isinstance(self.role, Transport):
-            candidats_asteroids_for_basa = min([(asteroid.distance_to(self.my_mothership), asteroid)
-                                                for asteroid in self.asteroids if
-                                                asteroid not in self.asteroids_for_basa])
-
-            candidat_basa = candidats_asteroids_for_basa[1]
+            distances = get_snapshot(self.scene).distances
+            candidat_basa = next(asteroid for asteroid in distances.neighbours(self.my_mothership)
+                                 if isinstance(asteroid, Asteroid) and asteroid not in self.asteroids_for_basa)
             self.add_basa(candidat_basa)
             self.basa = candidat_basa
         else:
             self.basa = self.my_mothership
 
     def next_action(self):
-        i = 0
-        while not self.actions:
-            self.headquarters.get_actions(self)
-            i += 1
-            if i > 5:
-                return
-
-        action, object, is_performed = self.actions[0]
-        if action == "move":
-            if is_performed:
-                self.actions[0][2] = 0
-                self.move_to(object)
-            else:
-                self.actions.pop(0)
-                self.next_action()
-
-        elif action == "unload":
-            self.actions.pop(0)
-            self.unload_to(object)
-
-        elif action == "load":
-            self.actions.pop(0)
-            self.load_from(object)
-
-        elif action == "it is free":
-            self.actions.pop(0)
-            self.asteroid_is_free(object)
-            self.next_action()
-
-        elif action == "turn":
-            self.actions.pop(0)
-            self.turn_to(object)
-
-        elif action == "shoot":
-            self.actions.pop(0)
-            self.shoot(object)
-            self.next_action()
-
-        elif action == "move to":
-            if is_performed == 1:
-                self.actions[0][2] = 2
-                self.move_to_step(object)
-            else:
-                self.actions.pop(0)
-                self.next_action()
-
-        elif action == "pass":
-            self.actions.pop(0)
-            self.move_to_step(self.coord)
-
-        else:
-            # Пропускаем неизвестную команду
-            self.actions.pop(0)
-            self.next_action()
-
-        if isinstance(object, Asteroid):
-            self.old_asteroid = object
+        """
+        Выполнение команд из очереди, пока одна из них не отдаст дрону приказ движку.
+        Если очередь пуста, штаб заполняет ее, но не больше 6 раз подряд.
+        За один вызов выполняется не больше ACTIONS_BUDGET команд.
+        """
+        first_asteroid = None
+        budget = ACTIONS_BUDGET
+        while budget > 0:
+            attempts = 0
+            while not self.actions:
+                self.plan_actions()
+                attempts += 1
+                if attempts > 5:
+                    break
+            if not self.actions:
+                break
+
+            action = self.actions[0]
+            handler = self.action_handlers.get(action.name, DevastatorDrone._skip_action)
+            budget -= 1
+            self.headquarters.count_action(self.scene._step)
+            if first_asteroid is None and isinstance(action.object, Asteroid):
+                first_asteroid = action.object
+            if not handler(self, action):
+                break
+
+        if first_asteroid is not None:
+            self.old_asteroid = first_asteroid
+
+    def plan_actions(self):
+        """
+        Команды от штаба. Если команда превысила бюджет времени на шаг игры,
+        до конца шага солдат повторяет свои последние команды, которые еще можно выполнить,
+        а если таких нет - летит за элериумом к ближайшему астеройду или на базу.
+        """
+        run_planner(self.scene, self.team, self._plan_actions, self._repeat_actions)
+
+    def _plan_actions(self):
+        self.headquarters.get_actions(self)
+        if self.actions:
+            self.last_actions = [(action.name, action.object) for action in self.actions]
+
+    def _repeat_actions(self):
+        # цели, которые уже не годятся: мертвые противники и пустые источники вместе с полетом к ним
+        invalid = {id(object) for name, object in self.last_actions
+                   if (name in ('shoot', 'turn') and not getattr(object, 'is_alive', True))
+                   or (name == 'load' and object.payload == 0)}
+        actions = [(name, object) for name, object in self.last_actions if id(object) not in invalid]
+        if not actions:
+            actions = self._fallback_actions()
+        self.actions.extend(Action(name, object) for name, object in actions)
+
+    def _fallback_actions(self):
+        asteroids = get_snapshot(self.scene).asteroids
+        if not self.is_full and asteroids:
+            asteroid = min(asteroids, key=self.distance_to)
+            return [('move', asteroid), ('load', asteroid)]
+        return [('move', self.my_mothership), ('unload', self.my_mothership)]
+
+    # Обработчики команд, возвращают True, если можно сразу выполнять следующую команду
+    def _move_action(self, action):
+        if action.is_performed:
+            action.is_performed = 0
+            self.move_to(action.object)
+            return False
+        self.actions.popleft()
+        return True
+
+    def _unload_action(self, action):
+        self.actions.popleft()
+        self.unload_to(action.object)
+        return False
+
+    def _load_action(self, action):
+        self.actions.popleft()
+        self.load_from(action.object)
+        return False
+
+    def _it_is_free_action(self, action):
+        self.actions.popleft()
+        self.asteroid_is_free(action.object)
+        return True
+
+    def _turn_action(self, action):
+        self.actions.popleft()
+        self.turn_to(action.object)
+        return False
+
+    def _shoot_action(self, action):
+        self.actions.popleft()
+        self.shoot(action.object)
+        return True
+
+    def _move_to_action(self, action):
+        if action.is_performed == 1:
+            action.is_performed = 2
+            self.move_to_step(action.object)
+            return False
+        self.actions.popleft()
+        return True
+
+    def _pass_action(self, action):
+        self.actions.popleft()
+        self.move_to_step(self.coord)
+        return False
+
+    def _skip_action(self, action):
+        # Пропускаем неизвестную команду
+        self.actions.popleft()
+        return True
+
+    action_handlers = {
+        'move': _move_action,
+        'unload': _unload_action,
+        'load': _load_action,
+        'it is free': _it_is_free_action,
+        'turn': _turn_action,
+        'shoot': _shoot_action,
+        'move to': _move_to_action,
+        'pass': _pass_action,
+    }
 
     def move_to(self, object):
         self.cost_forpost = 0
@@ -326,27 +481,19 @@ class DevastatorDrone(Drone):
             return
 
         if self.distance_to(self.my_mothership) < 150:
-            self.actions.append(["pass", self, 1])
+            self.actions.append(Action('pass', self))
             return
 
-        for partner in self.headquarters.soldiers:
-            if not partner.is_alive or partner is self:
-                continue
-
-            if isinstance(object, GameObject) and self.distance_to(object) > partner.distance_to(object) \
-                    and self.get_angle(partner, object) < 20 \
-                    and self.distance_to(partner) < self.distance_to(object) \
-                    and partner.distance_to(object) > 10 \
-                    and not isinstance(self.role, Turel):
-                point_attack = self.headquarters.get_place_for_attack(self, object)
-                if point_attack and self.cost_forpost < 10:
-                    self.actions.append(['move', point_attack, 1])
-                return
+        if isinstance(object, GameObject) and not isinstance(self.role, Turel) and self.partner_on_line_of_fire(object):
+            point_attack = self.headquarters.get_place_for_attack(self, object)
+            if point_attack and self.cost_forpost < 10:
+                self.actions.append(Action('move', point_attack))
+            return
 
         if not self.valide_place(self.coord):
             point_attack = self.headquarters.get_place_for_attack(self, object)
             if point_attack and self.cost_forpost < 10:
-                self.actions.append(['move', point_attack, 1])
+                self.actions.append(Action('move', point_attack))
 
         self.cost_forpost += 1
         self.gun.shot(object)
@@ -359,32 +506,51 @@ class DevastatorDrone(Drone):
         :return: True or False
         """
         # TODO - на линии огня не проанализирвать, т.к. не ясно где цель
+        return bool(self.valide_places(np.array([point.x]), np.array([point.y]))[0])
 
-        is_valide = 0 < point.x < theme.FIELD_WIDTH and 0 < point.y < theme.FIELD_HEIGHT
-        for partner in self.headquarters.soldiers:
-            if not partner.is_alive or partner is self:
-                continue
-
-            is_valide = is_valide and (partner.distance_to(point) >= self.save_distance)
-
+    def valide_places(self, xs, ys):
+        """
+        valide_place для многих мест сразу
+        :param xs: numpy массив x мест
+        :param ys: numpy массив y мест
+        :return: numpy массив True/False
+        """
+        is_valide = (0 < xs) & (xs < theme.FIELD_WIDTH) & (0 < ys) & (ys < theme.FIELD_HEIGHT)
+        partners_x, partners_y = self.get_partners_coords()
+        if len(partners_x):
+            distances = np.hypot(partners_x[None, :] - xs[:, None], partners_y[None, :] - ys[:, None])
+            is_valide &= (distances >= self.save_distance).all(axis=1)
         return is_valide
 
-    @property
-    def save_distance(self):
-        return 50  # abs(2 * self.gun.shot_distance * math.sin(10))
-
-    def get_angle(self, partner: GameObject, target: GameObject):
+    def get_partners_coords(self):
         """
-        Получает угол между векторами self-target и partner-target
+        Координаты живых партнеров
+        :return: (x, y) - numpy массивы
         """
+        partners = [partner for partner in self.headquarters.soldiers if partner.is_alive and partner is not self]
+        return np.array([p.x for p in partners], dtype=float), np.array([p.y for p in partners], dtype=float)
 
-        def scalar(vec1, vec2):
-            return vec1.x * vec2.x + vec1.y * vec2.y
+    def partner_on_line_of_fire(self, target):
+        """
+        Есть ли партнер между дроном и целью: ближе к цели, чем дрон, и под углом меньше 20 градусов
+        """
+        partners_x, partners_y = self.get_partners_coords()
+        if not len(partners_x):
+            return False
+        v12_x, v12_y = self.x - target.x, self.y - target.y
+        v32_x, v32_y = partners_x - target.x, partners_y - target.y
+        self_to_target = math.hypot(v12_x, v12_y)
+        partners_to_target = np.hypot(v32_x, v32_y)
+        self_to_partners = np.hypot(partners_x - self.x, partners_y - self.y)
+        _cos = (v12_x * v32_x + v12_y * v32_y) / (self_to_target * partners_to_target + 1.e-8)
+        angles = np.degrees(np.arccos(np.clip(_cos, -1.0, 1.0)))
+        on_line = (self_to_target > partners_to_target) & (angles < 20) \
+            & (self_to_partners < self_to_target) & (partners_to_target > 10)
+        return bool(on_line.any())
 
-        v12 = Vector(self.coord.x - target.coord.x, self.coord.y - target.coord.y)
-        v32 = Vector(partner.coord.x - target.coord.x, partner.coord.y - target.coord.y)
-        _cos = scalar(v12, v32) / (v12.module * v32.module + 1.e-8)
-        return math.degrees(math.acos(_cos))
+    @property
+    def save_distance(self):
+        return 50  # abs(2 * self.gun.shot_distance * math.sin(10))
 
     def add_basa(self, basa):
         self.headquarters.asteroids_for_basa.append(basa)
@@ -402,15 +568,16 @@ class DevastatorDrone(Drone):
     # callbacks:
     def on_born(self):
         self.born_soldier()
-        nearesst_aster = [(self.distance_to(aster), aster) for aster in self.asteroids]
-        nearesst_aster.sort(key=lambda x: x[0])
+        # Дроны рождаются на базе, поэтому ближайшие астеройды берем из таблицы расстояний от базы
+        distances = get_snapshot(self.scene).distances
+        nearesst_aster = [aster for aster in distances.neighbours(self.my_mothership) if isinstance(aster, Asteroid)]
         idx = len(self.headquarters.soldiers) - 1
         if self.have_gun:
-            point_attack = self.headquarters.get_place_for_attack(self, nearesst_aster[idx][1])
+            point_attack = self.headquarters.get_place_for_attack(self, nearesst_aster[idx % len(nearesst_aster)])
             if point_attack:
-                self.actions.append(['move to', point_attack, 1])
+                self.actions.append(Action('move to', point_attack))
         else:
-            self.actions.append(["move to", nearesst_aster[idx][1], 1])
+            self.actions.append(Action('move to', nearesst_aster[idx % len(nearesst_aster)]))
 
         self.next_action()
 
@@ -433,7 +600,8 @@ class DevastatorDrone(Drone):
         self.next_action()
 
     def on_wake_up(self):
-        self.actions = [["pass", self, 1]]
+        self.actions.clear()
+        self.actions.append(Action('pass', self))
         self.next_action()
 
 
@@ -445,9 +613,9 @@ class Behavior:
     def change_role(self, role=None):
         soldier = self.unit
         if not role:
-            soldier.role = soldier.role.next()
+            soldier.headquarters.set_role(soldier, soldier.role.next())
         else:
-            soldier.role = role(soldier)
+            soldier.headquarters.set_role(soldier, role(soldier))
 
     def next(self):
         return Collector(self.unit)
@@ -460,25 +628,21 @@ class Collector(Behavior):
             return self.unit.basa
 
         headquarters = self.unit.headquarters
-        forbidden_asteroids = list(headquarters.asteroids_in_work)
+        snapshot = get_snapshot(self.unit.scene)
+        forbidden_asteroids = set(headquarters.asteroids_in_work)
         if isinstance(self, Transport):
-            asteroids = [asteroid for asteroid in self.unit.scene.asteroids if asteroid not in forbidden_asteroids]
-            free_elerium = sum([asteroid.payload for asteroid in asteroids])
+            free_elerium = snapshot.resources.total - sum(asteroid.payload for asteroid in forbidden_asteroids
+                                                          if isinstance(asteroid, Asteroid))
             if free_elerium < 2000:
                 headquarters.asteroids_for_basa = []
                 self.unit.basa = self.unit.my_mothership
                 return None
             else:
-                forbidden_asteroids += headquarters.asteroids_for_basa
-
-        if not hasattr(self.unit.scene, "asteroids"):
-            return None
+                forbidden_asteroids.update(headquarters.asteroids_for_basa)
 
-        asteroids = [asteroid for asteroid in self.unit.scene.asteroids if asteroid not in forbidden_asteroids]
-        asteroids.extend([mothership for mothership in self.unit.scene.motherships
-                          if not mothership.is_alive and not mothership.is_empty])
-        asteroids.extend([drone for drone in self.unit.scene.drones
-                          if not drone.is_alive and not drone.is_empty])
+        asteroids = [asteroid for asteroid in snapshot.asteroids if asteroid not in forbidden_asteroids]
+        asteroids.extend(snapshot.dead_motherships)
+        asteroids.extend([drone for drone in snapshot.wrecks if not drone.is_empty])
 
         first_purpose = self.find_nearest_purpose(asteroids=asteroids, threshold=self.unit.free_space)
         if first_purpose:
@@ -492,7 +656,8 @@ class Collector(Behavior):
 
     def find_nearest_purpose(self, asteroids, threshold=1):
         soldier = self.unit
-        purposes = [(soldier.distance_to(asteroid) + asteroid.distance_to(soldier.basa), asteroid)
+        snapshot = get_snapshot(soldier.scene)
+        purposes = [(snapshot.distance(soldier, asteroid) + snapshot.distance(asteroid, soldier.basa), asteroid)
                     for asteroid in asteroids if
                     asteroid.payload >= threshold]
 
@@ -511,20 +676,20 @@ class Collector(Behavior):
 
     def next_step(self, purpose):
         soldier = self.unit
-        soldier.actions.append(['move', purpose, 1])
+        soldier.actions.append(Action('move', purpose))
         if purpose == soldier.basa:
             if not soldier.is_empty:
-                soldier.actions.append(['unload', purpose, 1])
+                soldier.actions.append(Action('unload', purpose))
             else:
                 if soldier.my_mothership.payload > 1000:
                     soldier.role.change_role()
                 return
         elif not soldier.is_full:
             soldier.headquarters.asteroids_in_work.append(purpose)
-            soldier.actions.append(['load', purpose, 1])
+            soldier.actions.append(Action('load', purpose))
         else:
-            soldier.actions.append(['unload', soldier.my_mothership, 1])
-        soldier.actions.append(['it is free', purpose, 1])
+            soldier.actions.append(Action('unload', soldier.my_mothership))
+        soldier.actions.append(Action('it is free', purpose))
 
         if purpose == soldier.old_asteroid:
             soldier.next_action()
@@ -551,10 +716,11 @@ class Demob(Behavior):
     def next_step(self, purpose):
         soldier = self.unit
         if soldier.distance_to(soldier.my_mothership) > 10:
-            soldier.actions = [['move', soldier.my_mothership, 1]]
+            soldier.actions.clear()
+            soldier.actions.append(Action('move', soldier.my_mothership))
 
         if not soldier.is_empty:
-            soldier.actions.append(['unload', self.unit.my_mothership, 1])
+            soldier.actions.append(Action('unload', self.unit.my_mothership))
 
     def next(self):
         return self
@@ -565,7 +731,7 @@ class Defender(Behavior):
     def __init__(self, unit: DevastatorDrone):
         super().__init__(unit)
         self.victim = None
-        self.unit.actions = []
+        self.unit.actions.clear()
 
     def next_purpose(self):
         if self.victim and self.victim.is_alive:
@@ -581,10 +747,10 @@ class Defender(Behavior):
         if soldier.distance_to(purpose) > soldier.attack_range:
             point_attack = soldier.headquarters.get_place_for_attack(soldier, purpose)
             if point_attack:
-                soldier.actions.append(['move to', point_attack, 1])
+                soldier.actions.append(Action('move to', point_attack))
 
-        soldier.actions.append(['turn', purpose, 1])
-        soldier.actions.append(['shoot', purpose, 1])
+        soldier.actions.append(Action('turn', purpose))
+        soldier.actions.append(Action('shoot', purpose))
 
     def next(self):
         return Collector(self.unit)
@@ -598,7 +764,7 @@ class CombatBot(Defender):
             return self.victim
 
         soldier = self.unit
-        enemies = soldier.headquarters.get_enemies(soldier)
+        enemies = soldier.headquarters.get_enemies(soldier, k=1)
         if enemies:
             self.victim = enemies[0][0]
             return self.victim
@@ -617,7 +783,7 @@ class Spy(Defender):
             return self.victim
 
         soldier = self.unit
-        bases = soldier.headquarters.get_bases(soldier)
+        bases = soldier.headquarters.get_bases(soldier, k=1)
         if bases:
             self.victim = bases[0][0]
             return self.victim
@@ -631,14 +797,14 @@ class Spy(Defender):
         if soldier.distance_to(target) > soldier.attack_range:
             point_attack = soldier.headquarters.get_place_for_attack(soldier, target)
             if point_attack:
-                soldier.actions.append(['move to', point_attack, 1])
+                soldier.actions.append(Action('move to', point_attack))
 
-        soldier.actions.append(['turn', target, 1])
-        soldier.actions.append(['shoot', target, 1])
+        soldier.actions.append(Action('turn', target))
+        soldier.actions.append(Action('shoot', target))
 
     def next(self):
         soldier = self.unit
-        enemies = soldier.headquarters.get_enemies(soldier)
+        enemies = soldier.headquarters.get_enemies(soldier, k=1)
         if enemies:
             return CombatBot(self.unit)
         return Collector(self.unit)
@@ -658,13 +824,13 @@ class BaseGuard(Defender):
         if soldier.distance_to(target) > soldier.attack_range:
             point_attack = soldier.headquarters.get_place_for_attack(soldier, target)
             if point_attack:
-                soldier.actions.append(['move to', point_attack, 1])
-        soldier.actions.append(['turn', target, 1])
-        soldier.actions.append(['shoot', target, 1])
+                soldier.actions.append(Action('move to', point_attack))
+        soldier.actions.append(Action('turn', target))
+        soldier.actions.append(Action('shoot', target))
 
     def next(self):
         soldier = self.unit
-        enemies = soldier.headquarters.get_enemies(soldier)
+        enemies = soldier.headquarters.get_enemies(soldier, k=1)
         if len(enemies) == 0:
             return Collector(self.unit)
         return Spy(self.unit)
@@ -674,7 +840,7 @@ class Turel(Defender):
 
     def next_purpose(self):
         soldier = self.unit
-        enemies = soldier.headquarters.get_enemies(soldier)
+        enemies = soldier.headquarters.get_enemies(soldier, k=1)
         if enemies:
             return enemies[0][0]
 
@@ -684,11 +850,21 @@ class Turel(Defender):
         soldier = self.unit
 
         if target:
-            soldier.actions.append(['turn', target, 1])
-            soldier.actions.append(['shoot', target, 1])
+            soldier.actions.append(Action('turn', target))
+            soldier.actions.append(Action('shoot', target))
         elif soldier.distance_to(soldier.my_mothership) > MOTHERSHIP_HEALING_DISTANCE * 0.95:
             point_attack = soldier.headquarters.get_place_near_mothership(soldier)
-            soldier.actions.append(['move', point_attack, 1])
+            soldier.actions.append(Action('move', point_attack))
 
     def next(self):
         return Collector(self.unit)
+
+
+# Доли ролей вооруженных солдат по фазам игры: (роль, доля, минимум), последней роли достается остаток.
+# harvest - пока есть элериум на астеройдах, battle - после этого: элериум остается только в обломках и базах,
+# большая часть солдат воюет, сборщики подбирают остатки.
+ROLE_QUOTAS = {
+    'harvest': [(Collector, 0.6, 5), (BaseGuard, 0.4, 0)],
+    'battle': [(CombatBot, 0.4, 1), (Spy, 0.2, 0), (BaseGuard, 0.2, 0), (Collector, 0.2, 0)],
+}
+UNARMED_ROLE_QUOTAS = [(Collector, 1.0, 0)]
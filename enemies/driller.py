@@ -1,6 +1,9 @@
-from .reaper import ReaperStrategy, ReaperDrone
+from astrobox.core import Asteroid, Drone, MotherShip
 from robogame_engine.theme import theme
 
+from world.state import get_snapshot
+from .reaper import ReaperStrategy, ReaperDrone
+
 
 class DrillerStrategy(ReaperStrategy):
     def distribute_harvest_sources(self, units):
@@ -14,17 +17,32 @@ class DrillerStrategy(ReaperStrategy):
                     self.data._targets[t] == u]) < u.cargo.payload:
                 return u
 
-    def get_harvest_target(self):
-        self.unit.pathfind.update_units(func=lambda u: not u.cargo.is_empty)
-        units = self.unit.pathfind.points
-        if not units:
-            return None
-        units.sort(key=lambda u: u.distance_to(self.unit))
+    def is_harvest_source(self, obj):
+        if obj.cargo.is_empty:
+            return False
+        if isinstance(obj, Asteroid):
+            return True
+        if isinstance(obj, MotherShip):
+            return not obj.is_alive and obj.team != self.unit.team
+        return isinstance(obj, Drone) and not obj.is_alive
+
+    # Planners are called through ReaperStrategy.get_harvest_target/get_unload_target, so the team is timed
+    # by the tick watchdog and falls back to cached_* over the budget
+
+    def find_harvest_target(self):
+        # Sources are walked from the nearest one and only until a free one is found
+        grid = get_snapshot(self.unit.scene).grid
+        units = (u for u, _ in grid.iter_nearest(self.unit, predicate=self.is_harvest_source))
+        return self.distribute_harvest_sources(units)
 
-        u = self.distribute_harvest_sources(units)
-        return u
+    def cached_harvest_target(self):
+        # Wrecks and dead motherships are sources too, the last target is kept while it is one
+        target = self._last_harvest_target
+        if target is not None and self.is_harvest_source(target):
+            return target
+        return super(DrillerStrategy, self).cached_harvest_target()
 
-    def get_unload_target(self):
+    def find_unload_target(self):
         return self.unit.mothership
 
 
@@ -1,43 +1,49 @@
 # -*- coding: utf-8 -*-
 
 import math
-from operator import mul
 
+import numpy as np
 from robogame_engine.geometry import Point
 from robogame_engine.theme import theme
 
+from world.events import DroneDied
+from world.state import get_events, get_snapshot, get_team_state, run_planner
+
 from .utils.dijkstra import Dijkstra
 from .utils.states import DroneStateIdle
 from .utils.strategies import Strategy, DroneUnitWithStrategies
 
 
 class ReaperStrategy(Strategy):
-    _distance_max = None
-    _distance_limit = None
 
     # Data contains information for team. It useful when
     # have more than one drone with that strategy
     class Data:
-        def __init__(self):
+        def __init__(self, scene):
             self._targets = {}
             self._drones = []
+            get_events(scene).subscribe(DroneDied, self.on_drone_died)
 
-    _data = {}
+        def on_drone_died(self, event):
+            # Dead drone does not harvest its target anymore
+            self._targets.pop(event.source.id, None)
 
     @property
     def data(self):
-        if ReaperStrategy._data.get(self.unit.team) is None:
-            ReaperStrategy._data[self.unit.team] = ReaperStrategy.Data()
-        return ReaperStrategy._data[self.unit.team]
+        # Data lives as long as the scene, see world.state
+        scene = self.unit.scene
+        return get_team_state(scene, self.unit.team, lambda: ReaperStrategy.Data(scene), key=ReaperStrategy.Data)
 
     def __init__(self, *args, **kwargs):
         self._stepnum = 0
         super(ReaperStrategy, self).__init__(*args, **kwargs)
-        if ReaperStrategy._distance_max is None:
-            ReaperStrategy._distance_max = math.sqrt(
-                theme.FIELD_HEIGHT * theme.FIELD_HEIGHT + theme.FIELD_WIDTH * theme.FIELD_WIDTH)
-        if ReaperStrategy._distance_limit is None:
-            ReaperStrategy._distance_limit = 0.25 * ReaperStrategy._distance_max
+        # Field size is set by the scene
+        self._distance_max = math.sqrt(
+            theme.FIELD_HEIGHT * theme.FIELD_HEIGHT + theme.FIELD_WIDTH * theme.FIELD_WIDTH)
+        self._distance_limit = 0.25 * self._distance_max
+        # Last planned targets, used when the team is over the tick budget
+        self._last_harvest_target = None
+        self._last_unload_target = None
 
         self.data._drones.append(self.unit)
 
@@ -49,22 +55,16 @@ class ReaperStrategy(Strategy):
         self.data._enemy_drones = [d for d in self.unit.scene.drones if d.team != self.unit.team]
 
     def weight_harvest_func(self, a, b):
+        # a and b are dijkstra.Nodes, all pairs are evaluated at once
         dist = a.distance_to(b)
         distlim = self._distance_limit
-        if b.cargo.fullness == 0.0 or b.__class__ == self.unit.mothership.__class__:
-            return float("inf")
-        amdist = a.distance_to(self.unit.mothership)
-        bmdist = b.distance_to(self.unit.mothership)
-        abdist = a.distance_to(b)
-        k = float(self._distance_max)
-        coef = [1.0 / distlim, 1.0]
-        values = [dist, 1.0 - b.cargo.fullness]
-        return sum(map(mul, coef, values))
+        weights = dist / distlim + (1.0 - b.fullness)
+        return np.where((b.fullness == 0.0) | b.is_mothership, np.inf, weights)
 
     def get_harvest_source(self):
         center_of_scene = Point(theme.FIELD_WIDTH / 2, theme.FIELD_HEIGHT / 2)
-        units = self.unit.pathfind.points
-        units.sort(key=lambda u: u.distance_to(self.unit.mothership))
+        # Sorted copy, points order must match the weights matrix
+        units = sorted(self.unit.pathfind.points, key=lambda u: u.distance_to(self.unit.mothership))
         units = [u for u in units if u != self.unit.mothership]
         return units[0] if units else None
 
@@ -79,6 +79,22 @@ class ReaperStrategy(Strategy):
         return None
 
     def get_harvest_target(self):
+        return run_planner(self.unit.scene, self.unit.team, self.plan_harvest_target, self.cached_harvest_target)
+
+    def plan_harvest_target(self):
+        self._last_harvest_target = self.find_harvest_target()
+        return self._last_harvest_target
+
+    def cached_harvest_target(self):
+        # Over the tick budget: the last target while it has elerium, else the nearest asteroid with it
+        target = self._last_harvest_target
+        if target is not None and not target.cargo.is_empty:
+            return target
+        asteroids = get_snapshot(self.unit.scene).asteroids
+        # None only when nothing is left, the planner finds nothing then as well
+        return min(asteroids, key=self.unit.distance_to) if asteroids else None
+
+    def find_harvest_target(self):
         self.unit.pathfind.update_units(func=lambda u: not u.cargo.is_empty)
 
         didx = self.data._drones.index(self.unit)
@@ -109,19 +125,32 @@ class ReaperStrategy(Strategy):
         return path[idx]
 
     def weight_unload_func(self, a, b):
-        if a == self.unit.mothership or b == self.unit.mothership:
-            return 0.0
+        # a and b are dijkstra.Nodes, all pairs are evaluated at once
+        mothership = self.unit.mothership
         dist = a.distance_to(b)
-        adist = self.unit.mothership.distance_to(a)
-        bdist = self.unit.mothership.distance_to(b)
-        coef = [bdist / adist, 1.0]
-        values = [dist, 1.0 - b.cargo.fullness]
-        return sum(map(mul, coef, values))
+        adist = np.hypot(a.x - mothership.x, a.y - mothership.y)
+        bdist = np.hypot(b.x - mothership.x, b.y - mothership.y)
+        weights = bdist / adist * dist + (1.0 - b.fullness)
+        return np.where(a.is_home | b.is_home, 0.0, weights)
 
     def get_unload_target(self):
+        return run_planner(self.unit.scene, self.unit.team, self.plan_unload_target, self.cached_unload_target)
+
+    def plan_unload_target(self):
+        self._last_unload_target = self.find_unload_target()
+        return self._last_unload_target
+
+    def cached_unload_target(self):
+        # Over the tick budget: the last target while it has free space, else the home mothership
+        target = self._last_unload_target
+        if target is not None and not target.cargo.is_full:
+            return target
+        return self.unit.mothership
+
+    def find_unload_target(self):
         if self.data._drones.index(self.unit) < 2:
             return self.unit.mothership
-        if len([a for a in self.unit.scene.asteroids if a.cargo.payload > 0]) == 0:
+        if get_snapshot(self.unit.scene).resources.nonempty == 0:
             return self.unit.mothership
 
         self.unit.pathfind_unload.update_units(func=lambda u: u.cargo.fullness < 1.0)
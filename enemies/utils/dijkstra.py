@@ -1,11 +1,49 @@
+import heapq
 import sys
 
+import numpy as np
+from astrobox.core import MotherShip
+
+from world.state import get_snapshot
+
+
+class Nodes:
+    """
+    Points of the graph as coordinate and cargo arrays.
+    Source nodes are shaped as a column and target nodes as a row,
+    so weight functions evaluate all pairs at once by broadcasting
+    """
+
+    def __init__(self, x, y, fullness, is_home, is_mothership):
+        self.x = x
+        self.y = y
+        self.fullness = fullness
+        self.is_home = is_home
+        self.is_mothership = is_mothership
+
+    @classmethod
+    def from_points(cls, points, home):
+        return cls(
+            x=np.array([p.x for p in points], dtype=float),
+            y=np.array([p.y for p in points], dtype=float),
+            fullness=np.array([p.cargo.fullness for p in points], dtype=float),
+            is_home=np.array([p is home for p in points], dtype=bool),
+            is_mothership=np.array([isinstance(p, MotherShip) for p in points], dtype=bool),
+        )
+
+    def reshape(self, *shape):
+        return Nodes(*(v.reshape(shape) for v in (self.x, self.y, self.fullness, self.is_home, self.is_mothership)))
+
+    def distance_to(self, other):
+        return np.hypot(self.x - other.x, self.y - other.y)
+
 
 class Dijkstra:
     def __init__(self, unit, points=None):
         self._unit = unit
         self._points = points if points else []
         self._weights = [[0.0 for _ in range(len(self._points))] for _ in range(len(self._points))]
+        self._index = self._build_index(self._points)
 
     @staticmethod
     def maxint():
@@ -19,6 +57,21 @@ class Dijkstra:
     def weights(self):
         return self._weights
 
+    @staticmethod
+    def _build_index(points):
+        index = {}
+        for k, p in enumerate(points):
+            index.setdefault(p, k)
+        return index
+
+    def _index_of(self, point):
+        k = self._index.get(point)
+        if k is None or self._points[k] is not point:
+            # Points were reordered in place by the caller
+            self._index = self._build_index(self._points)
+            k = self._index.get(point)
+        return k
+
     def _get_closest(self):
         if not self._unit.is_alive:
             return
@@ -34,49 +87,56 @@ class Dijkstra:
     def update_units(self, func=None):
         if func is None:
             func = lambda a: True
+        snapshot = get_snapshot(self._unit.scene)
         units = [self._unit.mothership, ]
-        units = units + [a for a in self._unit.scene.asteroids if func(a)]
-        units = units + [m for m in self._unit.scene.motherships if
+        units = units + [a for a in snapshot.all_asteroids if func(a)]
+        units = units + [m for m in snapshot.motherships.values() if
                          not m.is_alive and m.team != self._unit.team and func(m)]
-        units = units + [d for d in self._unit.scene.drones if not d.is_alive and func(d)]
+        units = units + [d for d in snapshot.wrecks if func(d)]
         weights = [[0.0 for _ in range(len(units))] for _ in range(len(units))]
 
         self._weights, self._points = weights, units
+        self._index = self._build_index(units)
         self._unit._path_closest = self._get_closest()
 
     def to_objects(self, indexes):
         return [self._points[n] for n in indexes]
 
+    @property
+    def trace(self):
+        return getattr(self._unit, '_logging', False)
+
     def weight_default_func(self, a, b):
-        return float(a.distance_to(b))
+        return a.distance_to(b)
 
     def calc_weights(self, func=None):
         if not self._unit.is_alive:
             return
         if func is None:
             func = self.weight_default_func
-        dump = []
-        for f, a in enumerate(self._points):
-            def map_func(t, b):
-                if f == t:
-                    self._weights[f][t] = 0.0
-                else:
-                    d = float(func(a, b))
-                    self._weights[f][t] = d
-
-            map(map_func, *zip(*enumerate(self._points)))
-            dump.append("%s %s" % (
-                self._unit.id, ",".join(["%8.2f" % d if d < float("inf") else "%8s"
-                                         for d in self._weights[f]])))
-            dump.append("")
+        size = len(self._points)
+        nodes = Nodes.from_points(self._points, self._unit.mothership)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = func(nodes.reshape(size, 1), nodes.reshape(1, size))
+        weights = np.array(np.broadcast_to(weights, (size, size)), dtype=float)
+        np.fill_diagonal(weights, 0.0)
+        self._weights = weights.tolist()
+        if self.trace:
+            dump = []
+            for row in self._weights:
+                dump.append("%s %s" % (
+                    self._unit.id, ",".join(["%8.2f" % d if d < float("inf") else "%8s" % d
+                                             for d in row])))
+            print("\n".join(dump))
 
     def find_path(self, pt_from, pt_to, as_objects=False, info=None):
         if not self._unit.is_alive:
             return
-        if pt_from not in self._points or pt_to not in self._points:
+        fi = self._index_of(pt_from)
+        fo = self._index_of(pt_to)
+        if fi is None or fo is None:
             print(pt_from, pt_to, self._points)
-        fi = self._points.index(pt_from)
-        fo = self._points.index(pt_to)
+            raise ValueError("{} is not in points".format(pt_to if fi is not None else pt_from))
         if info:
             info = [
                 "[{}:{}] {}->{} U:{} M:{}".format(
@@ -87,49 +147,53 @@ class Dijkstra:
             else:
                 return [fi, ]
 
-        visited = []
-        unvisited = [k for k, _ in enumerate(self._points)]
-
         FPREV = 0
         FCOST = 1
-        table = [[-1, float("inf")] for p in range(len(self._points))]
+        inf = float("inf")
+        size = len(self._points)
+        table = [[-1, inf] for _ in range(size)]
         table[fi][FCOST] = 0.0
+        visited = [False] * size
+        unvisited = size
+        first_unvisited = 0
+        queue = []
         root = fi
         lastroot = root
-        while len(unvisited):
-            visited.append(root)
-            unvisited.pop(unvisited.index(root))
-            if not unvisited:
+        while True:
+            visited[root] = True
+            unvisited -= 1
+            # Path to the target is settled and can not change anymore
+            if root == fo or not unvisited:
                 break
 
-            neighbors = [uv for uv in unvisited if self._weights[root][uv] < float("inf")]
-            midw = sum([self._weights[root][nb] for nb in neighbors]) / max(float(len(neighbors)), 1.0)
-            for nb in neighbors:
-                if root == fi and nb == fo:
-                    continue
-                if self._weights[root][nb] >= midw:
-                    continue
-                cost = table[root][FCOST] + self._weights[root][nb]
-                if cost < table[nb][FCOST]:
-                    table[nb][FCOST] = cost
-                    table[nb][FPREV] = root
-
-            shortest = float("inf")
+            root_cost = table[root][FCOST]
+            if root_cost < inf:
+                weights = self._weights[root]
+                neighbors = [uv for uv in range(size) if not visited[uv] and weights[uv] < inf]
+                midw = sum([weights[nb] for nb in neighbors]) / max(float(len(neighbors)), 1.0)
+                for nb in neighbors:
+                    if root == fi and nb == fo:
+                        continue
+                    if weights[nb] >= midw:
+                        continue
+                    cost = root_cost + weights[nb]
+                    if cost < table[nb][FCOST]:
+                        table[nb][FCOST] = cost
+                        table[nb][FPREV] = root
+                        heapq.heappush(queue, (cost, nb))
+
             lastroot = root
-            for uv in unvisited:
-                if uv == lastroot:
-                    continue
-                # Found minimal cost vertex
-                if table[uv][FCOST] < shortest:
-                    shortest = table[uv][FCOST]
-                    root = uv
-            # FIXME
-            if root == lastroot:
-                if unvisited:
-                    root = unvisited[0]
-                else:
-                    break
-        if table[root][FCOST] == float("inf"):
+            # Minimal cost vertex, the lowest index wins on equal costs
+            while queue and visited[queue[0][1]]:
+                heapq.heappop(queue)
+            if queue:
+                root = heapq.heappop(queue)[1]
+            else:
+                # FIXME: nothing is reachable, take the first unvisited vertex
+                while visited[first_unvisited]:
+                    first_unvisited += 1
+                root = first_unvisited
+        if not unvisited and table[root][FCOST] == inf:
             table[root][FCOST] = table[lastroot][FCOST] + self._weights[lastroot][root]
             table[root][FPREV] = lastroot
         if info:
@@ -6,6 +6,8 @@ from astrobox.cargo import CargoTransition
 from robogame_engine.geometry import Point, Vector
 from robogame_engine.theme import theme
 
+from world.state import get_snapshot
+
 
 def get_point_on_way_to(unit, target, at_distance=None):
     if at_distance is None:
@@ -40,13 +42,14 @@ class DroneState(object):
     def game_step(self):
         self._ttl = self._ttl + 1
 
-    def sources(self):
-        _sources = self.scene.asteroids
-        _sources = _sources + [m for m in self.unit.scene.motherships
-                               if not m.is_alive and m.team != self.unit.team]
-        _sources = _sources + [d for d in self.unit.scene.drones if not d.is_alive]
-        has_sources = len([s for s in _sources if s.cargo.payload > 0]) > 0
-        return has_sources, _sources
+    def has_sources(self):
+        resources = get_snapshot(self.scene).resources
+        sources = resources.nonempty + resources.loot_sources
+        mothership = self.unit.mothership
+        if not mothership.is_alive and resources.payload(mothership) > 0:
+            # own dead mothership is not a source
+            sources -= 1
+        return sources > 0
 
 
 class DroneStateNone(DroneState):
@@ -66,7 +69,7 @@ class DroneStateIdle(DroneState):
         # if self.unit.health < 0.6 \
         #         and self.unit.distance_to(self.unit.mothership) > theme.MOTHERSHIP_HEALING_DISTANCE:
         #     return DroneStateRunout
-        has_sources, sources = self.sources()
+        has_sources = self.has_sources()
         k = 0.75 if self.strategy._stepnum < 250 else 0.99
         if self.unit.cargo.fullness < k:
             if has_sources:
@@ -152,7 +155,7 @@ class DroneStateHarvest(DroneState):
             return DroneStateIdle
         if self._transition and self._transition.is_finished:
             return DroneStateUnload
-        has_sources, sources = self.sources()
+        has_sources = self.has_sources()
         if not has_sources:
             if self.unit.cargo.is_empty:
                 return DroneStateIdle
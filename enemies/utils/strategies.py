@@ -5,7 +5,9 @@ import random
 from robogame_engine.theme import theme
 
 from astrobox.cargo import CargoTransition
-from astrobox.core import Drone, Unit, MotherShip
+from astrobox.core import Asteroid, Drone, Unit, MotherShip
+
+from world.state import get_snapshot, get_team_state
 
 
 class Strategy(object):
@@ -190,18 +192,22 @@ class StrategyHarvesting(Strategy):
         return ""
 
     def get_nearest_elerium_stock(self):
-        elerium_stocks = [asteriod for asteriod in self.unit.scene.asteroids if asteriod.cargo.payload > 0]
-        elerium_stocks += [drone for drone in self.unit.scene.drones if not drone.is_alive and drone.cargo.payload > 0]
-        for drone in self.unit.teammates:
-            if drone.elerium_stock is not None and \
-                    not drone.cargo.is_full and \
-                    drone.elerium_stock in elerium_stocks:
-                elerium_stocks.remove(drone.elerium_stock)
-
+        snapshot = get_snapshot(self.unit.scene)
+        # Источники, которые уже разрабатывают союзники
+        taken = set()
+        for drone in snapshot.drones.get(self.unit.team, []):
+            if drone is not self.unit and drone.elerium_stock is not None and not drone.cargo.is_full:
+                taken.add(drone.elerium_stock)
+
+        def is_free_stock(obj):
+            if obj.cargo.payload <= 0 or obj in taken:
+                return False
+            return isinstance(obj, Asteroid) or (isinstance(obj, Drone) and not obj.is_alive)
+
+        elerium_stocks = snapshot.grid.nearest(self.unit, predicate=is_free_stock)
         if not elerium_stocks:
             return None
-        elerium_stocks = sorted(elerium_stocks, key=lambda x: x.distance_to(self.unit))
-        return elerium_stocks[0]
+        return elerium_stocks[0][0]
 
     def game_step(self):
         # Даем возможность переопределять выбор источника elerium'а
@@ -228,14 +234,14 @@ class StrategyHarvesting(Strategy):
 
 
 class StrategyHunting(Strategy):
-    _teams_strategies = {}
 
     @classmethod
     def getTeamStrategy(cls, team, hunter):
-        if team not in cls._teams_strategies:
-            cls._teams_strategies[team] = StrategyHunting(unit=hunter, id="hunting", group="hunting",
-                                                          is_group_unique=True)
-        return cls._teams_strategies[team]
+        # Одна стратегия на команду в пределах сцены
+        return get_team_state(hunter.scene, team,
+                              lambda: StrategyHunting(unit=hunter, id="hunting", group="hunting",
+                                                      is_group_unique=True),
+                              key=cls)
 
     def __init__(self, **kwargs):
         super(StrategyHunting, self).__init__(**kwargs)
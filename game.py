@@ -8,19 +8,53 @@ from enemies.devastator import DevastatorDrone
 from konovalov_a_v import KonovalovDrone
 
 NUMBER_OF_DRONES = 5
+FIELD = (1200, 800)
+SPEED = 5
+ASTEROIDS_COUNT = 27
+CAN_FIGHT = True
+TEAMS = (KonovalovDrone, ReaperDrone, DrillerDrone, DevastatorDrone)
+# mothership corners: top left, top right, bottom left, bottom right
+CORNERS = (0, 1, 2, 3)
 
-if __name__ == '__main__':
-    scene = SpaceField(
-        field=(1200, 800),
-        speed=5,
-        asteroids_count=27,
-        can_fight=True,
+
+class SeatedSpaceField(SpaceField):
+    """
+    Space field with the mothership of each team in a given corner,
+    the engine puts teams into the first corners in the order of their registration
+    """
+
+    def __init__(self, *args, corners=None, **kwargs):
+        self.corners = tuple(corners) if corners else CORNERS
+        super().__init__(*args, **kwargs)
+
+    def _get_team_pos(self, team_number):
+        return super()._get_team_pos(self.corners[team_number])
+
+
+def make_scene(headless=False, teams=TEAMS, number_of_drones=NUMBER_OF_DRONES, field=FIELD, corners=None):
+    """
+    Creating the match scene and drones of every team
+    :param headless: bool, run without rendering window
+    :param teams: drone classes, the order of teams defines their mothership corners
+    :param number_of_drones: int, drones in every team
+    :param field: (width, height) of the field
+    :param corners: corner of every team in their order, see CORNERS; None - the first corners
+    :return: (SpaceField(), list() of drone lists)
+    """
+    scene = SeatedSpaceField(
+        corners=corners,
+        field=field,
+        speed=SPEED,
+        asteroids_count=ASTEROIDS_COUNT,
+        can_fight=CAN_FIGHT,
+        headless=headless,
+        # theme allows only 7 drones at team by default
+        max_drones_at_team=number_of_drones,
     )
+    drones = [[team() for _ in range(number_of_drones)] for team in teams]
+    return scene, drones
 
-    team_1 = [KonovalovDrone() for _ in range(NUMBER_OF_DRONES)]
-    team_2 = [ReaperDrone() for _ in range(NUMBER_OF_DRONES)]
-    team_3 = [DrillerDrone() for _ in range(NUMBER_OF_DRONES)]
-    team_4 = [DevastatorDrone() for _ in range(NUMBER_OF_DRONES)]
 
+if __name__ == '__main__':
+    scene, drones = make_scene()
     scene.go()
-
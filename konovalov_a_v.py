@@ -1,13 +1,22 @@
 # -*- coding: utf-8 -*-
+import math
 from random import uniform
 
-from astrobox.core import Drone
+from astrobox.core import Asteroid, Drone
 from astrobox.themes.default import MOTHERSHIP_HEALING_DISTANCE
 from robogame_engine.geometry import Point, Vector
 from robogame_engine.theme import theme
 from abc import ABC
 
-ROTATIONS = [20, 40]
+from world.assignment import solve_assignment
+from world.events import AsteroidsDepleted, DroneDied, MothershipDied
+from world.state import get_events, get_snapshot, get_team_state, run_planner
+
+ATTACK_SPREAD = 40
+MAX_ATTACK_FAN = 90
+FORWARD_SPACING = 60
+DEFENDERS_RATIO = 0.3
+MIN_DEFENDERS = 2
 CONVERGENCE_KOEF = 0.95
 MAX_DRONES_PER_ASTEROID = 2
 SAFE_DEFENDER_DIST = 150
@@ -20,36 +29,192 @@ class Dispatcher:
 
     def __init__(self):
         self.soldiers = []
-        self.collectors = []
-        self.defenders = []
-        self.scavengers = []
-        self.forwards = []
+        self.forward_slots = 0
+        # (mothership, target mothership) -> attack positions of forward slots
+        self.attack_positions = {}
+        # state class -> alive drones in that state, dicts keep the order drones got the role
+        self.roles = {}
         self.defender_target_to_focus = None
+        self.reserved = {}
+        self.reservations = {}
+        self.assignments = {}
+        self.assignment_step = None
 
     def new_soldier(self, soldier):
+        if not self.soldiers:
+            events = get_events(soldier.scene)
+            events.subscribe(AsteroidsDepleted, self.on_asteroids_depleted)
+            events.subscribe(DroneDied, self.on_drone_died)
+            events.subscribe(MothershipDied, self.on_mothership_died)
         soldier.dispatcher = self
         soldier.old_asteroid = None
         self.soldiers.append(soldier)
         soldier.idx = len(self.soldiers)
 
+    def set_role(self, soldier, old_state, state):
+        """
+        Moving the drone between role groups
+        :param soldier: KonovalovDrone()
+        :param old_state: Behavior() or None
+        :param state: Behavior()
+        """
+        if old_state is not None:
+            self.roles.get(type(old_state), {}).pop(soldier, None)
+        self.roles.setdefault(type(state), {})[soldier] = None
+
+    def in_role(self, *states):
+        """
+        :param states: Behavior subclasses
+        :return: list() of alive drones in any of the states
+        """
+        return [soldier for state in states for soldier in self.roles.get(state, ())]
+
+    def count(self, *states):
+        """
+        :param states: Behavior subclasses
+        :return: int, alive drones in any of the states
+        """
+        return sum(len(self.roles.get(state, ())) for state in states)
+
+    @property
+    def collectors(self):
+        return self.in_role(Collector)
+
+    @property
+    def defenders(self):
+        return self.in_role(MainDefender, Defender)
+
+    @property
+    def scavengers(self):
+        return self.in_role(Scavenger)
+
+    @property
+    def forwards(self):
+        return self.in_role(Forward)
+
+    def update_reservation(self, soldier):
+        """
+        Keeping asteroid -> collectors and collector -> asteroid indexes in sync with the drone target
+        :param soldier: KonovalovDrone()
+        """
+        self.release_reservation(soldier)
+        target = soldier.target
+        if target is not None and isinstance(getattr(soldier, '_state', None), Collector):
+            self.reservations[soldier] = target
+            self.reserved.setdefault(target, set()).add(soldier)
+
+    def release_reservation(self, soldier):
+        """
+        :param soldier: KonovalovDrone()
+        """
+        old_target = self.reservations.pop(soldier, None)
+        if old_target is not None:
+            self.reserved[old_target].discard(soldier)
+
+    def reserved_count(self, target):
+        """
+        How many collectors are heading to the target
+        :param target: astrobox.core.Asteroid()
+        :return: int
+        """
+        return len(self.reserved.get(target, ()))
+
+    def assign_collectors(self, scene):
+        """
+        Matching collectors with asteroids once per game step
+        Over the tick budget of the team the assignments of the previous game step are kept,
+        Collector.get_my_asteroid skips the emptied ones
+        :param scene: astrobox.space_field.SpaceField()
+        """
+        snapshot = get_snapshot(scene)
+        if self.assignment_step == snapshot.step:
+            return
+        self.assignment_step = snapshot.step
+        drones = [drone for drone in self.collectors if drone.is_alive and not drone.is_full]
+        if not drones or not snapshot.asteroids:
+            self.assignments = {}
+            return
+        run_planner(scene, drones[0].team, lambda: self.match_collectors(drones, snapshot), lambda: None)
+
+    def match_collectors(self, drones, snapshot):
+        """
+        Cost of a trip is a flight to the asteroid and back to the mothership
+        per unit of elerium the drone is able to take there
+        :param drones: list() of KonovalovDrone()
+        :param snapshot: world.snapshot.WorldSnapshot()
+        """
+        self.assignments = {}
+        distances = snapshot.distances
+        to_home = distances.row(drones[0].mothership)
+        slots = []
+        for asteroid in snapshot.asteroids:
+            for slot in range(MAX_DRONES_PER_ASTEROID):
+                remaining = asteroid.payload - slot * theme.MAX_DRONE_ELERIUM
+                if remaining <= 0:
+                    break
+                slots.append((asteroid, distances.index(asteroid), remaining))
+        cost = []
+        for drone in drones:
+            to_asteroid = snapshot.distances_from(drone)
+            cost.append([(to_asteroid[idx] + to_home[idx]) / min(remaining, drone.free_space)
+                         for _, idx, remaining in slots])
+        for row, column in solve_assignment(cost):
+            self.assignments[drones[row]] = slots[column][0]
+
+    def on_asteroids_depleted(self, event):
+        """
+        Phase 1 is over when the last asteroid becomes empty
+        :param event: world.events.AsteroidsDepleted()
+        """
+        if self.count(Collector):
+            self.get_new_roles()
+
+    def on_drone_died(self, event):
+        """
+        Dead drones leave their roles and asteroids, a dead enemy is not a focus target anymore
+        :param event: world.events.DroneDied()
+        """
+        drone = event.source
+        self.release_reservation(drone)
+        if getattr(drone, 'dispatcher', None) is self:
+            self.roles[type(drone._state)].pop(drone, None)
+        if drone is self.defender_target_to_focus:
+            self.defender_target_to_focus = None
+
+    def on_mothership_died(self, event):
+        """
+        Positions near a dead base were skipped, so the table is built again
+        :param event: world.events.MothershipDied()
+        """
+        self.attack_positions = {}
+
     def get_new_roles(self):
         """
         Drones changes roles after phase 1
+        The first drone defines targets for defenders, DEFENDERS_RATIO of the team defends the base
+        and the rest attacks enemy bases, each forward gets its own attack slot
         """
         alive_soldiers = [s for s in self.soldiers if s.is_alive]
-        soldier_count = 0
-        for soldier in alive_soldiers:
+        defenders = min(len(alive_soldiers), max(MIN_DEFENDERS, math.ceil(len(alive_soldiers) * DEFENDERS_RATIO)))
+        self.forward_slots = len(alive_soldiers) - defenders
+        self.attack_positions = {}
+        if self.forward_slots:
+            soldier = alive_soldiers[0]
+            for target in get_snapshot(soldier.scene).enemy_motherships(soldier.team):
+                self.attack_positions[(soldier.mothership, target)] = self.get_attack_positions(
+                    soldier.mothership, target, soldier.attack_range)
+        for soldier_count, soldier in enumerate(alive_soldiers):
             if soldier_count == 0:
                 soldier.change_state(MainDefender())
-            elif soldier_count == 1:
+            elif soldier_count < defenders:
                 soldier.change_state(Defender())
             else:
+                soldier.forward_slot = soldier_count - defenders
                 if not soldier.is_empty:
                     soldier.prev_state = Forward()
                     soldier.change_state(ToHeal())
                 else:
                     soldier.change_state(Forward())
-            soldier_count += 1
 
     def get_forward_target(self, forward):
         """
@@ -58,7 +223,7 @@ class Dispatcher:
         :return: astrobox.core.MotherShip()
         """
         bases = [(base, forward.context.my_mothership.distance_to(base))
-                 for base in forward.context.scene.motherships if base.team != forward.context.team and base.is_alive]
+                 for base in get_snapshot(forward.context.scene).enemy_motherships(forward.context.team)]
         bases.sort(key=lambda x: x[1])
         if bases:
             return bases[0][0]
@@ -69,72 +234,95 @@ class Dispatcher:
         """
         Forward gets the position to attack enemy base
         Each drone gets his own position to avoid friendly fire
-        Method trying to find a position near the edge of the screen
-        using information about a position of friendly base and enemy base
+        Positions are taken from the table built once for a pair of bases
         :param unit: Forward()
         :param target: astrobox.core.MotherShip()
         """
-        vec = Vector.from_points(unit.context.coord, target.coord)
-        dist_vec = vec.module
-        max_range_attack = (dist_vec - unit.context.attack_range)
-        if max_range_attack < dist_vec - MOTHERSHIP_HEALING_DISTANCE:
-            max_range_attack += MOTHERSHIP_HEALING_DISTANCE + 70
-        koef = max_range_attack / dist_vec
-        norm_vec = Vector(vec.x * koef, vec.y * koef)
-        if unit.context.mothership.coord.x == 90 and unit.context.mothership.coord.y == 90:
-            self.rotate_negative(unit, target, norm_vec)
-        elif unit.context.mothership.coord.x == 90 and unit.context.mothership.coord.y != 90:
-            self.rotate_positive(unit, target, norm_vec)
-        elif unit.context.mothership.coord.x != 90 and unit.context.mothership.coord.y == 90:
-            self.rotate_negative(unit, target, norm_vec)
-        else:
-            self.rotate_positive(unit, target, norm_vec)
-        position = Point(unit.context.coord.x + norm_vec.x, unit.context.coord.y + norm_vec.y)
-        unit.context.attack_position = position
+        key = (unit.context.mothership, target)
+        positions = self.attack_positions.get(key)
+        if positions is None:
+            positions = self.attack_positions[key] = self.get_attack_positions(
+                unit.context.mothership, target, unit.context.attack_range)
+        unit.context.attack_position = positions[unit.context.forward_slot % len(positions)]
 
-    def rotate_positive(self, unit, target, norm_vec):
+    def get_attack_positions(self, mothership, target, attack_range):
         """
-        Rotating forwards position positively due to its and targets position
-        :param unit: Forward()
+        Firing positions of all forward slots for the pair of bases
+        Positions are on arcs around the target within attack range and outside its healing distance,
+        the first arc is on the way from the friendly base, the fan goes to the edge of the field.
+        Neighbours keep FORWARD_SPACING between each other, positions in healing distance
+        of other enemy bases are skipped
+        :param mothership: astrobox.core.MotherShip()
         :param target: astrobox.core.MotherShip()
-        :param norm_vec: robogame_engine.geometry.Vector()
-        """
-        if target.coord.x == 90:
-            if unit.context.idx == 3:
-                norm_vec.rotate(0)
-            elif unit.context.idx == 4:
-                norm_vec.rotate(ROTATIONS[0])
-            else:
-                norm_vec.rotate(ROTATIONS[1])
-        else:
-            if unit.context.idx == 3:
-                norm_vec.rotate(0)
-            elif unit.context.idx == 4:
-                norm_vec.rotate(-ROTATIONS[0])
-            else:
-                norm_vec.rotate(-ROTATIONS[1])
-
-    def rotate_negative(self, unit, target, norm_vec):
-        """
-        Rotating a forwards position negatively due to its and targets position
-        :param unit: Forward()
+        :param attack_range: float
+        :return: list() of robogame_engine.geometry.Point(), one per slot
+        """
+        slots = max(self.forward_slots, 1)
+        bases = [base for base in get_snapshot(target.scene).enemy_motherships(mothership.team) if base is not target]
+        direction = Vector.from_points(target.coord, mothership.coord).direction
+        sign = -self.get_rotation_sign(mothership, target)
+        first_radius = attack_range - MOTHERSHIP_HEALING_DISTANCE - 70
+        positions = []
+        for radius in self.get_attack_radiuses(first_radius, attack_range):
+            step = max(ATTACK_SPREAD / max(slots - 1, 1), math.degrees(FORWARD_SPACING / radius))
+            angle = 0
+            while angle <= MAX_ATTACK_FAN and len(positions) < slots:
+                vec = Vector.from_direction(direction + sign * angle, radius)
+                position = Point(target.coord.x + vec.x, target.coord.y + vec.y)
+                if self.is_free_position(position, bases):
+                    positions.append(position)
+                angle += step
+            if len(positions) >= slots:
+                break
+        if not positions:
+            vec = Vector.from_direction(direction, first_radius)
+            positions.append(Point(target.coord.x + vec.x, target.coord.y + vec.y))
+        return positions
+
+    def get_attack_radiuses(self, first_radius, attack_range):
+        """
+        Arcs for attack positions, alternately farther and closer to the target than the first one
+        :param first_radius: float
+        :param attack_range: float
+        :return: list() of float
+        """
+        low = MOTHERSHIP_HEALING_DISTANCE + FORWARD_SPACING / 2
+        high = attack_range - FORWARD_SPACING / 2
+        radiuses = [first_radius]
+        shift = FORWARD_SPACING
+        while first_radius - shift >= low or first_radius + shift <= high:
+            for radius in (first_radius + shift, first_radius - shift):
+                if low <= radius <= high:
+                    radiuses.append(radius)
+            shift += FORWARD_SPACING
+        return radiuses
+
+    def is_free_position(self, position, bases):
+        """
+        :param position: robogame_engine.geometry.Point()
+        :param bases: list() of enemy motherships except the target
+        :return: bool, position is on the field and out of healing distance of the bases
+        """
+        margin = KonovalovDrone.radius
+        if not margin <= position.x <= theme.FIELD_WIDTH - margin:
+            return False
+        if not margin <= position.y <= theme.FIELD_HEIGHT - margin:
+            return False
+        return all(base.distance_to(position) > MOTHERSHIP_HEALING_DISTANCE for base in bases)
+
+    def get_rotation_sign(self, mothership, target):
+        """
+        Forwards are rotated to the edge of the field, away from the other bases
+        Bases in the lower half of the field rotate positively, in the upper one negatively,
+        the direction is mirrored when the target is in the right half
+        :param mothership: astrobox.core.MotherShip()
         :param target: astrobox.core.MotherShip()
-        :param norm_vec: robogame_engine.geometry.Vector()
+        :return: int, 1 or -1
         """
-        if target.coord.x == 90:
-            if unit.context.idx == 3:
-                norm_vec.rotate(0)
-            elif unit.context.idx == 4:
-                norm_vec.rotate(-ROTATIONS[0])
-            else:
-                norm_vec.rotate(-ROTATIONS[1])
-        else:
-            if unit.context.idx == 3:
-                norm_vec.rotate(0)
-            elif unit.context.idx == 4:
-                norm_vec.rotate(ROTATIONS[0])
-            else:
-                norm_vec.rotate(ROTATIONS[1])
+        sign = -1 if mothership.coord.y < theme.FIELD_HEIGHT / 2 else 1
+        if target.coord.x >= theme.FIELD_WIDTH / 2:
+            sign = -sign
+        return sign
 
     def get_scavenger_target(self, scavenger):
         """
@@ -143,8 +331,8 @@ class Dispatcher:
         :return: astrobox.core.MotherShip()
         """
         dead_bases_w_eler = [(base, scavenger.context.distance_to(base))
-                             for base in scavenger.context.scene.motherships
-                             if base != scavenger.context.my_mothership and not base.is_alive and not base.is_empty]
+                             for base in get_snapshot(scavenger.context.scene).dead_motherships
+                             if base != scavenger.context.my_mothership]
         dead_bases_w_eler.sort(key=lambda x: x[1])
         if dead_bases_w_eler:
             return dead_bases_w_eler[0][0]
@@ -156,10 +344,8 @@ class KonovalovDrone(Drone):
     """
     Main class of drones
     """
-    my_team = []
     limit_health = 0.5
     attack_range = 0
-    dispatcher = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -171,41 +357,34 @@ class KonovalovDrone(Drone):
         self.forward_target = None
         self.scavenger_target = None
         self.attack_position = None
+        self.forward_slot = 0
 
-    def _remove_drone_from_lists(self):
-        if self in self.dispatcher.defenders:
-            self.dispatcher.defenders.remove(self)
-        elif self in self.dispatcher.scavengers:
-            self.dispatcher.scavengers.remove(self)
-        elif self in self.dispatcher.forwards:
-            self.dispatcher.forwards.remove(self)
-        elif self in self.dispatcher.collectors:
-            self.dispatcher.collectors.remove(self)
+    @property
+    def target(self):
+        return self._target
+
+    @target.setter
+    def target(self, target):
+        self._target = target
+        # engine sets the target in GameObject.__init__, before the drone is registered
+        if getattr(self, 'dispatcher', None) is not None:
+            self.dispatcher.update_reservation(self)
 
     def change_state(self, state):
         """
         Changing states
-        :param state: on of (Collector(), MainDefender(), Defender(), Scavenger(), Scavenger())
+        :param state: on of (Collector(), MainDefender(), Defender(), Scavenger(), Forward(), ToHeal())
         """
+        self.dispatcher.set_role(self, self._state, state)
         self._state = state
         self._state.context = self
-        self._remove_drone_from_lists()
-        if isinstance(state, Collector):
-            self.dispatcher.collectors.append(self)
-        elif isinstance(state, MainDefender) or isinstance(state, Defender):
-            self.dispatcher.defenders.append(self)
-        elif isinstance(state, Scavenger):
-            self.dispatcher.scavengers.append(self)
-        elif isinstance(state, Scavenger):
-            self.dispatcher.forwards.append(self)
+        self.dispatcher.update_reservation(self)
 
     def registration(self):
         """
-        Drones gets Dispatcher()
+        Drones gets Dispatcher() of their team in this scene
         """
-        if KonovalovDrone.dispatcher is None:
-            KonovalovDrone.dispatcher = Dispatcher()
-        KonovalovDrone.dispatcher.new_soldier(self)
+        get_team_state(self.scene, self.team, Dispatcher).new_soldier(self)
 
     def on_born(self):
         """
@@ -213,7 +392,6 @@ class KonovalovDrone(Drone):
         """
         self.attack_range = self.gun.shot_distance
         self.limit_health = uniform(0.45, 0.65)
-        self.my_team.append(self)
         self.registration()
         self.change_state(Collector())
         self._state.on_born()
@@ -362,43 +540,53 @@ class Collector(Behavior):
 
     @property
     def get_my_first_asteroid(self):
-        distances = [self.context.distance_to(i) for i in self.context.asteroids]
-        sorted_dist = sorted(distances)
-        target = self.context.asteroids[distances.index(sorted_dist[self.context.idx - 1])]
-        return target
+        grid = get_snapshot(self.context.scene).grid
+        nearest = grid.nearest(self.context, k=self.context.idx, predicate=lambda obj: isinstance(obj, Asteroid))
+        return nearest[-1][0]
 
     @property
     def get_my_asteroid(self):
+        return run_planner(self.context.scene, self.context.team, self.find_my_asteroid, self.cached_asteroid)
+
+    def find_my_asteroid(self):
+        assigned = self.context.dispatcher.assignments.get(self.context)
+        if assigned is not None and assigned.payload > 0:
+            self.context.old_asteroid = assigned
+            return assigned
+        snapshot = get_snapshot(self.context.scene)
         if self.context.old_asteroid:
-            distances = [self.context.old_asteroid.distance_to(i) for i in self.context.asteroids]
+            # asteroids never move, their neighbours are sorted once per scene
+            candidates = (obj for obj in snapshot.distances.neighbours(self.context.old_asteroid)
+                          if isinstance(obj, Asteroid) and obj.payload > 0)
         else:
-            distances = [self.context.distance_to(i) for i in self.context.asteroids]
-        sorted_dist = sorted(distances)
-        for asteroid in sorted_dist:
-            target = self.context.asteroids[distances.index(asteroid)]
+            candidates = (obj for obj, _ in snapshot.grid.iter_nearest(
+                self.context, predicate=lambda obj: isinstance(obj, Asteroid) and obj.payload > 0))
+        for target in candidates:
             self.context.old_asteroid = target
-            if target.payload == 0:
+            if len(snapshot.all_asteroids) == 1:
+                return target
+            if self.context.dispatcher.reserved_count(target) >= MAX_DRONES_PER_ASTEROID:
                 continue
             else:
-                targ_counter = 0
-                for friend in self.context.dispatcher.collectors:
-                    if friend.target == target:
-                        targ_counter += 1
-                if len([i.payload > 0 for i in self.context.asteroids]) == 1:
-                    return target
-                if targ_counter >= MAX_DRONES_PER_ASTEROID:
-                    continue
-                else:
-                    return target
+                return target
         else:
             return self.context.mothership
 
+    def cached_asteroid(self):
+        """
+        Over the tick budget: the last asteroid while it has elerium, else the mothership
+        """
+        old_asteroid = self.context.old_asteroid
+        if old_asteroid is not None and old_asteroid.payload > 0:
+            return old_asteroid
+        return self.context.mothership
+
     def on_born(self):
         self.context.target = self.get_my_first_asteroid
         self.context.go_to_target(self.context.target)
 
     def on_stop_at_asteroid(self, asteroid):
-        if sum(i.payload for i in self.context.asteroids) == 0:
+        if get_snapshot(self.context.scene).resources.total == 0:
             self.context.go_to_target(self.context.mothership)
         if self.context.payload + asteroid.payload > 100:
             next_target = self.context.mothership
@@ -435,8 +623,7 @@ class Collector(Behavior):
             self.context.smart_moves(self.context.smart_target(self.context.target))
 
     def on_heartbeat(self):
-        if all(i.is_empty for i in self.context.asteroids):
-            self.context.dispatcher.get_new_roles()
+        self.context.dispatcher.assign_collectors(self.context.scene)
 
 
 class Scavenger(Behavior):
@@ -598,10 +785,7 @@ class MainDefender(Defender):
 
     @property
     def get_enemy(self):
-        drones = [(drone, self.context.distance_to(drone)) for drone in self.context.scene.drones if
-                  self.context.team != drone.team and drone.is_alive
-                  and drone.distance_to(self.context.scene.get_mothership(drone.team)) > 10]
-        drones.sort(key=lambda x: x[1])
+        drones = get_snapshot(self.context.scene).threats.nearest(self.context, k=1, min_home_distance=10)
         if drones:
             return drones[0][0]
         else:
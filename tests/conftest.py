@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+from robogame_engine.scene import Scene
+
+from game import FIELD, NUMBER_OF_DRONES, TEAMS, make_scene
+from world.state import release_scene
+
+
+@pytest.fixture
+def new_scene():
+    """
+    Headless scenes built the way arena.runner.run_match() builds them, released after the test
+    :return: function(seed, teams, number_of_drones, field, corners) -> (scene, list() of drone lists),
+        prepared for steps
+    """
+    scenes = []
+
+    def make(seed=0, teams=TEAMS, number_of_drones=NUMBER_OF_DRONES, field=FIELD, corners=None):
+        random.seed(seed)
+        Scene._Scene__teams.clear()
+        scene, drones = make_scene(headless=True, teams=teams, number_of_drones=number_of_drones, field=field,
+                                   corners=corners)
+        scene.prepare(**scene.init_kwargs)
+        scenes.append(scene)
+        return scene, drones
+
+    yield make
+    for scene in scenes:
+        release_scene(scene)
+
+
+@pytest.fixture
+def play():
+    """
+    :return: function(scene, steps), game steps as scene.go() makes them
+    """
+    def play_steps(scene, steps):
+        for _ in range(steps):
+            scene._step += 1
+            scene.game_step()
+
+    return play_steps
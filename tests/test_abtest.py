@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+
+from arena import abtest
+from arena.abtest import SPRT, PairedResults, wilson_interval
+
+
+def test_sprt_accepts_h1_on_wins_and_h0_on_losses():
+    sprt = SPRT(p0=0.5, p1=0.6, alpha=0.05, beta=0.05)
+    wins_needed = math.ceil(sprt.upper / math.log(0.6 / 0.5))
+    for _ in range(wins_needed - 1):
+        sprt.update(1)
+    assert sprt.status is None
+    sprt.update(1)
+    assert sprt.status == 'H1'
+
+    sprt = SPRT(p0=0.5, p1=0.6, alpha=0.05, beta=0.05)
+    losses_needed = math.ceil(sprt.lower / math.log(0.4 / 0.5))
+    for _ in range(losses_needed):
+        sprt.update(0)
+    assert sprt.status == 'H0'
+
+
+def test_sprt_and_win_rate_skip_draws():
+    sprt = SPRT()
+    results = PairedResults()
+    for elerium_a, elerium_b in ((5, 5), (3, 7), (7, 3), (4, 4), (1, 9)):
+        sprt.update(results.add(elerium_a, elerium_b))
+    assert (results.wins, results.draws, results.losses) == (2, 2, 1)
+    assert abs(sprt.llr - (2 * math.log(0.6 / 0.5) + math.log(0.4 / 0.5))) < 1e-12
+    rate, low, high = results.win_rate()
+    assert rate == 2 / 3
+    assert (low, high) == wilson_interval(2, 3)
+    assert results.elerium_delta()[0] == 8 / 5
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    for wins, games in ((0, 10), (5, 10), (10, 10), (37, 100)):
+        low, high = wilson_interval(wins, games)
+        assert 0.0 <= low <= wins / games <= high <= 1.0
+
+
+class OutOfOrderPool:
+    """
+    Pool() giving results back in a shuffled order, as imap_unordered() may do
+    """
+
+    def __init__(self, processes=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def imap_unordered(self, function, tasks):
+        tasks = list(tasks)
+        random.Random(1).shuffle(tasks)
+        for arm, seed, teams, team_name, number_of_drones, field in tasks:
+            yield arm, seed, (seed * 7 + (3 if arm == 'b' else 0)) % 10
+
+
+def test_ab_test_feeds_pairs_in_seed_order(monkeypatch):
+    monkeypatch.setattr(abtest, 'Pool', OutOfOrderPool)
+
+    class Version:
+        pass
+
+    class Opponent:
+        pass
+
+    # a test this weak does not decide within 30 pairs
+    sprt = SPRT(p0=0.5, p1=0.51)
+    seeds = [seed for seed, _, _, _ in abtest.ab_test(Version, Version, [Opponent], sprt, max_pairs=30, seed=10)]
+    assert seeds == list(range(10, 40))
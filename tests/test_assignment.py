@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import random
+from itertools import permutations
+
+from world.assignment import solve_assignment
+
+
+def brute_force(cost):
+    rows, columns = len(cost), len(cost[0])
+    if rows <= columns:
+        return min(sum(cost[row][column] for row, column in enumerate(chosen))
+                   for chosen in permutations(range(columns), rows))
+    return min(sum(cost[row][column] for column, row in enumerate(chosen))
+               for chosen in permutations(range(rows), columns))
+
+
+def test_empty():
+    assert solve_assignment([]) == []
+    assert solve_assignment([[]]) == []
+
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(300):
+        rows, columns = rng.randint(1, 6), rng.randint(1, 6)
+        cost = [[rng.choice((rng.randint(0, 9), rng.uniform(0, 1000))) for _ in range(columns)] for _ in range(rows)]
+        pairs = solve_assignment(cost)
+        assert len(pairs) == min(rows, columns)
+        assert pairs == sorted(pairs)
+        assert len({row for row, _ in pairs}) == len({column for _, column in pairs}) == len(pairs)
+        total = sum(cost[row][column] for row, column in pairs)
+        assert abs(total - brute_force(cost)) < 1e-6
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+from collections import Counter
+
+import numpy as np
+from robogame_engine.geometry import Point, Vector
+
+from enemies.devastator import ACTIONS_BUDGET, Action, DevastatorDrone, Headquarters, ROLE_QUOTAS, UNARMED_ROLE_QUOTAS
+from enemies.reaper import ReaperDrone
+from game import FIELD
+from world.state import get_snapshot
+
+
+def test_quotas_give_every_soldier_a_role():
+    headquarters = Headquarters()
+    for phase, have_gun in [(phase, have_gun) for phase in ROLE_QUOTAS for have_gun in (True, False)]:
+        headquarters.phase = phase
+        quotas = ROLE_QUOTAS[phase] if have_gun else UNARMED_ROLE_QUOTAS
+        for number_drones in range(1, 21):
+            roles = headquarters.get_quotas(number_drones, have_gun)
+            assert list(roles) == [role for role, _, _ in quotas]
+            assert sum(roles.values()) == number_drones
+            assert all(count >= 0 for count in roles.values())
+            for role, _, minimum in quotas:
+                assert roles[role] >= min(minimum, number_drones)
+
+
+def alive_roles(headquarters):
+    return Counter(type(soldier.role) for soldier in headquarters.soldiers if soldier.is_alive)
+
+
+def next_snapshot(scene):
+    # Снимок строится один раз за шаг, при этом рассылаются события шага
+    scene._step += 1
+    return get_snapshot(scene)
+
+
+def test_quotas_follow_the_phase_and_the_deaths(new_scene, play):
+    scene, drones = new_scene(teams=(DevastatorDrone, ReaperDrone), number_of_drones=10)
+    soldiers = drones[0]
+    play(scene, 5)
+    headquarters = soldiers[0].headquarters
+    assert headquarters.phase == 'harvest'
+    assert alive_roles(headquarters) == headquarters.get_quotas(10, True)
+
+    for asteroid in next_snapshot(scene).all_asteroids:
+        asteroid.cargo._clip_payload(asteroid.payload)
+    next_snapshot(scene)
+    assert headquarters.phase == 'battle'
+    assert headquarters.roles == {role: count for role, count in zip(
+        [role for role, _, _ in ROLE_QUOTAS['battle']], (4, 2, 2, 2))}
+    assert alive_roles(headquarters) == headquarters.roles
+    assert {role: count for role, count in headquarters.role_counts.items() if count} == headquarters.roles
+
+    combat = [soldier for soldier in soldiers if type(soldier.role) is ROLE_QUOTAS['battle'][0][0]]
+    for soldier in combat[:3]:
+        soldier.damage_taken(soldier.health)
+    next_snapshot(scene)
+    assert headquarters.alive_soldiers == 7
+    assert headquarters.roles == headquarters.get_quotas(7, True)
+    assert alive_roles(headquarters) == headquarters.roles
+
+
+def test_actions_run_in_order_within_the_budget(new_scene, play, monkeypatch):
+    scene, drones = new_scene(teams=(DevastatorDrone, ReaperDrone))
+    play(scene, 5)
+    soldier = drones[0][0]
+    headquarters = soldier.headquarters
+    asteroid = next_snapshot(scene).asteroids[0]
+
+    # commands which do not give an order to the engine go on until the budget is spent
+    soldier.actions.clear()
+    soldier.actions.extend(Action('it is free', asteroid) for _ in range(ACTIONS_BUDGET + 10))
+    soldier.next_action()
+    assert len(soldier.actions) == 10
+    assert headquarters.actions_per_step[scene._step] == ACTIONS_BUDGET
+
+    # a move is given to the engine and finished by the next call, then the load goes
+    soldier.actions.clear()
+    soldier.actions.extend([Action('move', asteroid), Action('load', asteroid), Action('unload', asteroid)])
+    soldier.next_action()
+    assert [action.name for action in soldier.actions] == ['move', 'load', 'unload']
+    assert soldier.actions[0].is_performed == 0 and soldier._move_target is asteroid
+    soldier.next_action()
+    assert [action.name for action in soldier.actions] == ['unload']
+    assert soldier._transition.cargo_from is asteroid.cargo and soldier.old_asteroid is asteroid
+
+    # the headquarters is asked at most six times in a row for an empty queue
+    asked = []
+    monkeypatch.setattr(headquarters, 'get_actions', asked.append)
+    soldier.actions.clear()
+    soldier.next_action()
+    assert asked == [soldier] * 6 and not soldier.actions
+
+
+def angle_at_target(soldier, partner, target):
+    # the angle between soldier-target and partner-target, as the loops over partners computed it
+    v12 = (soldier.x - target.x, soldier.y - target.y)
+    v32 = (partner.x - target.x, partner.y - target.y)
+    cos = (v12[0] * v32[0] + v12[1] * v32[1]) / (math.hypot(*v12) * math.hypot(*v32) + 1.e-8)
+    return math.degrees(math.acos(max(-1.0, min(1.0, cos))))
+
+
+def partner_on_line_of_fire(soldier, target):
+    return any(soldier.distance_to(target) > partner.distance_to(target)
+               and angle_at_target(soldier, partner, target) < 20
+               and soldier.distance_to(partner) < soldier.distance_to(target)
+               and partner.distance_to(target) > 10
+               for partner in soldier.headquarters.soldiers if partner.is_alive and partner is not soldier)
+
+
+def valide_place(soldier, point):
+    return 0 < point.x < FIELD[0] and 0 < point.y < FIELD[1] and all(
+        partner.distance_to(point) >= soldier.save_distance
+        for partner in soldier.headquarters.soldiers if partner.is_alive and partner is not soldier)
+
+
+def test_fire_checks_match_the_loops_over_partners(new_scene, play):
+    scene, drones = new_scene(teams=(DevastatorDrone, ReaperDrone), number_of_drones=10)
+    play(scene, 5)
+    soldiers, enemies = drones
+    headquarters = soldiers[0].headquarters
+    rng = random.Random(0)
+    for drone in soldiers[7:]:
+        drone.damage_taken(drone.health)
+    for _ in range(200):
+        # soldiers crowd around a point, so partners are often on the line of fire and too close
+        center = Point(rng.uniform(0, FIELD[0]), rng.uniform(0, FIELD[1]))
+        for drone in soldiers + enemies:
+            drone.coord = Point(center.x + rng.gauss(0, 120), center.y + rng.gauss(0, 120))
+        target = rng.choice(enemies)
+        for soldier in soldiers[:7]:
+            assert soldier.partner_on_line_of_fire(target) == partner_on_line_of_fire(soldier, target)
+            places = [Point(soldier.x + rng.uniform(-200, 200), soldier.y + rng.uniform(-200, 200)) for _ in range(5)]
+            valide = soldier.valide_places(np.array([p.x for p in places]), np.array([p.y for p in places]))
+            assert list(valide) == [valide_place(soldier, place) for place in places]
+            assert soldier.valide_place(soldier.coord) == valide_place(soldier, soldier.coord)
+
+        angles = [0, 60, -60, 30, -30]
+        xs, ys = headquarters.get_places_near(center, target, angles)
+        for x, y, angle in zip(xs, ys, angles):
+            vector = Vector(center.x - target.x, center.y - target.y)
+            vector.rotate(angle)
+            assert abs(x - target.x - vector.x) < 1e-6 and abs(y - target.y - vector.y) < 1e-6
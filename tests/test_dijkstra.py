@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import random
+from functools import partial
+from types import SimpleNamespace
+
+from astrobox.core import Asteroid, MotherShip
+
+from enemies.driller import DrillerDrone
+from enemies.reaper import ReaperDrone, ReaperStrategy
+from enemies.utils.dijkstra import Dijkstra
+
+INF = float('inf')
+
+
+class Unit:
+    id = 1
+    is_alive = True
+
+
+class Node:
+    def __init__(self, number):
+        self.number = number
+
+
+def reference_path(weights, fi, fo):
+    """
+    The O(V^2) search the heap replaced: the cheapest unvisited vertex is found by a scan,
+    the first one wins on equal costs, edges not cheaper than the mean edge of a vertex are skipped
+    :return: (list() of vertices, cost of the target)
+    """
+    if fi == fo:
+        return [fi], 0.0
+    size = len(weights)
+    unvisited = list(range(size))
+    table = [[-1, INF] for _ in range(size)]
+    table[fi][1] = 0.0
+    root = lastroot = fi
+    while unvisited:
+        unvisited.remove(root)
+        if not unvisited:
+            break
+        neighbors = [uv for uv in unvisited if weights[root][uv] < INF]
+        mean = sum(weights[root][nb] for nb in neighbors) / max(float(len(neighbors)), 1.0)
+        for nb in neighbors:
+            if root == fi and nb == fo or weights[root][nb] >= mean:
+                continue
+            cost = table[root][1] + weights[root][nb]
+            if cost < table[nb][1]:
+                table[nb] = [root, cost]
+        shortest = INF
+        lastroot = root
+        for uv in unvisited:
+            if uv != lastroot and table[uv][1] < shortest:
+                shortest, root = table[uv][1], uv
+        if root == lastroot:
+            root = unvisited[0]
+    if table[root][1] == INF:
+        table[root] = [lastroot, table[lastroot][1] + weights[lastroot][root]]
+    path = [fo]
+    while table[path[0]][0] > -1:
+        path.insert(0, table[path[0]][0])
+    return path, table[fo][1]
+
+
+def random_weights(rng, size):
+    weights = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(size):
+            if i != j:
+                # small integers make many ties, inf cuts edges and leaves targets unreachable
+                weights[i][j] = INF if rng.random() < 0.3 else float(rng.randint(1, 6))
+    return weights
+
+
+def test_heap_search_matches_the_scan():
+    rng = random.Random(0)
+    unreachable = 0
+    for _ in range(2000):
+        size = rng.randint(1, 12)
+        points = [Node(k) for k in range(size)]
+        dijkstra = Dijkstra(Unit(), points)
+        dijkstra._weights = random_weights(rng, size)
+        fi, fo = rng.randrange(size), rng.randrange(size)
+        path, cost = reference_path(dijkstra.weights, fi, fo)
+        assert dijkstra.find_path(points[fi], points[fo]) == path
+        assert dijkstra.find_path(points[fi], points[fo], as_objects=True) == [points[k] for k in path]
+        if cost == INF:
+            unreachable += 1
+        else:
+            assert sum(dijkstra.weights[a][b] for a, b in zip(path, path[1:])) == cost
+    assert unreachable > 0
+
+
+def test_reordered_points_are_found():
+    points = [Node(k) for k in range(4)]
+    dijkstra = Dijkstra(Unit(), points)
+    dijkstra._weights = random_weights(random.Random(1), 4)
+    # the caller may reorder the list in place, the index of points is rebuilt
+    points.reverse()
+    assert dijkstra.find_path(points[0], points[0]) == [0]
+    assert dijkstra.find_path(points[0], points[3]) == reference_path(dijkstra.weights, 0, 3)[0]
+
+
+def harvest_weight(strategy, a, b):
+    # the scalar weights calc_weights() evaluated pair by pair before it was vectorized
+    if b.cargo.fullness == 0.0 or isinstance(b, MotherShip):
+        return INF
+    return a.distance_to(b) / strategy._distance_limit + 1.0 - b.cargo.fullness
+
+
+def unload_weight(strategy, a, b):
+    mothership = strategy.unit.mothership
+    if a is mothership or b is mothership:
+        return 0.0
+    return mothership.distance_to(b) / mothership.distance_to(a) * a.distance_to(b) + 1.0 - b.cargo.fullness
+
+
+def test_weights_match_the_pairwise_functions(new_scene):
+    scene, drones = new_scene(teams=(ReaperDrone, DrillerDrone))
+    rng = random.Random(2)
+    asteroids = [obj for obj in scene.objects if isinstance(obj, Asteroid)]
+    for asteroid in rng.sample(asteroids, 10):
+        asteroid.cargo._clip_payload(rng.choice((asteroid.payload, rng.randint(1, asteroid.payload))))
+    unit = drones[0][0]
+    points = [unit.mothership] + asteroids + [obj for obj in scene.objects if isinstance(obj, MotherShip)
+                                              and obj is not unit.mothership]
+    strategy = SimpleNamespace(unit=unit, _distance_limit=350.0)
+    dijkstra = Dijkstra(unit, points)
+    for func, reference in ((None, lambda a, b: a.distance_to(b) if a is not b else 0.0),
+                            (partial(ReaperStrategy.weight_harvest_func, strategy), partial(harvest_weight, strategy)),
+                            (partial(ReaperStrategy.weight_unload_func, strategy), partial(unload_weight, strategy))):
+        dijkstra.calc_weights(func=func)
+        assert len(dijkstra.weights) == len(points)
+        for a, row in zip(points, dijkstra.weights):
+            assert len(row) == len(points)
+            for b, weight in zip(points, row):
+                expected = 0.0 if a is b else reference(a, b)
+                assert weight == expected or abs(weight - expected) < 1e-9
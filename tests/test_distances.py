@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+
+from astrobox.core import Asteroid, MotherShip
+
+from world.distances import StaticDistances
+from world.state import get_snapshot
+
+
+class Thing:
+    def __init__(self, id, x, y):
+        self.id = id
+        self.x = x
+        self.y = y
+
+    def distance_to(self, other):
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+
+def test_matrix_matches_pairwise_distances():
+    rng = random.Random(0)
+    things = [Thing(100 + k, rng.uniform(0, 1200), rng.uniform(0, 800)) for k in range(30)]
+    distances = StaticDistances(things)
+    moving = Thing(1, 600, 400)
+    assert moving not in distances and distances.index(moving) is None
+    for k, a in enumerate(things):
+        assert a in distances and distances.index(a) == k
+        assert list(distances.row(a)) == [distances.distance(a, b) for b in things]
+        for b in things:
+            assert abs(distances.distance(a, b) - a.distance_to(b)) < 1e-9
+        assert distances.distance(a, moving) == a.distance_to(moving)
+        neighbours = distances.neighbours(a)
+        assert neighbours[0] is a
+        assert neighbours == sorted(things, key=lambda b: (a.distance_to(b), things.index(b)))
+        assert distances.neighbours(a) is neighbours
+    for distance, b in zip(distances.from_point(moving), things):
+        assert abs(distance - moving.distance_to(b)) < 1e-9
+
+
+def test_world_distances_cover_static_objects(new_scene, play):
+    scene, _ = new_scene()
+    play(scene, 5)
+    distances = get_snapshot(scene).distances
+    static = [obj for obj in scene.objects if isinstance(obj, (Asteroid, MotherShip))]
+    assert sorted(obj.id for obj in distances.objects) == sorted(obj.id for obj in static)
+    play(scene, 5)
+    # built once for the whole scene
+    assert get_snapshot(scene).distances is distances
+    for a in static:
+        for b in static:
+            assert abs(distances.distance(a, b) - a.distance_to(b)) < 1e-6
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from world.events import (AsteroidEmptied, AsteroidsDepleted, DroneDied, EventBus, MothershipDied,
+                          MothershipEmptied)
+from world.state import get_events, get_snapshot
+
+EVENTS = (AsteroidEmptied, AsteroidsDepleted, DroneDied, MothershipDied, MothershipEmptied)
+
+
+def test_bus_delivers_in_the_order_of_subscription():
+    bus = EventBus()
+    delivered = []
+
+    def first(event):
+        delivered.append(('first', event))
+        # unsubscribing while the event goes does not skip the other subscribers
+        bus.unsubscribe(DroneDied, first)
+
+    bus.subscribe(DroneDied, first)
+    bus.subscribe(DroneDied, lambda event: delivered.append(('second', event)))
+    bus.subscribe(MothershipDied, lambda event: delivered.append(('base', event)))
+    died = DroneDied(1, 'drone')
+    bus.publish(died)
+    bus.publish(DroneDied(2, 'other'))
+    bus.publish(AsteroidEmptied(3, 'asteroid'))
+    bus.unsubscribe(AsteroidEmptied, first)
+    assert [(name, event.step, event.source) for name, event in delivered] == [
+        ('first', 1, 'drone'), ('second', 1, 'drone'), ('second', 2, 'other')]
+
+
+def test_scene_events_are_published_once(new_scene, play):
+    scene, drones = new_scene()
+    play(scene, 100)
+    delivered = []
+
+    def record(event):
+        # events go when the snapshot of their game step is ready
+        assert get_snapshot(scene).step == event.step == scene._step
+        delivered.append(event)
+
+    for event_type in EVENTS:
+        get_events(scene).subscribe(event_type, record)
+    victims = [drones[0][0], drones[3][2]]
+    for drone in victims:
+        drone.damage_taken(drone.health)
+    asteroids = get_snapshot(scene).asteroids
+    base = drones[1][0].my_mothership
+    # the base leaves loot after its death
+    base.cargo._transfer_payload(100, asteroids[-1].cargo)
+    base.damage_taken(base.health)
+    asteroids[0].cargo._clip_payload(asteroids[0].payload)
+    play(scene, 1)
+    died_step = scene._step
+    assert {(type(event), event.source) for event in delivered} == {
+        (DroneDied, victims[0]), (DroneDied, victims[1]), (MothershipDied, base), (AsteroidEmptied, asteroids[0])}
+    assert len(delivered) == 4
+
+    del delivered[:]
+    base.cargo._clip_payload(base.payload)
+    for asteroid in asteroids:
+        asteroid.cargo._clip_payload(asteroid.payload)
+    play(scene, 1)
+    assert [type(event) for event in delivered].count(AsteroidsDepleted) == 1
+    assert delivered[-1].source is None and isinstance(delivered[-1], AsteroidsDepleted)
+    assert {event.source for event in delivered if isinstance(event, AsteroidEmptied)} == set(asteroids[1:])
+    assert [event.source for event in delivered if isinstance(event, MothershipEmptied)] == [base]
+    assert all(event.step == died_step + 1 for event in delivered)
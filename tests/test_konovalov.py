@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import math
+from itertools import permutations
+from types import SimpleNamespace
+
+from astrobox.themes.default import MOTHERSHIP_HEALING_DISTANCE
+from robogame_engine.theme import theme
+
+from enemies.devastator import DevastatorDrone
+from enemies.reaper import ReaperDrone
+from game import FIELD
+from konovalov_a_v import (DEFENDERS_RATIO, FORWARD_SPACING, MAX_DRONES_PER_ASTEROID, MIN_DEFENDERS, Collector,
+                           Defender, Forward, KonovalovDrone, MainDefender, ToHeal)
+from world.state import get_snapshot
+
+
+def check_reservations(dispatcher):
+    # both indexes describe the same collector -> target pairs
+    pairs = {(soldier, target) for soldier, target in dispatcher.reservations.items()}
+    assert pairs == {(soldier, target) for target, soldiers in dispatcher.reserved.items() for soldier in soldiers}
+    for soldier in dispatcher.soldiers:
+        if soldier.is_alive and isinstance(soldier._state, Collector) and soldier.target is not None:
+            assert dispatcher.reservations[soldier] is soldier.target
+        else:
+            assert soldier not in dispatcher.reservations
+    for target, soldiers in dispatcher.reserved.items():
+        assert dispatcher.reserved_count(target) == len(soldiers)
+
+
+def test_reservations_follow_targets(new_scene, play):
+    scene, drones = new_scene(teams=(KonovalovDrone, ReaperDrone))
+    team = drones[0]
+    for _ in range(4):
+        play(scene, 50)
+        dispatcher = team[0].dispatcher
+        check_reservations(dispatcher)
+    assert dispatcher.reservations
+
+    victim, forward = list(dispatcher.reservations)[:2]
+    target = dispatcher.reservations[victim]
+    victim.damage_taken(victim.health)
+    forward.change_state(Forward())
+    play(scene, 1)
+    assert victim not in dispatcher.reserved.get(target, ())
+    assert forward not in dispatcher.reservations
+    check_reservations(dispatcher)
+
+
+def trip_costs(drones, asteroids):
+    # a flight to the asteroid and home per unit of elerium taken, for every slot of the asteroids
+    slots = [(asteroid, asteroid.payload - slot * theme.MAX_DRONE_ELERIUM) for asteroid in asteroids
+             for slot in range(MAX_DRONES_PER_ASTEROID)
+             if asteroid.payload - slot * theme.MAX_DRONE_ELERIUM > 0]
+    return slots, [[(drone.distance_to(asteroid) + asteroid.distance_to(drone.mothership)) /
+                    min(remaining, drone.free_space) for asteroid, remaining in slots] for drone in drones]
+
+
+def test_collectors_get_the_cheapest_matching(new_scene, play):
+    scene, drones = new_scene(teams=(KonovalovDrone, ReaperDrone), number_of_drones=3)
+    play(scene, 30)
+    team = drones[0]
+    dispatcher = team[0].dispatcher
+    asteroids = get_snapshot(scene).asteroids
+    # one asteroid with room for one drone, two with room for two
+    for asteroid in asteroids[3:]:
+        asteroid.cargo._clip_payload(asteroid.payload)
+    asteroids[0].cargo._clip_payload(asteroids[0].payload - theme.MAX_DRONE_ELERIUM // 2)
+    play(scene, 1)
+    snapshot = get_snapshot(scene)
+    collectors = [drone for drone in dispatcher.collectors if not drone.is_full]
+    assert snapshot.asteroids == asteroids[:3] and len(collectors) == 3
+
+    dispatcher.match_collectors(collectors, snapshot)
+    slots, cost = trip_costs(collectors, asteroids[:3])
+    assert len(slots) == 5
+    best = min(sum(cost[row][column] for row, column in enumerate(chosen))
+               for chosen in permutations(range(len(slots)), len(collectors)))
+    assigned = [dispatcher.assignments[drone] for drone in collectors]
+    # drones of one asteroid take its slots in the cheapest order
+    total = 0.0
+    for asteroid in set(assigned):
+        rows = [row for row, other in enumerate(assigned) if other is asteroid]
+        columns = [column for column, (other, _) in enumerate(slots) if other is asteroid]
+        assert len(rows) <= len(columns)
+        total += min(sum(cost[row][column] for row, column in zip(rows, chosen))
+                     for chosen in permutations(columns, len(rows)))
+    assert abs(total - best) < 1e-6
+
+
+class KonovalovRival(KonovalovDrone):
+    """ The same code playing as another team """
+
+
+def test_every_team_and_scene_has_its_dispatcher(new_scene, play):
+    dispatchers = []
+    for seed in (0, 1):
+        scene, drones = new_scene(seed=seed, teams=(KonovalovDrone, KonovalovRival, ReaperDrone))
+        play(scene, 20)
+        for team in drones[:2]:
+            dispatcher = team[0].dispatcher
+            assert dispatcher.soldiers == team
+            assert [soldier.idx for soldier in team] == list(range(1, len(team) + 1))
+            assert all(soldier.dispatcher is dispatcher for soldier in team)
+            dispatchers.append(dispatcher)
+        assert 'dispatcher' not in vars(KonovalovDrone)
+        ours, rivals = drones[0][0].dispatcher, drones[1][0].dispatcher
+        victim = drones[1][0]
+        victim.damage_taken(victim.health)
+        play(scene, 1)
+        assert victim not in rivals.in_role(type(victim._state))
+        assert rivals.count(Collector) == len(drones[1]) - 1 and ours.count(Collector) == len(drones[0])
+    assert len({id(dispatcher) for dispatcher in dispatchers}) == 4
+
+
+def check_roles(dispatcher):
+    # the registry holds exactly the alive drones, grouped by the class of their state
+    alive = [soldier for soldier in dispatcher.soldiers if soldier.is_alive]
+    assert sorted(soldier.idx for soldiers in dispatcher.roles.values() for soldier in soldiers) == \
+        sorted(soldier.idx for soldier in alive)
+    for state, soldiers in dispatcher.roles.items():
+        assert all(type(soldier._state) is state for soldier in soldiers)
+        assert dispatcher.count(state) == len(soldiers)
+        assert dispatcher.in_role(state) == list(soldiers)
+    assert dispatcher.defenders == dispatcher.in_role(MainDefender) + dispatcher.in_role(Defender)
+
+
+def test_role_registry_follows_states(new_scene, play):
+    scene, drones = new_scene(teams=(KonovalovDrone, ReaperDrone, DevastatorDrone), number_of_drones=8)
+    play(scene, 50)
+    dispatcher = drones[0][0].dispatcher
+    check_roles(dispatcher)
+    assert dispatcher.collectors == drones[0]
+    for asteroid in get_snapshot(scene).asteroids:
+        asteroid.cargo._clip_payload(asteroid.payload)
+    play(scene, 1)
+    check_roles(dispatcher)
+    assert dispatcher.count(Collector) == 0
+    assert dispatcher.count(MainDefender) == 1
+    for _ in range(3):
+        victim = next(soldier for soldier in dispatcher.forwards + dispatcher.defenders if soldier.is_alive)
+        victim.damage_taken(victim.health)
+        play(scene, 40)
+        check_roles(dispatcher)
+
+
+def start_battle(scene, play):
+    play(scene, 40)
+    for asteroid in get_snapshot(scene).asteroids:
+        asteroid.cargo._clip_payload(asteroid.payload)
+    # roles are given when the snapshot of the next game step sees the last asteroid empty
+    scene._step += 1
+    get_snapshot(scene)
+
+
+def test_roles_scale_with_the_team(new_scene, play):
+    for number in (1, 2, 3, 5, 8, 12):
+        scene, drones = new_scene(number_of_drones=number)
+        start_battle(scene, play)
+        team = drones[0]
+        dispatcher = team[0].dispatcher
+        defenders = min(number, max(MIN_DEFENDERS, math.ceil(number * DEFENDERS_RATIO)))
+        assert dispatcher.count(MainDefender) == 1 and dispatcher.count(Defender) == defenders - 1
+        forwards = [soldier for soldier in team if isinstance(soldier._state, Forward) or
+                    isinstance(soldier._state, ToHeal) and isinstance(soldier.prev_state, Forward)]
+        assert len(forwards) == dispatcher.forward_slots == number - defenders
+        assert sorted(soldier.forward_slot for soldier in forwards) == list(range(len(forwards)))
+        if not forwards:
+            continue
+        # every slot has its own firing position around every enemy base, neighbours do not overlap
+        for (_, target), positions in dispatcher.attack_positions.items():
+            assert len(positions) == len(forwards)
+            for k, position in enumerate(positions):
+                assert KonovalovDrone.radius <= position.x <= FIELD[0] - KonovalovDrone.radius
+                assert KonovalovDrone.radius <= position.y <= FIELD[1] - KonovalovDrone.radius
+                for other in positions[k + 1:]:
+                    assert position.distance_to(other) > FORWARD_SPACING * 0.99
+
+
+def test_attack_positions_are_built_once_per_pair_of_bases(new_scene, play):
+    scene, drones = new_scene(number_of_drones=8)
+    start_battle(scene, play)
+    team = drones[0]
+    dispatcher = team[0].dispatcher
+    mothership = team[0].mothership
+    enemies = [other[0].mothership for other in drones[1:]]
+    assert set(dispatcher.attack_positions) == {(mothership, target) for target in enemies}
+    attack_range = team[0].attack_range
+    for (_, target), positions in dispatcher.attack_positions.items():
+        for position in positions:
+            assert MOTHERSHIP_HEALING_DISTANCE < target.distance_to(position) <= attack_range
+            assert all(base.distance_to(position) > MOTHERSHIP_HEALING_DISTANCE for base in enemies)
+
+    forward = next(soldier for soldier in team if soldier.forward_slot)
+    target = enemies[0]
+    positions = dispatcher.attack_positions[(mothership, target)]
+    behavior = SimpleNamespace(context=forward)
+    dispatcher.get_position_forward(behavior, target)
+    assert forward.attack_position is positions[forward.forward_slot % len(positions)]
+    assert dispatcher.attack_positions[(mothership, target)] is positions
+
+    # positions near a dead base are allowed again, the table is built anew
+    dead = enemies[1]
+    dead.damage_taken(dead.health)
+    play(scene, 1)
+    assert not dispatcher.attack_positions or dispatcher.attack_positions[(mothership, target)] is not positions
+    dispatcher.get_position_forward(behavior, target)
+    rebuilt = dispatcher.attack_positions[(mothership, target)]
+    assert rebuilt is not positions and forward.attack_position is rebuilt[forward.forward_slot % len(rebuilt)]
+    assert [(p.x, p.y) for p in rebuilt] == [(p.x, p.y) for p in dispatcher.get_attack_positions(
+        mothership, target, attack_range)]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from arena.profiler import TARGETS, CallStats, Profiler
+from enemies.utils.strategies import DroneUnitWithStrategies
+
+
+def methods():
+    return [(cls, dict(cls.__dict__)) for cls, _ in TARGETS]
+
+
+def test_profiler_counts_every_team_and_uninstalls(new_scene, play, tmp_path):
+    before = methods()
+    scene, drones = new_scene()
+    with Profiler() as profiler:
+        play(scene, 30)
+    assert methods() == before
+
+    teams = [team[0].team for team in drones]
+    assert sorted(profiler.totals) == sorted(teams)
+    assert all(profiler.totals[name][0] > 0 for name in teams)
+    for team in drones:
+        if isinstance(team[0], DroneUnitWithStrategies):
+            # every strategy drone runs its game_step once per game step
+            calls = sum(stat.calls for (name, callback, _), stat in profiler.stats.items()
+                        if name == team[0].team and callback == 'game_step')
+            assert calls == 30 * len(team)
+    assert all(stat.calls == sum(stat.histogram) for stat in profiler.stats.values())
+
+    # nothing is counted once uninstalled
+    calls = sum(stat.calls for stat in profiler.stats.values())
+    play(scene, 5)
+    assert sum(stat.calls for stat in profiler.stats.values()) == calls
+
+    profiler.write(str(tmp_path / 'profile.txt'))
+    with open(str(tmp_path / 'profile.txt')) as file:
+        report = file.read()
+    assert all(name in report for name in teams)
+    assert (tmp_path / 'profile.folded').exists()
+
+
+def test_percentile():
+    stat = CallStats()
+    for wall in (100, 100, 100, 5000):
+        stat.add(wall, wall)
+    assert stat.calls == 4 and stat.wall == 5300
+    assert stat.percentile(0.5) == 128
+    assert stat.percentile(0.99) == 8192
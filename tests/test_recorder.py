@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+from robogame_engine.scene import Scene
+
+from arena import recorder
+from arena.recorder import (COMMANDS, DIRECTION, NO_DRONE, NO_TARGET, POINT, BEFORE, CommandRecord, Recorder,
+                            Replayer, drift)
+from game import FIELD, NUMBER_OF_DRONES, TEAMS, make_scene
+from world.state import release_scene
+
+STEPS = 400
+SEED = 3
+# teams are seated out of their order, the replay has to seat them the same way
+SEATS = (3, 2, 0, 1)
+
+
+def play(scene, steps):
+    scene.prepare(**scene.init_kwargs)
+    for _ in range(steps):
+        scene._step += 1
+        scene.game_step()
+
+
+@pytest.fixture(scope='module')
+def record(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('records') / 'nested' / 'match.rec')
+    random.seed(SEED)
+    Scene._Scene__teams.clear()
+    scene, _ = make_scene(headless=True, corners=SEATS)
+    match_recorder = Recorder.attach(scene, path, SEED, TEAMS, NUMBER_OF_DRONES, FIELD, SEATS)
+    try:
+        play(scene, STEPS)
+    finally:
+        match_recorder.close()
+        release_scene(scene)
+    return path
+
+
+def test_header_and_match_local_ids(record):
+    replayer = Replayer(record)
+    assert (replayer.seed, replayer.field, replayer.number_of_drones) == (SEED, tuple(FIELD), NUMBER_OF_DRONES)
+    assert replayer.corners == list(SEATS)
+    assert replayer.steps == list(range(1, STEPS + 1))
+    frame = replayer.seek(STEPS)
+    assert [drone.id for drone in frame.drones] == list(range(len(TEAMS) * NUMBER_OF_DRONES))
+    assert [drone.team for drone in frame.drones] == [drone.id // NUMBER_OF_DRONES for drone in frame.drones]
+    commands = [command for frame in replayer.frames() for command in frame.commands]
+    assert {'move_at', 'turn_to'} <= {command.command for command in commands}
+
+
+def test_replay_follows_the_record(record):
+    replayer = Replayer(record)
+    for step in (1, STEPS // 2, STEPS):
+        _, frame = replayer.replay(step)
+        recorded = replayer.seek(step)
+        assert frame.step == step
+        assert drift(frame, recorded) < 0.01
+        assert [drone.payload for drone in frame.drones] == [drone.payload for drone in recorded.drones]
+
+
+def test_execute_death_angle(record):
+    scene, _ = Replayer(record).replay(1)
+    drones = sorted((obj for obj in scene.objects if isinstance(obj, recorder.Drone)), key=lambda obj: obj.id)
+    objects = {number: drone for number, drone in enumerate(drones)}
+    recorder._execute(objects, CommandRecord(2, 'death_angle', NO_DRONE, BEFORE, DIRECTION, 123.0, 0.0))
+    assert drones[2]._Drone__angle_of_death == 123
+
+
+@pytest.mark.parametrize('target', [7, POINT, DIRECTION, NO_TARGET])
+def test_every_command_is_formatted(target):
+    for name in COMMANDS:
+        text = recorder._format_command(CommandRecord(1, name, NO_DRONE, BEFORE, target, 5.0, 6.0))
+        assert text.startswith(name)
+
+
+def test_cli(record, capsys):
+    recorder.main([record, '--step', '1', '--until', '30', '--verbose'])
+    out = capsys.readouterr().out
+    assert 'step 30' in out and ' by #' in out
+    recorder.main([record, '--step', '20', '--replay', '--drone', '0'])
+    out = capsys.readouterr().out
+    assert 'largest drift from the record 0.0' in out
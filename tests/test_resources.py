@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from astrobox.core import Asteroid, Drone, MotherShip
+
+from world.state import get_snapshot
+
+
+def scan(scene):
+    # (elerium, sources) of asteroids and of wrecks with dead motherships
+    asteroids = [obj.payload for obj in scene.objects if isinstance(obj, Asteroid)]
+    loot = [obj.payload for obj in scene.objects if isinstance(obj, (Drone, MotherShip)) and not obj.is_alive]
+    return (sum(asteroids), sum(1 for payload in asteroids if payload > 0),
+            sum(loot), sum(1 for payload in loot if payload > 0))
+
+
+def counters(scene):
+    # counters are taken at the start of a game step, before drones move elerium
+    scene._step += 1
+    resources = get_snapshot(scene).resources
+    return resources.total, resources.nonempty, resources.loot, resources.loot_sources
+
+
+def test_counters_follow_the_payloads(new_scene, play):
+    scene, drones = new_scene()
+    for _ in range(6):
+        play(scene, 50)
+        assert counters(scene) == scan(scene)
+    loaded = [drone for team in drones for drone in team if not drone.is_empty]
+    assert loaded
+    for drone in loaded[:3]:
+        drone.damage_taken(drone.health)
+    base = max((team[0].my_mothership for team in drones), key=lambda mothership: mothership.payload)
+    assert base.payload > 0
+    base.damage_taken(base.health)
+    elerium, sources, loot, loot_sources = counters(scene)
+    assert (elerium, sources, loot, loot_sources) == scan(scene)
+    assert loot_sources >= 4 and loot >= base.payload
+    for asteroid in get_snapshot(scene).asteroids:
+        asteroid.cargo._clip_payload(asteroid.payload)
+    assert counters(scene)[:2] == (0, 0)
+    # Devastator transports unload elerium into asteroids, the counters follow them too
+    for _ in range(4):
+        play(scene, 25)
+        assert counters(scene) == scan(scene)
+
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from astrobox.core import Asteroid, Drone, MotherShip
+
+from world import state
+from world.snapshot import WorldSnapshot
+
+
+def test_snapshot_is_built_once_per_step(new_scene, play, monkeypatch):
+    built = []
+
+    class CountedSnapshot(WorldSnapshot):
+        def __init__(self, scene):
+            super().__init__(scene)
+            built.append(self.step)
+
+    monkeypatch.setattr(state, 'WorldSnapshot', CountedSnapshot)
+    scene, drones = new_scene()
+    play(scene, 30)
+    # all four teams ask for the snapshot many times in every step
+    assert built == list(range(1, 31))
+    snapshot = state.get_snapshot(scene)
+    assert state.get_snapshot(scene) is snapshot
+    assert built[-1] == 30
+
+
+def test_snapshot_sorts_out_the_scene(new_scene, play):
+    scene, drones = new_scene()
+    play(scene, 20)
+    victim = drones[1][0]
+    victim.damage_taken(victim.health)
+    drones[2][0].damage_taken(drones[2][0].health)
+    scene._step += 1
+    snapshot = state.get_snapshot(scene)
+    asteroids = [obj for obj in scene.objects if isinstance(obj, Asteroid)]
+    assert snapshot.all_asteroids == asteroids
+    assert snapshot.asteroids == [asteroid for asteroid in asteroids if asteroid.payload > 0]
+    assert set(snapshot.wrecks) == {victim, drones[2][0]}
+    for team_drones in drones:
+        team = team_drones[0].team
+        assert snapshot.drones[team] == [drone for drone in team_drones if drone.is_alive]
+        assert snapshot.motherships[team] is team_drones[0].my_mothership
+        assert set(snapshot.enemies(team)) == {obj for obj in scene.objects if isinstance(obj, Drone)
+                                               and obj.is_alive and obj.team != team}
+        assert snapshot.enemy_motherships(team) == [obj for obj in scene.objects if isinstance(obj, MotherShip)
+                                                    and obj.team != team]
+    asteroid, drone = asteroids[0], drones[0][1]
+    assert abs(snapshot.distance(drone, asteroid) - drone.distance_to(asteroid)) < 1e-6
+    assert abs(snapshot.distance(asteroid, drone) - drone.distance_to(asteroid)) < 1e-6
+    assert snapshot.distance(drone, victim) == drone.distance_to(victim)
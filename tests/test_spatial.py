@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+from collections import namedtuple
+
+from astrobox.core import Asteroid, Drone, MotherShip
+
+from world.spatial import SpatialGrid
+from world.state import get_snapshot
+
+Thing = namedtuple('Thing', 'id x y')
+
+
+def brute_force(things, point, radius=None, predicate=None):
+    found = [(math.hypot(thing.x - point.x, thing.y - point.y), thing.id, thing) for thing in things
+             if predicate is None or predicate(thing)]
+    return [(thing, distance) for distance, _, thing in sorted(found) if radius is None or distance <= radius]
+
+
+def odd(thing):
+    return thing.id % 2
+
+
+def test_iter_nearest_matches_sorted_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        width, height = rng.randint(100, 1500), rng.randint(100, 1000)
+        grid = SpatialGrid(width, height, cell_size=rng.choice((37, 100, 250)))
+        things = [Thing(i, rng.uniform(0, width), rng.uniform(0, height)) for i in range(rng.randint(0, 60))]
+        for thing in things:
+            grid.insert(thing)
+        # points off the field are clamped to the border cells
+        point = Thing(-1, rng.uniform(-100, width + 100), rng.uniform(-100, height + 100))
+        radius = rng.choice((None, rng.uniform(0, 600)))
+        assert list(grid.iter_nearest(point, radius=radius)) == brute_force(things, point, radius)
+        assert grid.nearest(point, k=3, predicate=odd) == brute_force(things, point, predicate=odd)[:3]
+
+
+def test_update_and_remove():
+    grid = SpatialGrid(1000, 1000, cell_size=100)
+    near, far = Thing(1, 50, 50), Thing(2, 900, 900)
+    grid.insert(near)
+    grid.insert(far)
+    moved = Thing(2, 60, 60)
+    grid.remove(far)
+    grid.insert(moved)
+    assert len(grid) == 2 and far not in grid
+    assert grid.nearest(Thing(0, 0, 0), k=None) == brute_force([near, moved], Thing(0, 0, 0))
+    grid.remove(near)
+    assert grid.within(Thing(0, 0, 0), 1000) == brute_force([moved], Thing(0, 0, 0))
+
+
+def test_world_grid_follows_the_scene(new_scene, play):
+    scene, drones = new_scene()
+    for _ in range(5):
+        play(scene, 40)
+        grid = get_snapshot(scene).grid
+        units = [obj for obj in scene.objects if isinstance(obj, (Asteroid, Drone, MotherShip))]
+        assert len(grid) == len(units)
+        for drone in drones[0]:
+            assert grid.nearest(drone, k=4) == brute_force(units, drone)[:4]
+            assert grid.within(drone, 300, predicate=lambda obj: isinstance(obj, Drone)) == brute_force(
+                units, drone, 300, predicate=lambda obj: isinstance(obj, Drone))
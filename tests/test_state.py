@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import gc
+import weakref
+
+from enemies.devastator import DevastatorDrone, Headquarters
+from enemies.reaper import ReaperDrone, ReaperStrategy
+from world.state import get_team_state, get_world, release_scene
+
+
+def positions(drones):
+    return [(drone.x, drone.y, drone.payload, drone.health) for team in drones for drone in team]
+
+
+def test_release_scene_drops_its_state(new_scene, play):
+    scene, drones = new_scene()
+    play(scene, 10)
+    world = get_world(scene)
+    assert get_team_state(scene, drones[3][0].team, Headquarters) is drones[3][0].headquarters
+    teams = {team for team, _ in world._teams}
+    assert {team[0].team for team in drones} <= teams
+    collected = weakref.ref(world)
+    release_scene(scene)
+    del world
+    gc.collect()
+    # drones keep their team state, but nothing keeps the world of a released scene
+    assert collected() is None
+    fresh = get_world(scene)
+    assert not fresh._teams and fresh is get_world(scene)
+    assert get_team_state(scene, drones[3][0].team, Headquarters) is not drones[3][0].headquarters
+
+
+def test_team_state_is_scoped_to_the_scene(new_scene, play):
+    # the engine has one current scene, so they are played one after another
+    headquarters, data = [], []
+    for field in ((1200, 800), (900, 600)):
+        scene, drones = new_scene(teams=(ReaperDrone, DevastatorDrone), field=field)
+        play(scene, 5)
+        team = drones[1][0].team
+        assert get_team_state(scene, team, Headquarters) is drones[1][0].headquarters
+        assert get_team_state(scene, team, list) is not get_team_state(scene, team, list, key='other')
+        assert get_team_state(scene, 'other team', Headquarters) is not drones[1][0].headquarters
+        headquarters.append(drones[1][0].headquarters)
+        data.append(get_team_state(scene, drones[0][0].team, None, key=ReaperStrategy.Data))
+    assert headquarters[0] is not headquarters[1]
+    assert isinstance(data[0], ReaperStrategy.Data) and data[0] is not data[1]
+
+
+def test_a_scene_plays_the_same_after_another_one(new_scene, play):
+    plays = []
+    for seed in (0, 5, 0):
+        scene, drones = new_scene(seed=seed)
+        play(scene, 150)
+        plays.append(positions(drones))
+        release_scene(scene)
+    assert plays[0] == plays[2] != plays[1]
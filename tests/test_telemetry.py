@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+import math
+from collections import defaultdict
+
+from astrobox.core import Asteroid, Drone, MotherShip
+
+from arena.observers import add_step_observer
+from arena.telemetry import DRONE_FIELDS, Telemetry
+from world.resources import CARGO_STATES, cargo_state
+
+
+def test_cargo_state(new_scene):
+    scene, drones = new_scene()
+    drone = drones[0][0]
+    asteroid = max((obj for obj in scene.objects if isinstance(obj, Asteroid)), key=lambda obj: obj.payload)
+    assert cargo_state(drone) == 'empty'
+    drone.cargo._transfer_payload(1, asteroid.cargo)
+    assert cargo_state(drone) == 'semi'
+    drone.cargo._transfer_payload(drone.free_space, asteroid.cargo)
+    assert drone.is_full and cargo_state(drone) == 'full'
+
+
+def watch(scene):
+    """
+    Distances by cargo state and mothership payloads, counted next to the telemetry
+    """
+    coords, distance, payloads = {}, defaultdict(lambda: dict.fromkeys(CARGO_STATES, 0.0)), {}
+
+    def on_game_step(scene):
+        for obj in scene.objects:
+            if isinstance(obj, Drone) and obj.is_alive:
+                x, y = coords.get(obj.id, (obj.x, obj.y))
+                distance[obj.team][cargo_state(obj)] += math.hypot(obj.x - x, obj.y - y)
+                coords[obj.id] = (obj.x, obj.y)
+            elif isinstance(obj, MotherShip) and obj.team not in payloads:
+                payloads[obj.team] = obj.payload
+
+    for obj in scene.objects:
+        if isinstance(obj, Drone):
+            coords[obj.id] = (obj.x, obj.y)
+    add_step_observer(scene, on_game_step)
+    return distance, payloads
+
+
+def test_telemetry_follows_the_drones(new_scene, play):
+    scene, drones = new_scene(seed=1)
+    telemetry = Telemetry.attach(scene)
+    distance, payloads = watch(scene)
+    play(scene, 400)
+
+    assert telemetry.steps == scene._step
+    summary = telemetry.summary()
+    assert sorted(summary) == sorted(team[0].team for team in drones)
+    for team in drones:
+        stats = summary[team[0].team]
+        assert stats['drones'] == len(team)
+        for state in CARGO_STATES:
+            assert abs(stats['distance'][state] - distance[team[0].team][state]) < 1e-6
+        assert sum(stats['distance'].values()) > 0
+        # every drone step lands in exactly one bucket
+        steps_alive = sum(telemetry.drones[drone.id].steps_alive for drone in team)
+        assert sum(stats['steps'].values()) == steps_alive
+        mothership = team[0].mothership
+        assert stats['delivered'] == mothership.payload - payloads[mothership.team]
+    assert any(stats['delivered'] > 0 for stats in summary.values())
+
+
+def test_telemetry_files(new_scene, play, tmp_path):
+    scene, drones = new_scene()
+    telemetry = Telemetry.attach(scene)
+    play(scene, 200)
+
+    telemetry.write(str(tmp_path / 'match.json'))
+    with open(str(tmp_path / 'match.json')) as file:
+        data = json.load(file)
+    assert data['steps'] == scene._step
+    assert len(data['drones']) == sum(len(team) for team in drones)
+    assert sum(row['elerium'] for row in data['delivered']) == \
+        sum(team['delivered'] for team in data['teams'].values())
+
+    telemetry.write(str(tmp_path / 'match.csv'))
+    with open(str(tmp_path / 'match.csv'), newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert rows and list(rows[0]) == DRONE_FIELDS
+    assert sorted(row['drone'] for row in rows) == sorted(str(row['drone']) for row in data['drones'])
+    with open(str(tmp_path / 'match_delivered.csv'), newline='') as file:
+        assert len(list(csv.DictReader(file))) == len(data['delivered'])
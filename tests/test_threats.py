@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import random
+
+from astrobox.core import Drone
+
+from world.state import get_snapshot
+
+
+def brute_force(scene, unit, k=None, radius=None, min_home_distance=None):
+    found = []
+    for drone in scene.objects:
+        if not isinstance(drone, Drone) or not drone.is_alive or drone.team == unit.team:
+            continue
+        distance = drone.distance_to(unit)
+        if radius is not None and distance > radius:
+            continue
+        if min_home_distance is not None and drone.distance_to(drone.mothership) <= min_home_distance:
+            continue
+        found.append((distance, drone.id, drone))
+    return [(drone, distance) for distance, _, drone in sorted(found)][:k]
+
+
+def same(found, expected):
+    return [drone for drone, _ in found] == [drone for drone, _ in expected] and \
+        all(abs(distance - other) < 1e-6 for (_, distance), (_, other) in zip(found, expected))
+
+
+def next_snapshot(scene):
+    # drones move during a game step, the tracker keeps positions of its start
+    scene._step += 1
+    return get_snapshot(scene)
+
+
+def test_nearest_threats_match_a_scan(new_scene, play):
+    scene, drones = new_scene()
+    rng = random.Random(0)
+    for _ in range(4):
+        play(scene, 60)
+        threats = next_snapshot(scene).threats
+        assert threats.step == scene._step
+        units = [drone for team in drones for drone in team if drone.is_alive] + \
+            [team[0].my_mothership for team in drones]
+        for unit in units:
+            for k in (None, 1, 3):
+                radius = rng.choice((None, 150, 400))
+                home = rng.choice((None, 10, 200))
+                assert same(threats.nearest(unit, k=k, radius=radius, min_home_distance=home),
+                            brute_force(scene, unit, k, radius, home))
+
+
+def test_drones_killed_in_the_step_are_skipped(new_scene, play):
+    scene, drones = new_scene()
+    play(scene, 60)
+    unit = drones[0][0]
+    threats = next_snapshot(scene).threats
+    nearest = threats.nearest(unit, k=2)
+    nearest[0][0].damage_taken(nearest[0][0].health)
+    # the arrays are of the start of the game step, the dead drone is not returned anymore
+    assert threats.nearest(unit, k=2)[0] == nearest[1]
+    assert same(threats.nearest(unit, k=2), brute_force(scene, unit, 2))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import random
+from collections import defaultdict
+
+from astrobox.core import MotherShip
+
+from arena.tournament import Ratings, expected_score, match_scores, schedule
+from enemies.driller import DrillerDrone
+from enemies.reaper import ReaperDrone
+from game import CORNERS, FIELD
+
+
+def make_result(seed, elerium, corners=None):
+    return {'seed': seed, 'corners': corners or list(CORNERS[:len(elerium)]),
+            'teams': {team: {'elerium': value} for team, value in elerium.items()}}
+
+
+def test_expected_score():
+    assert expected_score(700, 700) == 0.5
+    assert abs(expected_score(900, 700) + expected_score(700, 900) - 1.0) < 1e-12
+
+
+def test_match_scores():
+    scores = match_scores(make_result(0, {'a': 10, 'b': 5, 'c': 10}))
+    assert scores == [('a', 'b', 1.0), ('a', 'c', 0.5), ('b', 'c', 0.0)]
+
+
+def test_ratings_are_zero_sum_within_a_match():
+    rng = random.Random(0)
+    ratings = Ratings()
+    teams = ['a', 'b', 'c', 'd']
+    for seed in range(200):
+        playing = rng.sample(teams, rng.randint(2, 4))
+        before = {team: ratings.rating(team) for team in playing}
+        ratings.update(make_result(seed, {team: rng.choice((0, 100, 200)) for team in playing}))
+        assert abs(sum(ratings.rating(team) - before[team] for team in playing)) < 1e-9
+        # K is shared between the opponents, one match moves a rating by less than K
+        assert all(abs(ratings.rating(team) - before[team]) < ratings.k_factor for team in playing)
+    assert abs(sum(ratings.rating(team) for team in teams) - len(teams) * ratings.start) < 1e-6
+
+
+def test_ratings_remember_counted_matches(tmp_path):
+    path = str(tmp_path / 'ratings.json')
+
+    class Alpha:
+        pass
+
+    class Beta:
+        pass
+
+    ratings = Ratings(path)
+    ratings.update(make_result(3, {'Beta': 5, 'Alpha': 3}, corners=[2, 3]))
+    ratings.save()
+    loaded = Ratings(path)
+    assert loaded.ratings == ratings.ratings
+    assert loaded.counted(3, (Beta, Alpha), (2, 3))
+    assert not loaded.counted(3, (Beta, Alpha), (0, 1))
+    assert not loaded.counted(3, (Alpha, Beta), (2, 3))
+    assert not loaded.counted(4, (Beta, Alpha), (2, 3))
+
+
+def test_schedule_rotates_corners():
+    teams = ['a', 'b', 'c']
+    matches = schedule(teams, rounds=2, seed=5, mode='both')
+    assert {seed for seed, _, _ in matches} == {5, 6}
+    pairs = [order for seed, order, _ in matches if seed == 5 and len(order) == 2]
+    assert sorted(pairs) == sorted([('a', 'b'), ('b', 'a'), ('a', 'c'), ('c', 'a'), ('b', 'c'), ('c', 'b')])
+    everyone = [order for seed, order, _ in matches if seed == 5 and len(order) == 3]
+    for place in range(3):
+        assert sorted(order[place] for order in everyone) == teams
+    for _, order, corners in matches:
+        assert len(corners) == len(order) == len(set(corners))
+        assert set(corners) <= set(CORNERS)
+
+
+def seated(matches):
+    # (team, opponents) -> corners the team started from
+    corners = defaultdict(set)
+    for _, order, seats in matches:
+        for team, corner in zip(order, seats):
+            corners[team, frozenset(order) - {team}].add(corner)
+    return corners
+
+
+def test_every_team_plays_from_every_corner():
+    teams = ['a', 'b', 'c', 'd']
+    pairs = schedule(teams, rounds=2, mode='rr')
+    assert len(seated(pairs)) == 12
+    assert all(corners == set(CORNERS) for corners in seated(pairs).values())
+    # one round already seats a pair in the top and in the bottom corners
+    first_round = [match for match in pairs if match[0] == 0]
+    assert {seats for _, _, seats in first_round} == {(0, 1), (2, 3)}
+    for size in (2, 3, 4):
+        everyone = schedule(teams[:size], rounds=4, mode='ffa')
+        assert all(corners == set(CORNERS) for corners in seated(everyone).values())
+
+
+def test_pairs_start_from_their_seats(new_scene, play):
+    radius = MotherShip.radius
+    places = {0: (radius, radius), 1: (FIELD[0] - radius, radius),
+              2: (radius, FIELD[1] - radius), 3: (FIELD[0] - radius, FIELD[1] - radius)}
+    for seats in ((2, 3), (1, 0), (3, 2)):
+        scene, drones = new_scene(teams=(ReaperDrone, DrillerDrone), corners=seats)
+        play(scene, 50)
+        for team_drones, corner in zip(drones, seats):
+            mothership = team_drones[0].my_mothership
+            assert (mothership.x, mothership.y) == places[corner]
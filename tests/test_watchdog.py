@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from enemies.driller import DrillerDrone
+from world.state import get_watchdog
+from world.watchdog import TickWatchdog
+
+
+def test_measures_without_budget():
+    watchdog = TickWatchdog()
+    for step in range(3):
+        for _ in range(4):
+            assert watchdog.run('a', step, lambda: 'planned', lambda: 'cached') == 'planned'
+    summary = watchdog.summary()['a']
+    assert summary['decisions'] == 12
+    assert summary['fallbacks'] == summary['overruns'] == 0
+    assert summary['worst_tick'] >= summary['worst_decision'] > 0
+
+
+def test_falls_back_after_overrun_until_the_next_step():
+    watchdog = TickWatchdog(budget=0.0)
+    calls = []
+
+    def planner():
+        calls.append('planned')
+        return 'planned'
+
+    assert watchdog.run('a', 1, planner, lambda: 'cached') == 'planned'
+    assert watchdog.run('a', 1, planner, lambda: 'cached') == 'cached'
+    # other teams have their own budget
+    assert watchdog.run('b', 1, planner, lambda: 'cached') == 'planned'
+    assert watchdog.run('a', 2, planner, lambda: 'cached') == 'planned'
+    summary = watchdog.summary()
+    assert calls == ['planned'] * 3
+    assert summary['a']['fallbacks'] == 1
+    assert summary['a']['overruns'] == 2
+    assert summary['b']['overruns'] == 1
+
+
+def test_exceptions_are_timed():
+    watchdog = TickWatchdog()
+
+    def planner():
+        raise RuntimeError
+
+    try:
+        watchdog.run('a', 1, planner, lambda: None)
+    except RuntimeError:
+        pass
+    assert watchdog.summary()['a']['decisions'] == 1
+
+
+def test_every_team_goes_through_the_watchdog(new_scene, play):
+    scene, drones = new_scene(seed=1)
+    get_watchdog(scene).budget = 0.0
+    play(scene, 300)
+    summary = get_watchdog(scene).summary()
+    teams = {team_drones[0].team for team_drones in drones}
+    assert DrillerDrone.__name__ in teams
+    assert set(summary) == teams
+    # with no budget at all every team repeats its decisions from the second planner of a step on
+    assert all(stats['fallbacks'] > 0 for stats in summary.values())
+    # decisions of the cached fallbacks are still valid game objects
+    assert all(drone.is_alive for team_drones in drones for drone in team_drones)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+
+def solve_assignment(cost):
+    """
+    Min-cost matching of rows to columns, Hungarian algorithm in O(n^2 * m)
+    Every row gets a column when there are enough columns, otherwise every column gets a row
+    :param cost: list() of rows of finite costs, all rows have the same length
+    :return: list() of (row, column) pairs sorted by row
+    """
+    if not cost or not cost[0]:
+        return []
+    transposed = len(cost) > len(cost[0])
+    if transposed:
+        cost = [list(column) for column in zip(*cost)]
+    n, m = len(cost), len(cost[0])
+
+    inf = float("inf")
+    # potentials of rows and columns, matching and augmenting path, all 1-based, 0 is a fake column
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    pairs = [(match[j] - 1, j - 1) for j in range(1, m + 1) if match[j]]
+    if transposed:
+        pairs = [(column, row) for row, column in pairs]
+    return sorted(pairs)
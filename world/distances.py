@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+class StaticDistances:
+    """
+    Distance matrix of objects that never move: asteroids and motherships.
+    Built once per scene, rows are indexed by object id
+    """
+
+    def __init__(self, objects):
+        self.objects = list(objects)
+        self._index = {obj.id: k for k, obj in enumerate(self.objects)}
+        self._x = np.array([obj.x for obj in self.objects], dtype=float)
+        self._y = np.array([obj.y for obj in self.objects], dtype=float)
+        self.matrix = np.hypot(self._x[:, None] - self._x[None, :], self._y[:, None] - self._y[None, :])
+        self._neighbours = {}
+
+    def __contains__(self, obj):
+        return obj.id in self._index
+
+    def index(self, obj):
+        """
+        :return: int, row of the object or None if it is not static
+        """
+        return self._index.get(obj.id)
+
+    def distance(self, a, b):
+        """
+        O(1) for two static objects, computed for anything else
+        """
+        ia = self._index.get(a.id)
+        ib = self._index.get(b.id)
+        if ia is not None and ib is not None:
+            return float(self.matrix[ia, ib])
+        return a.distance_to(b)
+
+    def row(self, obj):
+        """
+        :return: numpy.ndarray, distances from static obj to all static objects
+        """
+        return self.matrix[self._index[obj.id]]
+
+    def from_point(self, point):
+        """
+        :param point: robogame_engine.geometry.Point() or any object with x and y
+        :return: numpy.ndarray, distances from the point to all static objects
+        """
+        return np.hypot(self._x - point.x, self._y - point.y)
+
+    def neighbours(self, obj):
+        """
+        Static objects sorted by distance from static obj, the obj itself goes first
+        :return: list() of objects
+        """
+        neighbours = self._neighbours.get(obj.id)
+        if neighbours is None:
+            order = np.argsort(self.row(obj), kind='stable')
+            neighbours = self._neighbours[obj.id] = [self.objects[k] for k in order]
+        return neighbours
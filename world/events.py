@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+
+class Event:
+    """
+    Something that changed in the scene since the previous game step
+    """
+    __slots__ = ('step', 'source')
+
+    def __init__(self, step, source):
+        self.step = step
+        self.source = source
+
+    def __repr__(self):
+        return '%s(step=%s, source=%r)' % (type(self).__name__, self.step, self.source)
+
+
+class AsteroidEmptied(Event):
+    """ The last elerium was taken from the asteroid """
+    __slots__ = ()
+
+
+class AsteroidsDepleted(Event):
+    """ All asteroids are empty, source is None """
+    __slots__ = ()
+
+
+class DroneDied(Event):
+    __slots__ = ()
+
+
+class MothershipDied(Event):
+    __slots__ = ()
+
+
+class MothershipEmptied(Event):
+    """ The last elerium was taken from a dead mothership """
+    __slots__ = ()
+
+
+class EventBus:
+    """
+    Delivers scene events to subscribed callbacks in the order of subscription
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+
+    def subscribe(self, event_type, callback):
+        """
+        :param event_type: subclass of Event()
+        :param callback: function(event)
+        """
+        self._subscribers.setdefault(event_type, []).append(callback)
+
+    def unsubscribe(self, event_type, callback):
+        callbacks = self._subscribers.get(event_type)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, event):
+        for callback in list(self._subscribers.get(type(event), ())):
+            callback(event)
+
+
+class SceneObserver:
+    """
+    Diffs alive drones and motherships of two consecutive snapshots and finds deaths
+    """
+
+    def __init__(self):
+        self._alive_drones = None
+        self._alive_motherships = None
+
+    def update(self, snapshot):
+        """
+        :param snapshot: world.snapshot.WorldSnapshot()
+        :return: list() of DroneDied() and MothershipDied() since the previous snapshot
+        """
+        events = []
+        alive_drones = {drone.id for drones in snapshot.drones.values() for drone in drones}
+        alive_motherships = {base.id for base in snapshot.motherships.values() if base.is_alive}
+        if self._alive_drones is not None:
+            for drone in snapshot.wrecks:
+                if drone.id in self._alive_drones:
+                    events.append(DroneDied(snapshot.step, drone))
+            for base in snapshot.motherships.values():
+                if base.id in self._alive_motherships and base.id not in alive_motherships:
+                    events.append(MothershipDied(snapshot.step, base))
+        self._alive_drones = alive_drones
+        self._alive_motherships = alive_motherships
+        return events
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from .events import AsteroidEmptied, AsteroidsDepleted, MothershipEmptied
+
+CARGO_STATES = ('empty', 'semi', 'full')
+
+
+def cargo_state(unit):
+    """
+    :param unit: astrobox.core.Unit()
+    :return: str, one of CARGO_STATES
+    """
+    if unit.is_empty:
+        return 'empty'
+    if unit.is_full:
+        return 'full'
+    return 'semi'
+
+
+class ResourceTracker:
+    """
+    Elerium left in the scene. Counters are updated by a diff of payloads once per game step,
+    so checks like "is anything left" cost O(1) for every drone
+    """
+
+    def __init__(self):
+        # elerium and count of non-empty sources in asteroids
+        self.total = 0
+        self.nonempty = 0
+        # the same for wrecks and dead motherships
+        self.loot = 0
+        self.loot_sources = 0
+        self._payloads = {}
+
+    def payload(self, source):
+        """
+        :param source: astrobox.core.Unit()
+        :return: int, payload of the source at the start of the game step
+        """
+        return self._payloads.get(source.id, 0)
+
+    def _diff(self, source):
+        old = self._payloads.get(source.id, 0)
+        new = source.payload
+        if old == new:
+            return 0, 0
+        self._payloads[source.id] = new
+        return new - old, (new > 0) - (old > 0)
+
+    def update(self, snapshot):
+        """
+        :param snapshot: world.snapshot.WorldSnapshot()
+        :return: list() of events about sources which became empty
+        """
+        events = []
+        had_elerium = self.nonempty > 0
+        for asteroid in snapshot.all_asteroids:
+            payload, nonempty = self._diff(asteroid)
+            self.total += payload
+            self.nonempty += nonempty
+            if nonempty < 0:
+                events.append(AsteroidEmptied(snapshot.step, asteroid))
+        for base in snapshot.motherships.values():
+            if not base.is_alive:
+                payload, nonempty = self._diff(base)
+                self.loot += payload
+                self.loot_sources += nonempty
+                if nonempty < 0:
+                    events.append(MothershipEmptied(snapshot.step, base))
+        for drone in snapshot.wrecks:
+            payload, nonempty = self._diff(drone)
+            self.loot += payload
+            self.loot_sources += nonempty
+        if had_elerium and not self.nonempty:
+            events.append(AsteroidsDepleted(snapshot.step, None))
+        return events
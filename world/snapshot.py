@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from astrobox.core import Asteroid, Drone, MotherShip
+
+
+class WorldSnapshot:
+    """
+    Scene objects sorted out once per game step and shared by every drone of every team
+    """
+
+    def __init__(self, scene):
+        self.step = scene._step
+        self.all_asteroids = []
+        self.asteroids = []
+        self.motherships = {}
+        self.dead_motherships = []
+        self.wrecks = []
+        self.drones = {}
+        self._enemies = {}
+        # world.spatial.SpatialGrid() of all units, world.distances.StaticDistances(),
+        # world.resources.ResourceTracker() and world.threats.ThreatTracker()
+        # are kept for the whole scene and set by world.state.World
+        self.grid = None
+        self.distances = None
+        self.resources = None
+        self.threats = None
+        self._rows = {}
+        for obj in scene.objects:
+            if isinstance(obj, Asteroid):
+                self.all_asteroids.append(obj)
+                if obj.payload > 0:
+                    self.asteroids.append(obj)
+            elif isinstance(obj, Drone):
+                if obj.is_alive:
+                    self.drones.setdefault(obj.team, []).append(obj)
+                else:
+                    self.wrecks.append(obj)
+            elif isinstance(obj, MotherShip):
+                self.motherships[obj.team] = obj
+                if not obj.is_alive and obj.payload > 0:
+                    self.dead_motherships.append(obj)
+
+    def enemies(self, team):
+        """
+        Alive drones of all other teams
+        :param team: str, team name
+        :return: list() of astrobox.core.Drone()
+        """
+        enemies = self._enemies.get(team)
+        if enemies is None:
+            enemies = [drone for other, drones in self.drones.items() if other != team for drone in drones]
+            self._enemies[team] = enemies
+        return enemies
+
+    def enemy_motherships(self, team):
+        """
+        Alive motherships of all other teams
+        :param team: str, team name
+        :return: list() of astrobox.core.MotherShip()
+        """
+        return [base for base in self.motherships.values() if base.team != team and base.is_alive]
+
+    def distances_from(self, unit):
+        """
+        Distances from the unit to all static objects, computed once per game step for moving units
+        :param unit: robogame_engine.GameObject()
+        :return: numpy.ndarray, indexed by self.distances.index()
+        """
+        if unit in self.distances:
+            return self.distances.row(unit)
+        row = self._rows.get(unit.id)
+        if row is None:
+            row = self._rows[unit.id] = self.distances.from_point(unit)
+        return row
+
+    def distance(self, a, b):
+        """
+        Distance by array lookups when at least one of the objects is static
+        """
+        ib = self.distances.index(b)
+        if ib is not None:
+            return float(self.distances_from(a)[ib])
+        ia = self.distances.index(a)
+        if ia is not None:
+            return float(self.distances_from(b)[ia])
+        return a.distance_to(b)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import heapq
+import math
+from itertools import islice
+
+from robogame_engine.theme import theme
+
+
+class SpatialGrid:
+    """
+    Uniform grid over the field for nearest and radius queries.
+    Objects are bucketed by cell, moving objects are re-bucketed only when they cross a cell border
+    """
+
+    def __init__(self, width=None, height=None, cell_size=100):
+        self.width = theme.FIELD_WIDTH if width is None else width
+        self.height = theme.FIELD_HEIGHT if height is None else height
+        self.cell_size = cell_size
+        self.columns = max(1, int(math.ceil(self.width / cell_size)))
+        self.rows = max(1, int(math.ceil(self.height / cell_size)))
+        self._cells = {}
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, obj):
+        return obj in self._where
+
+    def _cell(self, x, y):
+        column = min(max(int(x // self.cell_size), 0), self.columns - 1)
+        row = min(max(int(y // self.cell_size), 0), self.rows - 1)
+        return column, row
+
+    def insert(self, obj):
+        """
+        :param obj: any object with x, y and id, usually robogame_engine.GameObject()
+        """
+        self.update(obj)
+
+    def remove(self, obj):
+        cell = self._where.pop(obj, None)
+        if cell is not None:
+            del self._cells[cell][obj]
+
+    def update(self, obj):
+        """
+        Moving object to the cell of its current coordinates
+        """
+        cell = self._cell(obj.x, obj.y)
+        old_cell = self._where.get(obj)
+        if old_cell == cell:
+            return
+        if old_cell is not None:
+            del self._cells[old_cell][obj]
+        self._where[obj] = cell
+        # dict keeps insertion order, so queries do not depend on hashes
+        self._cells.setdefault(cell, {})[obj] = None
+
+    def _ring(self, column, row, ring):
+        if ring == 0:
+            yield column, row
+            return
+        for i in range(max(column - ring, 0), min(column + ring, self.columns - 1) + 1):
+            if row - ring >= 0:
+                yield i, row - ring
+            if row + ring < self.rows:
+                yield i, row + ring
+        for j in range(max(row - ring + 1, 0), min(row + ring - 1, self.rows - 1) + 1):
+            if column - ring >= 0:
+                yield column - ring, j
+            if column + ring < self.columns:
+                yield column + ring, j
+
+    def iter_nearest(self, point, radius=None, predicate=None):
+        """
+        Objects in order of distance, cells are scanned ring by ring only as far as the caller iterates
+        :param point: robogame_engine.geometry.Point() or any object with x and y
+        :param radius: float, objects further than radius are skipped
+        :param predicate: function(obj) -> bool, objects failing it are skipped
+        :return: generator of (obj, distance)
+        """
+        x, y = point.x, point.y
+        column, row = self._cell(x, y)
+        last_ring = max(column, self.columns - 1 - column, row, self.rows - 1 - row)
+        queue = []
+        for ring in range(last_ring + 1):
+            for cell in self._ring(column, row, ring):
+                for obj in self._cells.get(cell, ()):
+                    if predicate is not None and not predicate(obj):
+                        continue
+                    distance = math.hypot(obj.x - x, obj.y - y)
+                    if radius is not None and distance > radius:
+                        continue
+                    heapq.heappush(queue, (distance, obj.id, obj))
+            # Objects of the next rings are at least that far
+            bound = ring * self.cell_size
+            while queue and queue[0][0] <= bound:
+                distance, _, obj = heapq.heappop(queue)
+                yield obj, distance
+            if radius is not None and bound >= radius:
+                break
+        while queue:
+            distance, _, obj = heapq.heappop(queue)
+            yield obj, distance
+
+    def nearest(self, point, k=1, radius=None, predicate=None):
+        """
+        :param k: int, count of objects, None for all of them
+        :return: list() of (obj, distance) sorted by distance
+        """
+        return list(islice(self.iter_nearest(point, radius=radius, predicate=predicate), k))
+
+    def within(self, point, radius, predicate=None):
+        """
+        :return: list() of (obj, distance) not further than radius, sorted by distance
+        """
+        return list(self.iter_nearest(point, radius=radius, predicate=predicate))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import weakref
+
+from .distances import StaticDistances
+from .events import EventBus, SceneObserver
+from .resources import ResourceTracker
+from .snapshot import WorldSnapshot
+from .spatial import SpatialGrid
+from .threats import ThreatTracker
+from .watchdog import TickWatchdog
+
+_worlds = weakref.WeakKeyDictionary()
+
+
+class World:
+    """
+    State of one scene shared by all team implementations.
+    Holds no strong reference to the scene, so it is released together with it.
+    The snapshot of every game step is built and its events are published before any object
+    of the scene acts, so subscribers never run inside a callback of some other team
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._grid = None
+        self._distances = None
+        self.events = EventBus()
+        self._observer = SceneObserver()
+        self._resources = ResourceTracker()
+        self._threats = ThreatTracker()
+        self.watchdog = TickWatchdog()
+        self._teams = {}
+
+    def snapshot(self, scene):
+        """
+        Snapshot of the current game step, built by the first drone asking for it
+        :param scene: astrobox.space_field.SpaceField()
+        :return: WorldSnapshot()
+        """
+        if self._snapshot is None or self._snapshot.step != scene._step:
+            self._snapshot = WorldSnapshot(scene)
+            if self._distances is None:
+                # the first snapshot is asked for in on_born, when the field is already filled
+                self._distances = StaticDistances(self._snapshot.all_asteroids +
+                                                  list(self._snapshot.motherships.values()))
+            self._snapshot.distances = self._distances
+            self._snapshot.resources = self._resources
+            self._snapshot.threats = self._threats
+            self._update_grid(self._snapshot)
+            self._threats.update(self._snapshot)
+            events = self._observer.update(self._snapshot) + self._resources.update(self._snapshot)
+            # subscribers may ask for the snapshot again, so events go when all trackers are updated
+            for event in events:
+                self.events.publish(event)
+        return self._snapshot
+
+    def attach(self, scene):
+        """
+        Building the snapshot at the start of every game step, before objects of the scene act.
+        The first snapshot is built by the first drone asking for it in on_born
+        :param scene: astrobox.space_field.SpaceField()
+        """
+        game_step = scene.game_step
+        world = weakref.ref(self)
+
+        def game_step_with_world():
+            # the engine counts the step before calling game_step()
+            if world() is not None:
+                world().snapshot(scene)
+            game_step()
+
+        scene.game_step = game_step_with_world
+
+    def team_state(self, team, factory, key=None):
+        """
+        Shared state of one team in this scene, created by the first drone asking for it
+        :param team: str, team name
+        :param factory: callable without arguments, makes the state
+        :param key: hashable, tells apart several states of one team, the factory by default
+        """
+        key = (team, factory if key is None else key)
+        state = self._teams.get(key)
+        if state is None:
+            state = self._teams[key] = factory()
+        return state
+
+    def _update_grid(self, snapshot):
+        if self._grid is None:
+            # asteroids and motherships never move
+            self._grid = SpatialGrid()
+            for asteroid in snapshot.all_asteroids:
+                self._grid.insert(asteroid)
+            for mothership in snapshot.motherships.values():
+                self._grid.insert(mothership)
+        for drones in snapshot.drones.values():
+            for drone in drones:
+                self._grid.update(drone)
+        for drone in snapshot.wrecks:
+            self._grid.update(drone)
+        snapshot.grid = self._grid
+
+
+def get_world(scene):
+    world = _worlds.get(scene)
+    if world is None:
+        world = _worlds[scene] = World()
+        world.attach(scene)
+    return world
+
+
+def release_scene(scene):
+    """
+    Dropping the state of a finished scene.
+    The engine keeps the last scene in class attributes, so it is not collected by itself
+    """
+    _worlds.pop(scene, None)
+
+
+def get_team_state(scene, team, factory, key=None):
+    return get_world(scene).team_state(team, factory, key)
+
+
+def get_events(scene):
+    """
+    :return: world.events.EventBus() of the scene
+    """
+    return get_world(scene).events
+
+
+def get_watchdog(scene):
+    """
+    :return: world.watchdog.TickWatchdog() of the scene
+    """
+    return get_world(scene).watchdog
+
+
+def run_planner(scene, team, planner, cached):
+    """
+    Calling an expensive planner of the team within its time budget of the game step,
+    see world.watchdog.TickWatchdog.run(). The snapshot is built before the time is measured,
+    so the team is not charged for the shared world and for subscribers of other teams
+    :param scene: astrobox.space_field.SpaceField()
+    :param team: str, team name
+    :param planner: function(), the expensive decision
+    :param cached: function(), a cheap decision used after the team went over the budget
+    """
+    world = get_world(scene)
+    world.snapshot(scene)
+    return world.watchdog.run(team, scene._step, planner, cached)
+
+
+def get_snapshot(scene):
+    return get_world(scene).snapshot(scene)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+class ThreatTracker:
+    """
+    Alive drones nearest to any unit asking for threats.
+    Coordinates are gathered into arrays once per game step. A query computes distances from the unit
+    once per step and selects only the k nearest candidates with np.argpartition, so a drone asking
+    for its nearest enemy costs O(n) instead of a full sort of all drones
+    """
+
+    def __init__(self):
+        self.step = None
+        self._drones = []
+        self._ids = np.empty(0, dtype=int)
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._teams = np.empty(0, dtype=object)
+        self._home_distance = np.empty(0)
+        self._distances = {}
+        self._others = {}
+
+    def update(self, snapshot):
+        """
+        :param snapshot: world.snapshot.WorldSnapshot()
+        """
+        self.step = snapshot.step
+        self._drones = [drone for drones in snapshot.drones.values() for drone in drones]
+        self._ids = np.array([drone.id for drone in self._drones], dtype=int)
+        self._x = np.array([drone.x for drone in self._drones], dtype=float)
+        self._y = np.array([drone.y for drone in self._drones], dtype=float)
+        self._teams = np.array([drone.team for drone in self._drones], dtype=object)
+        home_x = np.array([snapshot.motherships[drone.team].x for drone in self._drones], dtype=float)
+        home_y = np.array([snapshot.motherships[drone.team].y for drone in self._drones], dtype=float)
+        self._home_distance = np.hypot(self._x - home_x, self._y - home_y)
+        self._distances = {}
+        self._others = {}
+
+    def _distances_from(self, unit):
+        # motherships are asked by all drones defending them, so distances are kept for the step
+        distances = self._distances.get(unit.id)
+        if distances is None:
+            distances = self._distances[unit.id] = np.hypot(self._x - unit.x, self._y - unit.y)
+        return distances
+
+    def _other_teams(self, team):
+        mask = self._others.get(team)
+        if mask is None:
+            mask = self._others[team] = self._teams != team
+        return mask
+
+    def _sorted(self, candidates, distances):
+        # ties are broken by id, as in world.spatial
+        return candidates[np.lexsort((self._ids[candidates], distances[candidates]))]
+
+    def nearest(self, unit, k=None, radius=None, min_home_distance=None):
+        """
+        Nearest alive drones of other teams
+        :param unit: drone or mothership the threats are looked for
+        :param k: int, how many to return, None - all
+        :param radius: float, search radius, None - whole field
+        :param min_home_distance: float, skip drones closer than this to their own mothership
+        :return: list() of (drone, distance) sorted by distance
+        """
+        distances = self._distances_from(unit)
+        mask = self._other_teams(unit.team)
+        if radius is not None:
+            mask = mask & (distances <= radius)
+        if min_home_distance is not None:
+            mask = mask & (self._home_distance > min_home_distance)
+        candidates = np.flatnonzero(mask)
+        if k is not None and len(candidates) > k:
+            # the k nearest and all drones as far as the k-th one, so ties are kept
+            kth = np.partition(distances[candidates], k - 1)[k - 1]
+            nearest = self._sorted(candidates[distances[candidates] <= kth], distances)
+            result = self._alive(nearest, distances, k)
+            if len(result) == k:
+                return result
+        return self._alive(self._sorted(candidates, distances), distances, k)
+
+    def _alive(self, order, distances, k):
+        result = []
+        for i in order:
+            drone = self._drones[i]
+            # a drone may be killed earlier in this game step
+            if drone.is_alive:
+                result.append((drone, float(distances[i])))
+                if len(result) == k:
+                    break
+        return result
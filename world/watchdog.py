@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import defaultdict
+
+
+class TickWatchdog:
+    """
+    Time every team spends in its expensive planners during one game step.
+    Planners are called through run(): while the team is within the budget of the step
+    the planner decides, after an overrun the rest of the step goes on cached last decisions.
+    Without a budget times are only measured, so matches do not depend on the machine speed
+    """
+
+    def __init__(self, budget=None):
+        # seconds per team per game step, None - never fall back
+        self.budget = budget
+        self.step = None
+        self._spent = defaultdict(float)
+        # team -> counters over the whole match
+        self.decisions = defaultdict(int)
+        self.fallbacks = defaultdict(int)
+        self.worst_decision = defaultdict(float)
+        self.worst_tick = defaultdict(float)
+        # team -> list() of (game step, seconds spent) of steps over the budget
+        self.overruns = defaultdict(list)
+
+    def run(self, team, step, planner, cached):
+        """
+        :param team: str, team name
+        :param step: int, current game step
+        :param planner: function(), the expensive decision
+        :param cached: function(), the last decision checked for validity or a cheap heuristic,
+            called instead of the planner after an overrun
+        :return: what planner() or cached() returned
+        """
+        if step != self.step:
+            self._close_step()
+            self.step = step
+        if self.budget is not None and self._spent[team] > self.budget:
+            self.fallbacks[team] += 1
+            return cached()
+        started = time.perf_counter()
+        try:
+            return planner()
+        finally:
+            elapsed = time.perf_counter() - started
+            self._spent[team] += elapsed
+            self.decisions[team] += 1
+            if elapsed > self.worst_decision[team]:
+                self.worst_decision[team] = elapsed
+
+    def _close_step(self):
+        for team, spent in self._spent.items():
+            if spent > self.worst_tick[team]:
+                self.worst_tick[team] = spent
+            if self.budget is not None and spent > self.budget:
+                self.overruns[team].append((self.step, spent))
+        self._spent.clear()
+
+    def summary(self):
+        """
+        :return: dict() team -> decisions, fallbacks, overruns count and worst times in seconds
+        """
+        self._close_step()
+        return {team: {'decisions': self.decisions[team],
+                       'fallbacks': self.fallbacks[team],
+                       'overruns': len(self.overruns[team]),
+                       'worst_decision': self.worst_decision[team],
+                       'worst_tick': self.worst_tick[team]}
+                for team in self.decisions}